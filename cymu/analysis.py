@@ -0,0 +1,226 @@
+"""
+Static analysis of the C functions of a translation unit (on the IR, see
+cymu.frontend).
+
+Every function is classified by its side effects:
+
+    PURE            the result depends only on the argument values
+    READS_GLOBALS   reads global variables or memory via pointers
+    WRITES_GLOBALS  writes global variables or memory via pointers (or calls
+                    functions, that are not defined in the translation unit)
+
+The classification is transitive: a function is at least as impure as all
+functions it calls.
+
+Furthermore the functions and global variables, that are reachable from a
+set of entry point functions, can be determined (see reachable_decls()).
+"""
+import collections
+
+
+PURE = 'pure'
+READS_GLOBALS = 'reads_globals'
+WRITES_GLOBALS = 'writes_globals'
+
+# the purity classes in ascending order of their side effects
+PURITY_LEVELS = (PURE, READS_GLOBALS, WRITES_GLOBALS)
+
+ASSIGNMENT_OPERATORS = {'ASSIGN', 'PRE_INC', 'POST_INC', 'PRE_DEC',
+                        'POST_DEC'}
+
+
+class FuncInfo(object):
+    """
+    The direct effects of a single C function definition (without the
+    effects of its callees).
+
+    :ivar str name: name of the function
+    :ivar set[str] callees: names of the called functions, that are defined
+        in the translation unit
+    :ivar set[str] global_refs: names of the referred global variables
+    :ivar bool reads_globals: reads global variables or via pointers
+    :ivar bool writes_globals: writes global variables or via pointers
+    :ivar bool calls_unknown: calls functions, that are not defined in the
+        translation unit or calls via function pointers
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self.callees = set()
+        self.global_refs = set()
+        self.reads_globals = False
+        self.writes_globals = False
+        self.calls_unknown = False
+
+    def __repr__(self):
+        return '<FuncInfo {}>'.format(self.name)
+
+    @property
+    def purity(self):
+        """
+        the purity class of the direct effects
+        """
+        if self.writes_globals or self.calls_unknown:
+            return WRITES_GLOBALS
+        elif self.reads_globals:
+            return READS_GLOBALS
+        else:
+            return PURE
+
+
+def skip_implicit_exprs(expr_ir):
+    while expr_ir.kind in ('PAREN_EXPR', 'UNEXPOSED_EXPR') and \
+            expr_ir.children:
+        [expr_ir] = expr_ir.children
+    return expr_ir
+
+
+class FuncAnalyzer(object):
+    """
+    collects the FuncInfo of a single function definition
+    """
+
+    def __init__(self, func_decl_ir, global_var_names, func_names):
+        self.info = FuncInfo(func_decl_ir.spelling)
+        self.global_var_names = global_var_names
+        self.func_names = func_names
+        self.local_names = {child.spelling
+                            for child in func_decl_ir.children
+                            if child.kind == 'PARM_DECL'}
+
+    def is_global_var(self, name):
+        return name not in self.local_names and name in self.global_var_names
+
+    def visit(self, node_ir):
+        kind = node_ir.kind
+        if kind == 'VAR_DECL':
+            self.local_names.add(node_ir.spelling)
+        elif kind == 'DECL_REF_EXPR':
+            if self.is_global_var(node_ir.spelling):
+                self.info.global_refs.add(node_ir.spelling)
+                self.info.reads_globals = True
+            elif node_ir.spelling in self.func_names:
+                # the function is called (or its address is taken)
+                self.info.callees.add(node_ir.spelling)
+        elif kind == 'CALL_EXPR':
+            callee_ir = skip_implicit_exprs(node_ir.children[0])
+            if callee_ir.kind != 'DECL_REF_EXPR' or \
+                    callee_ir.spelling not in self.func_names:
+                self.info.calls_unknown = True
+        elif kind == 'MEMBER_REF_EXPR':
+            if node_ir.children[0].type.kind == 'POINTER':
+                self.info.reads_globals = True
+        elif kind == 'UNARY_OPERATOR' and node_ir.operator == 'DEREF':
+            self.info.reads_globals = True
+        if (kind in ('BINARY_OPERATOR', 'UNARY_OPERATOR') and
+                node_ir.operator in ASSIGNMENT_OPERATORS) or \
+                kind == 'COMPOUND_ASSIGNMENT_OPERATOR':
+            self.visit_write(node_ir.children[0])
+        for child_ir in node_ir.children:
+            self.visit(child_ir)
+
+    def visit_write(self, lvalue_ir):
+        """
+        checks if writing to lvalue_ir modifies memory outside of the
+        function's local variables
+        """
+        lvalue_ir = skip_implicit_exprs(lvalue_ir)
+        while lvalue_ir.kind == 'MEMBER_REF_EXPR' and \
+                lvalue_ir.children[0].type.kind != 'POINTER':
+            lvalue_ir = skip_implicit_exprs(lvalue_ir.children[0])
+        if lvalue_ir.kind != 'DECL_REF_EXPR' or \
+                self.is_global_var(lvalue_ir.spelling):
+            self.info.writes_globals = True
+
+
+def is_func_def(func_decl_ir):
+    return any(child.kind == 'COMPOUND_STMT'
+               for child in func_decl_ir.children)
+
+
+def analyze_funcs(transunit_ir):
+    """
+    returns the direct effects of all functions defined in a translation
+    unit
+
+    :type transunit_ir: frontend.Node
+    :rtype: dict[str, FuncInfo]
+    """
+    global_var_names = {decl_ir.spelling
+                        for decl_ir in transunit_ir.children
+                        if decl_ir.kind == 'VAR_DECL'}
+    func_defs_ir = [decl_ir for decl_ir in transunit_ir.children
+                    if decl_ir.kind == 'FUNCTION_DECL' and
+                    is_func_def(decl_ir)]
+    func_names = {func_def_ir.spelling for func_def_ir in func_defs_ir}
+    func_infos = collections.OrderedDict()
+    for func_def_ir in func_defs_ir:
+        analyzer = FuncAnalyzer(func_def_ir, global_var_names, func_names)
+        for child_ir in func_def_ir.children:
+            analyzer.visit(child_ir)
+        func_infos[func_def_ir.spelling] = analyzer.info
+    return func_infos
+
+
+def classify_purity(func_infos):
+    """
+    returns the purity class of every function including the effects of
+    all (transitively) called functions
+
+    :param dict[str, FuncInfo] func_infos: see analyze_funcs()
+    :rtype: dict[str, str]
+    """
+    levels = {name: PURITY_LEVELS.index(info.purity)
+              for name, info in func_infos.items()}
+    changed = True
+    while changed:
+        changed = False
+        for name, info in func_infos.items():
+            level = max([levels[name]] +
+                        [levels[callee] for callee in info.callees])
+            if level != levels[name]:
+                levels[name] = level
+                changed = True
+    return {name: PURITY_LEVELS[level] for name, level in levels.items()}
+
+
+def reachable_decls(transunit_ir, func_infos, entry_points):
+    """
+    returns the functions, that can be called (directly or indirectly) from
+    the entry point functions, and the global variables, that are referred by
+    these functions (or by the initializers of referred global variables)
+
+    :param dict[str, FuncInfo] func_infos: see analyze_funcs()
+    :param list[str] entry_points: names of defined functions
+    :rtype: (set[str], set[str])
+    :return: names of the reachable functions and global variables
+    """
+    var_decls_ir = collections.defaultdict(list)
+    for decl_ir in transunit_ir.children:
+        if decl_ir.kind == 'VAR_DECL':
+            var_decls_ir[decl_ir.spelling].append(decl_ir)
+    func_names = set()
+    var_names = set()
+    pending_funcs = list(entry_points)
+    pending_vars = []
+    while pending_funcs or pending_vars:
+        if pending_funcs:
+            func_name = pending_funcs.pop()
+            if func_name not in func_names:
+                func_names.add(func_name)
+                func_info = func_infos[func_name]
+                pending_funcs.extend(func_info.callees)
+                pending_vars.extend(func_info.global_refs)
+        else:
+            var_name = pending_vars.pop()
+            if var_name not in var_names:
+                var_names.add(var_name)
+                for var_decl_ir in var_decls_ir[var_name]:
+                    for node_ir in var_decl_ir.iter_nodes():
+                        if node_ir.kind != 'DECL_REF_EXPR':
+                            continue
+                        elif node_ir.spelling in func_infos:
+                            pending_funcs.append(node_ir.spelling)
+                        elif node_ir.spelling in var_decls_ir:
+                            pending_vars.append(node_ir.spelling)
+    return func_names, var_names
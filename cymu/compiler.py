@@ -1,8 +1,28 @@
 import ast
+import collections
+import contextlib
 import functools
 import os
+import time
+import types
 
-import clang.cindex
+try:
+    import clang.cindex
+except ImportError:
+    # without libclang C code cannot be parsed, but code generation from
+    # stored IR (see compile_ir()) is still possible
+    clang = None
+
+from cymu import analysis
+from cymu import frontend
+from cymu import memo
+from cymu import pyast_printer
+from cymu.coverage import Coverage
+from cymu.datamodel import CProgram, IntCObj, PtrCObj, \
+    promotes_to_unsigned
+from cymu.trace import Trace
+from cymu.optimizer import PassManager, count_nodes
+from cymu.externs import bind_externs
 
 # this value is vor debugging purposes.
 # It prints the python AST of compiled C-code
@@ -10,14 +30,83 @@ PRINT_PYAST = False
 
 
 TYPE_MAP = {
-    clang.cindex.TypeKind.CHAR_S: 'char',
-    clang.cindex.TypeKind.UCHAR: 'unsigned_char',
-    clang.cindex.TypeKind.SHORT: 'short',
-    clang.cindex.TypeKind.USHORT: 'unsigned_short',
-    clang.cindex.TypeKind.INT: 'int',
-    clang.cindex.TypeKind.UINT: 'unsigned_int',
-    clang.cindex.TypeKind.LONG: 'long',
-    clang.cindex.TypeKind.ULONG: 'unsigned_long' }
+    'CHAR_S': 'char',
+    'UCHAR': 'unsigned_char',
+    'SHORT': 'short',
+    'USHORT': 'unsigned_short',
+    'INT': 'int',
+    'UINT': 'unsigned_int',
+    'LONG': 'long',
+    'ULONG': 'unsigned_long' }
+
+
+# maximum number of statements per generated function for initializing
+# global variables. Global variables with non-constant initializers are
+# initialized in chunks of this size (see chunk_global_vars()), as compiling
+# very large functions is slow
+GLOBAL_VARS_CHUNK_SIZE = 500
+
+
+# maps the operators of compound assignments to the in-place methods of
+# CObjs, which are modifying the CObj without creating temporary objects
+INPLACE_METHODS = {
+    'ADD_ASSIGN': '__iadd__',
+    'SUB_ASSIGN': '__isub__',
+    'MUL_ASSIGN': '__imul__',
+    'DIV_ASSIGN': '__idiv__',
+    'REM_ASSIGN': '__imod__',
+    'AND_ASSIGN': '__iand__',
+    'OR_ASSIGN': '__ior__',
+    'XOR_ASSIGN': '__ixor__',
+    'SHL_ASSIGN': '__ilshift__',
+    'SHR_ASSIGN': '__irshift__' }
+
+# maps the binary operators of C integers to the python operators, that
+# calculate the same result on the raw values of the (converted) operands
+# (before cutting off the bits, that do not fit into the result type)
+INT_OPERATORS = {
+    'ADD': ast.Add,
+    'SUB': ast.Sub,
+    'MUL': ast.Mult,
+    'AND': ast.BitAnd,
+    'OR': ast.BitOr,
+    'XOR': ast.BitXor,
+    'SHL': ast.LShift,
+    'SHR': ast.RShift }
+
+# the operators of INT_OPERATORS, whose results are always within the value
+# range of the result type
+NON_OVERFLOWING_INT_OPERATORS = {'AND', 'OR', 'XOR', 'SHR'}
+
+# the operators of INT_OPERATORS, whose results cut to n bits depend only on
+# the lowest n bits of the operands (for SHL only of the left operand). Thus
+# their operands need not be cut to the value range of their type.
+MODULAR_INT_OPERATORS = {'ADD', 'SUB', 'MUL', 'SHL'}
+
+# maps the C integer division operators to the functions of datamodel, that
+# implement their C semantics
+INT_DIV_FUNCS = {
+    'DIV': 'c_div',
+    'REM': 'c_mod' }
+
+COMPARISON_OPERATORS = {
+    'LT': ast.Lt,
+    'GT': ast.Gt,
+    'LE': ast.LtE,
+    'GE': ast.GtE,
+    'EQ': ast.Eq,
+    'NE': ast.NotEq }
+
+LOGICAL_OPERATORS = {
+    'LAND': ast.And,
+    'LOR': ast.Or }
+
+# maps the increment/decrement operators to the in-place methods of CObjs
+INCDEC_METHODS = {
+    'PRE_INC': '__iadd__',
+    'POST_INC': '__iadd__',
+    'PRE_DEC': '__isub__',
+    'POST_DEC': '__isub__' }
 
 
 class CompileError(Exception):
@@ -30,6 +119,88 @@ class CompileContext(dict):
         return self.get(name)
 
 
+class JumpScope(object):
+    """
+    A loop or switch statement, that is left by a C break.
+
+    :ivar bool is_loop: False for switch statements
+    :ivar bool continued: True if the body contains a C continue, that
+        refers to this statement (or for switch statements: to the
+        enclosing loop)
+    """
+
+    def __init__(self, is_loop):
+        self.is_loop = is_loop
+        self.continued = False
+
+
+class CompileStats(object):
+    """
+    Wall time per compile phase and sizes of the intermediate results of
+    the compilation of a single translation unit.
+
+    The phases are (in this order): 'parse', 'diagnostics', 'cursor_walk'
+    (conversion of the clang cursors to IR), 'load_ir' (when compiling
+    stored IR), 'purity' (see cymu.analysis), 'prune' (when compiling with
+    entry points), 'ast_build', 'optimize', 'fix_locations',
+    'bytecode_compile', 'class_creation'. Only the phases that were run are
+    contained.
+
+    :ivar collections.OrderedDict durations: maps phase names to the
+        duration of the phase (in seconds)
+    :ivar int cursor_count: number of clang cursors/IR nodes
+    :ivar int ast_node_count: number of nodes of the generated python AST
+    :ivar int bytecode_size: size of the generated bytecode in bytes
+    """
+
+    def __init__(self):
+        self.durations = collections.OrderedDict()
+        self.cursor_count = None
+        self.ast_node_count = None
+        self.bytecode_size = None
+
+    def __repr__(self):
+        return '<CompileStats {:.3f}s>'.format(self.total_duration)
+
+    @contextlib.contextmanager
+    def phase(self, name):
+        """
+        context manager, that adds the execution time of its body to the
+        duration of the phase *name*
+        """
+        start_time = time.time()
+        try:
+            yield
+        finally:
+            self.durations[name] = (self.durations.get(name, 0.0) +
+                                    time.time() - start_time)
+
+    @property
+    def total_duration(self):
+        return sum(self.durations.values())
+
+    def write_report(self, fileobj):
+        for name, duration in self.durations.items():
+            fileobj.write('{:<20}{:>10.3f} ms\n'.format(name, duration*1000))
+        fileobj.write('{:<20}{:>10.3f} ms\n'.format(
+            'total', self.total_duration*1000))
+        for name in ('cursor_count', 'ast_node_count', 'bytecode_size'):
+            fileobj.write('{:<20}{:>10}\n'.format(name,
+                                                  str(getattr(self, name))))
+
+
+def bytecode_size(code):
+    """
+    returns the size of the bytecode of *code* and all nested code objects
+    (functions, classes)
+
+    :type code: types.CodeType
+    """
+    return len(code.co_code) + sum(bytecode_size(const)
+                                   for const in code.co_consts
+                                   if isinstance(const, types.CodeType))
+
+
 def config_clang():
     prj_dir = os.path.dirname(os.path.dirname(__file__))
     libclang_dir = os.path.join(prj_dir, r'libclang\build\Release\bin')
@@ -54,8 +225,8 @@ def with_src_location():
 
 def src_location_end_marker(astc):
     return ast.Pass(
-        lineno=astc.extent.end.line,
-        col_offset=astc.extent.end.column - 1)
+        lineno=astc.end_location.line,
+        col_offset=astc.end_location.column - 1)
 
 def fix_src_locations(node_list):
     """
@@ -72,6 +243,19 @@ def fix_src_locations(node_list):
             ast.copy_location(prev_astpy, next_astpy)
 
 
+def set_src_location(stmts_astpy, location):
+    """
+    sets the source location of all nodes of the passed statements
+    (including the ones, that have already a location)
+
+    :type location: frontend.SrcLocation
+    """
+    for stmt_astpy in stmts_astpy:
+        for node_astpy in ast.walk(stmt_astpy):
+            if 'lineno' in node_astpy._attributes:
+                node_astpy.lineno = location.line
+                node_astpy.col_offset = location.column - 1
+
 def attr(obj, *nested_attrnames):
     if isinstance(obj, str):
         expr_astpy = ast.Name(id=obj, ctx=ast.Load())
@@ -94,71 +278,596 @@ def call(obj, *args):
         starargs=None,
         kwargs=None)
 
+def ctype_astpy(type_astc, in_class_body=False):
+    """
+    returns a python-ast expression, that evaluates to the CType of the
+    passed clang type.
+
+    :param frontend.Type type_astc: the type that shall be converted
+    :param bool in_class_body: if True, the returned expression is valid
+        within the body of the CModule class definition (instead of within
+        its methods)
+    :rtype: ast.AST
+    """
+    if type_astc.kind == 'POINTER':
+        return attr(ctype_astpy(type_astc.pointee, in_class_body), 'ptr')
+    elif type_astc.kind == 'RECORD':
+        struct_name = 'struct_' + type_astc.decl_spelling
+        if in_class_body:
+            return attr(struct_name)
+        else:
+            return attr('__globals__', struct_name)
+    else:
+        if in_class_body:
+            return attr('datamodel', 'CProgram', TYPE_MAP[type_astc.kind])
+        else:
+            return attr('__globals__', TYPE_MAP[type_astc.kind])
+
+def is_ptr_type(type_astc):
+    return type_astc.kind == 'POINTER'
+
+def coverage_probe(counter_ndx):
+    """
+    returns a statement, that increments the coverage counter *counter_ndx*
+    """
+    return ast.AugAssign(
+        target=ast.Subscript(
+            value=ast.Name(id='__cov__', ctx=ast.Load()),
+            slice=ast.Index(value=ast.Num(n=counter_ndx)),
+            ctx=ast.Store()),
+        op=ast.Add(),
+        value=ast.Num(n=1))
+
+def add_line_probe(stmt_astc, ctx, prefix_stmts):
+    if ctx.coverage is not None:
+        counter_ndx = ctx.coverage.add_line_probe(
+            stmt_astc.location.filename, stmt_astc.location.line)
+        prefix_stmts.append(coverage_probe(counter_ndx))
+
+def add_branch_probes(stmt_astc, ctx, *branches_astpy):
+    """
+    inserts a coverage probe at the beginning of every passed list of
+    python statements.
+
+    :param list[list[ast.AST]] branches_astpy: one statement list per branch
+    """
+    if ctx.coverage is not None:
+        counter_ndxs = ctx.coverage.add_branch_probes(
+            stmt_astc.location.filename, stmt_astc.location.line,
+            len(branches_astpy))
+        for counter_ndx, branch_astpy in zip(counter_ndxs, branches_astpy):
+            branch_astpy.insert(0, coverage_probe(counter_ndx))
+
+def trace_probe(site_ndx, value_astpy, ctx):
+    """
+    returns the statements, that record an event of the trace site
+    *site_ndx* (see cymu.trace). The event is stored directly into the ring
+    buffer of the trace (without calling Trace.record()):
+
+        __tn__ = __trace_counter__[0]
+        __trace_counter__[0] = __tn__ + 1
+        __tn__ %= <capacity>
+        __trace_sites__[__tn__] = <site_ndx>
+        __trace_values__[__tn__] = <value>
+    """
+    def name(id, name_ctx=ast.Load):
+        return ast.Name(id=id, ctx=name_ctx())
+    def item(array_name, ndx_astpy, item_ctx=ast.Load):
+        return ast.Subscript(value=name(array_name),
+                             slice=ast.Index(value=ndx_astpy),
+                             ctx=item_ctx())
+    return [
+        ast.Assign(targets=[name('__tn__', ast.Store)],
+                   value=item('__trace_counter__', ast.Num(n=0))),
+        ast.Assign(targets=[item('__trace_counter__', ast.Num(n=0),
+                                 ast.Store)],
+                   value=ast.BinOp(left=name('__tn__'), op=ast.Add(),
+                                   right=ast.Num(n=1))),
+        ast.AugAssign(target=name('__tn__', ast.Store), op=ast.Mod(),
+                      value=ast.Num(n=ctx.trace.capacity)),
+        ast.Assign(targets=[item('__trace_sites__', name('__tn__'),
+                                 ast.Store)],
+                   value=ast.Num(n=site_ndx)),
+        ast.Assign(targets=[item('__trace_values__', name('__tn__'),
+                                 ast.Store)],
+                   value=value_astpy)]
+
+def skip_implicit_exprs(expr_astc):
+    while expr_astc.kind in ('PAREN_EXPR', 'UNEXPOSED_EXPR'):
+        [expr_astc] = expr_astc.children
+    return expr_astc
+
+def is_pure_lvalue(lvalue_astc):
+    """
+    returns True, if the python code for lvalue_astc can be evaluated a
+    second time without side effects
+    """
+    lvalue_astc = skip_implicit_exprs(lvalue_astc)
+    if lvalue_astc.kind == 'DECL_REF_EXPR':
+        return True
+    elif lvalue_astc.kind == 'MEMBER_REF_EXPR' or \
+            (lvalue_astc.kind == 'UNARY_OPERATOR' and
+             lvalue_astc.operator == 'DEREF'):
+        return is_pure_lvalue(lvalue_astc.children[0])
+    else:
+        return False
+
+def global_lvalue_path(lvalue_astc, ctx):
+    """
+    returns the attribute names of the object referred by lvalue_astc
+    relative to the program object or None if it is not a global variable
+    (or a field of it)
+    """
+    lvalue_astc = skip_implicit_exprs(lvalue_astc)
+    if lvalue_astc.kind == 'DECL_REF_EXPR':
+        if ctx.local_names is not None and \
+                lvalue_astc.spelling in ctx.local_names:
+            return None
+        return (lvalue_astc.spelling,)
+    elif lvalue_astc.kind == 'MEMBER_REF_EXPR' and \
+            not is_ptr_type(lvalue_astc.children[0].type):
+        struct_path = global_lvalue_path(lvalue_astc.children[0], ctx)
+        if struct_path is not None:
+            return struct_path + (lvalue_astc.spelling,)
+    return None
+
+def add_write_trace(lvalue_astc, lvalue_astpy, ctx, prefix_stmts):
+    """
+    records the value of lvalue_astpy after a write to it, if tracing is
+    enabled and it is a global variable or a struct field.
+    Writes to lvalues, whose evaluation has side effects (i.e. calls),
+    and writes of whole structs (which have no single value) are not
+    traced.
+    """
+    if ctx.trace is None or lvalue_astc.type.kind == 'RECORD' or \
+            not is_pure_lvalue(lvalue_astc):
+        return
+    path = global_lvalue_path(lvalue_astc, ctx)
+    if path is None and \
+            skip_implicit_exprs(lvalue_astc).kind != 'MEMBER_REF_EXPR':
+        return
+    site_ndx = ctx.trace.add_write_site(
+        lvalue_astc.location.filename, lvalue_astc.location.line,
+        path, is_ptr_type(lvalue_astc.type))
+    # the written value is read directly from the storage attribute, which
+    # is faster than calling int()
+    cobj_type = PtrCObj if is_ptr_type(lvalue_astc.type) else IntCObj
+    prefix_stmts.extend(trace_probe(
+        site_ndx, attr(lvalue_astpy, cobj_type._STORAGE_ATTR), ctx))
+
+def int_ctype(type_astc):
+    """
+    returns the IntCType of an integer type (or None for other types)
+
+    :rtype: datamodel.IntCType
+    """
+    if type_astc.kind in TYPE_MAP:
+        return getattr(CProgram, TYPE_MAP[type_astc.kind])
+    else:
+        return None
+
+def wrap_int_astpy(value_astpy, ctype):
+    """
+    returns an expression, that converts the python integer value_astpy to
+    the value range of ctype (like IntCType.wrap(), but without a call)
+    """
+    if isinstance(value_astpy, ast.Num):
+        return ast.Num(n=ctype.wrap(value_astpy.n))
+    elif ctype.signed:
+        sign_bit = 1 << (ctype.bits - 1)
+        return ast.BinOp(
+            left=ast.BinOp(
+                left=ast.BinOp(left=value_astpy, op=ast.Add(),
+                               right=ast.Num(n=sign_bit)),
+                op=ast.BitAnd(),
+                right=ast.Num(n=ctype.mask)),
+            op=ast.Sub(),
+            right=ast.Num(n=sign_bit))
+    else:
+        return ast.BinOp(left=value_astpy, op=ast.BitAnd(),
+                         right=ast.Num(n=ctype.mask))
+
+def convert_int_astpy(value_astpy, from_ctype, to_ctype, wrap=True):
+    """
+    returns an expression, that converts the python integer value_astpy
+    from from_ctype to to_ctype
+
+    :param bool wrap: see astconv_int_value()
+    """
+    if to_ctype.bits > from_ctype.bits and \
+            (to_ctype.signed or not from_ctype.signed) or \
+            to_ctype.bits == from_ctype.bits and \
+            to_ctype.signed == from_ctype.signed:
+        # to_ctype can represent all values of from_ctype
+        return value_astpy
+    elif not wrap:
+        return value_astpy
+    else:
+        return wrap_int_astpy(value_astpy, to_ctype)
+
+def is_int_conversion(expr_astc):
+    return expr_astc.kind in ('UNEXPOSED_EXPR', 'CSTYLE_CAST_EXPR') and \
+        expr_astc.type.kind in TYPE_MAP and \
+        expr_astc.children[-1].type.kind in TYPE_MAP
+
+def is_int_operation(expr_astc):
+    """
+    returns True, if expr_astc is a binary operation on integers, which is
+    calculated on raw python integers (see astconv_int_value())
+    """
+    if expr_astc.kind != 'BINARY_OPERATOR':
+        return False
+    elif expr_astc.operator in LOGICAL_OPERATORS:
+        return True
+    elif expr_astc.operator in INT_OPERATORS or \
+            expr_astc.operator in INT_DIV_FUNCS or \
+            expr_astc.operator in COMPARISON_OPERATORS:
+        left_astc, right_astc = expr_astc.children
+        return left_astc.type.kind in TYPE_MAP and \
+            right_astc.type.kind in TYPE_MAP
+    else:
+        return False
+
+def is_raw_int_expr(expr_astc):
+    """
+    returns True, if astconv_expr() converts expr_astc to a raw python
+    integer (instead of a CObj)
+    """
+    while expr_astc.kind == 'PAREN_EXPR':
+        [expr_astc] = expr_astc.children
+    if is_int_conversion(expr_astc):
+        return is_raw_int_expr(expr_astc.children[-1])
+    else:
+        return is_int_operation(expr_astc)
+
+def astconv_int_value(expr_astc, ctx, prefix_stmts, wrap=True):
+    """
+    Converts an expression of integer type to a python expression, that
+    returns its raw value as python integer.
+    The types of all operations and conversions are known at compile time
+    (expr_astc.type), so the generated code consists only of python
+    integer operations, where the results are cut to the value range of
+    the result type (see wrap_int_astpy()) only if they may overflow.
+
+    :param bool wrap: if False, the result may exceed the value range of
+        the expression's type (only the lowest bits of the type's size are
+        correct). For callers, that cut the value anyway.
+    """
+    children = expr_astc.children
+    if expr_astc.kind == 'PAREN_EXPR':
+        return astconv_int_value(children[0], ctx, prefix_stmts, wrap)
+    elif expr_astc.kind == 'INTEGER_LITERAL':
+        return ast.Num(n=int_ctype(expr_astc.type).wrap(expr_astc.value))
+    elif is_int_conversion(expr_astc):
+        sub_astc = children[-1]
+        from_ctype = int_ctype(sub_astc.type)
+        to_ctype = int_ctype(expr_astc.type)
+        return convert_int_astpy(
+            astconv_int_value(sub_astc, ctx, prefix_stmts,
+                              wrap or from_ctype.bits < to_ctype.bits),
+            from_ctype, to_ctype, wrap)
+    elif is_int_operation(expr_astc) and \
+            expr_astc.operator not in LOGICAL_OPERATORS:
+        operator = expr_astc.operator
+        left_astc, right_astc = children
+        modular = operator in MODULAR_INT_OPERATORS
+        left_astpy = astconv_int_value(left_astc, ctx, prefix_stmts,
+                                       wrap=not modular)
+        right_astpy = astconv_int_value(right_astc, ctx, prefix_stmts,
+                                        wrap=not modular or operator == 'SHL')
+        if operator in COMPARISON_OPERATORS:
+            return ast.Compare(left=left_astpy,
+                               ops=[COMPARISON_OPERATORS[operator]()],
+                               comparators=[right_astpy])
+        elif operator in INT_DIV_FUNCS:
+            result_astpy = call(attr('datamodel', INT_DIV_FUNCS[operator]),
+                                left_astpy, right_astpy)
+        else:
+            result_astpy = ast.BinOp(left=left_astpy,
+                                     op=INT_OPERATORS[operator](),
+                                     right=right_astpy)
+        if operator in NON_OVERFLOWING_INT_OPERATORS or operator == 'REM' or \
+                not wrap:
+            return result_astpy
+        else:
+            return wrap_int_astpy(result_astpy, int_ctype(expr_astc.type))
+    else:
+        return call(attr('int'), astconv_expr(expr_astc, ctx, prefix_stmts))
+
+def astconv_assigned_value(expr_astc, target_type_astc, ctx, prefix_stmts):
+    """
+    Like astconv_expr(), for values that are assigned to (or used to create)
+    a CObj of type target_type_astc. As the CObj cuts the value to its value
+    range anyway, integer operations need not cut their result.
+    """
+    target_ctype = int_ctype(target_type_astc)
+    if is_raw_int_expr(expr_astc) and target_ctype is not None and \
+            int_ctype(expr_astc.type).bits >= target_ctype.bits:
+        return astconv_int_value(expr_astc, ctx, prefix_stmts, wrap=False)
+    else:
+        return astconv_expr(expr_astc, ctx, prefix_stmts)
+
+def astconv_condition(expr_astc, ctx, prefix_stmts):
+    """
+    Like astconv_expr(), for expressions whose truth value is used only
+    (i.e. the condition of an if statement). && and || are converted to
+    python boolean operations directly.
+    """
+    while expr_astc.kind == 'PAREN_EXPR':
+        [expr_astc] = expr_astc.children
+    if expr_astc.kind == 'BINARY_OPERATOR' and \
+            expr_astc.operator in LOGICAL_OPERATORS:
+        left_astc, right_astc = expr_astc.children
+        left_astpy = astconv_condition(left_astc, ctx, prefix_stmts)
+        right_prefix_stmts = []
+        right_astpy = astconv_condition(right_astc, ctx, right_prefix_stmts)
+        if right_prefix_stmts:
+            raise CompileError('Unsupported side effects in the right '
+                               'operand of {!r}'.format(expr_astc.operator))
+        return ast.BoolOp(op=LOGICAL_OPERATORS[expr_astc.operator](),
+                          values=[left_astpy, right_astpy])
+    else:
+        return astconv_expr(expr_astc, ctx, prefix_stmts)
+
+def astconv_logical_op(expr_astc, ctx, prefix_stmts):
+    """
+    converts && and || to a python boolean operation (see
+    astconv_condition()), that returns 1 or 0
+    """
+    return ast.IfExp(test=astconv_condition(expr_astc, ctx, prefix_stmts),
+                     body=ast.Num(n=1),
+                     orelse=ast.Num(n=0))
+
+def astconv_cobj(expr_astc, ctx, prefix_stmts):
+    """
+    Like astconv_expr(), but raw python integers are converted to CObjs.
+    Required for operations, that do not accept python integers.
+    """
+    expr_astpy = astconv_expr(expr_astc, ctx, prefix_stmts)
+    if is_raw_int_expr(expr_astc):
+        return call(ctype_astpy(expr_astc.type), expr_astpy)
+    else:
+        return expr_astpy
+
 def astconv_expr(expr_astc, ctx, prefix_stmts):
-    children = list(expr_astc.get_children())
-    if expr_astc.kind.name in ('BINARY_OPERATOR', 'COMPOUND_ASSIGNMENT_OPERATOR'):
+    """
+    Converts a C expression to a python expression, that returns a CObj
+    or (for integer operations, see is_raw_int_expr()) a python integer.
+    """
+    children = expr_astc.children
+    if expr_astc.kind == 'BINARY_OPERATOR' and \
+            expr_astc.operator in LOGICAL_OPERATORS:
+        return astconv_logical_op(expr_astc, ctx, prefix_stmts)
+    elif is_raw_int_expr(expr_astc):
+        return astconv_int_value(expr_astc, ctx, prefix_stmts)
+    elif expr_astc.kind == 'BINARY_OPERATOR' and \
+            expr_astc.operator in COMPARISON_OPERATORS:
+        # comparison of pointers
+        left_astc, right_astc = children
+        return ast.Compare(
+            left=astconv_expr(left_astc, ctx, prefix_stmts),
+            ops=[COMPARISON_OPERATORS[expr_astc.operator]()],
+            comparators=[astconv_expr(right_astc, ctx, prefix_stmts)])
+    elif expr_astc.kind == 'BINARY_OPERATOR' and \
+            expr_astc.operator in ('ADD', 'SUB'):
+        # pointer arithmetic
+        left_astc, right_astc = children
+        return ast.BinOp(
+            left=astconv_expr(left_astc, ctx, prefix_stmts),
+            op=ast.Add() if expr_astc.operator == 'ADD' else ast.Sub(),
+            right=astconv_expr(right_astc, ctx, prefix_stmts))
+    elif expr_astc.kind in ('BINARY_OPERATOR',
+                                 'COMPOUND_ASSIGNMENT_OPERATOR'):
         decl_ref_astc, val_astc = children
         lvalue_astpy = astconv_expr(decl_ref_astc, ctx, prefix_stmts)
         lval_val_astpy = ast.Attribute(
             value=lvalue_astpy,
             attr='val',
             ctx=ast.Store())
-        if expr_astc.kind.name == 'BINARY_OPERATOR':
-            assert expr_astc.operator_kind.name == 'ASSIGN'
+        if expr_astc.kind == 'BINARY_OPERATOR':
+            if expr_astc.operator != 'ASSIGN':
+                raise CompileError('Unsupportet Binary Operator {!r}'
+                                   .format(expr_astc.operator))
             prefix_stmts.append(ast.Assign(
                 targets=[lval_val_astpy],
-                value=astconv_expr(val_astc, ctx, prefix_stmts)))
+                value=astconv_assigned_value(val_astc, decl_ref_astc.type,
+                                             ctx, prefix_stmts)))
         else:
-            assert expr_astc.operator_kind.name == 'SUB_ASSIGN'
-            prefix_stmts.append(ast.AugAssign(
-                target=lval_val_astpy,
-                op=ast.Sub(),
-                value=astconv_expr(val_astc, ctx, prefix_stmts)))
+            try:
+                inplace_method = INPLACE_METHODS[expr_astc.operator]
+            except KeyError:
+                raise CompileError('Unsupportet Compound Assignment {!r}'
+                                   .format(expr_astc.operator))
+            val_ctype = int_ctype(val_astc.type)
+            if expr_astc.operator in ('DIV_ASSIGN', 'REM_ASSIGN') and \
+                    val_ctype is not None and \
+                    promotes_to_unsigned(val_ctype):
+                # the in-place operators treat python integers as int, so
+                # the (unsigned) type of the operand has to be passed
+                operand_astpy = astconv_cobj(val_astc, ctx, prefix_stmts)
+            else:
+                operand_astpy = astconv_operand(val_astc, ctx, prefix_stmts)
+            prefix_stmts.append(ast.Expr(call(
+                attr(lvalue_astpy, inplace_method), operand_astpy)))
+        add_write_trace(decl_ref_astc, lvalue_astpy, ctx, prefix_stmts)
         return lvalue_astpy
-    elif expr_astc.kind.name == 'INTEGER_LITERAL':
-        int_tok_astc = expr_astc.get_tokens().next()
-        int_astpy = ast.Num(n=int(int_tok_astc.spelling))
-        return call(attr('__globals__', 'int'), int_astpy)
-    elif expr_astc.kind.name == 'UNEXPOSED_EXPR':
+    elif expr_astc.kind == 'INTEGER_LITERAL':
+        int_astpy = ast.Num(n=expr_astc.value)
+        return call(ctype_astpy(expr_astc.type), int_astpy)
+    elif expr_astc.kind == 'UNEXPOSED_EXPR':
+        [sub_astc] = children
+        if is_ptr_type(expr_astc.type) and \
+                sub_astc.type.kind in TYPE_MAP:
+            # implicit conversion of integer to pointer
+            return call(attr(ctype_astpy(expr_astc.type), 'cast'),
+                        astconv_cobj(sub_astc, ctx, prefix_stmts))
+        else:
+            return astconv_expr(sub_astc, ctx, prefix_stmts)
+    elif expr_astc.kind == 'PAREN_EXPR':
         [sub_astc] = children
         return astconv_expr(sub_astc, ctx, prefix_stmts)
-    elif expr_astc.kind.name == 'DECL_REF_EXPR':
+    elif expr_astc.kind == 'CSTYLE_CAST_EXPR':
+        return call(attr(ctype_astpy(expr_astc.type), 'cast'),
+                    astconv_cobj(children[-1], ctx, prefix_stmts))
+    elif expr_astc.kind == 'UNARY_OPERATOR' and \
+            expr_astc.operator in INCDEC_METHODS:
+        if expr_astc.operator.startswith('POST'):
+            raise CompileError('Unsupported use of the value of a postfix '
+                               'increment/decrement')
+        return astconv_incdec(expr_astc, ctx, prefix_stmts)
+    elif expr_astc.kind == 'UNARY_OPERATOR':
+        [sub_astc] = children
+        sub_astpy = astconv_expr(sub_astc, ctx, prefix_stmts)
+        if expr_astc.operator == 'ADDR_OF':
+            return attr(sub_astpy, 'ptr')
+        elif expr_astc.operator == 'DEREF':
+            return attr(sub_astpy, 'ref')
+        else:
+            raise CompileError('Unsupportet Unary Operator {!r}'
+                               .format(expr_astc.operator))
+    elif expr_astc.kind == 'DECL_REF_EXPR':
         if ctx.local_names is not None and \
                         expr_astc.spelling in ctx.local_names:
             return attr(expr_astc.spelling)
         else:
             return attr('__globals__', expr_astc.spelling)
-    elif expr_astc.kind.name == 'MEMBER_REF_EXPR':
+    elif expr_astc.kind == 'MEMBER_REF_EXPR':
         struct_astpy = astconv_expr(children[0], ctx, prefix_stmts)
+        if is_ptr_type(children[0].type):
+            struct_astpy = attr(struct_astpy, 'ref')
         return attr(struct_astpy, expr_astc.spelling)
-    elif expr_astc.kind.name == 'INIT_LIST_EXPR':
+    elif expr_astc.kind == 'INIT_LIST_EXPR':
         # only valid for initializing lists/struct variables
         return ast.Tuple(
                 elts=[astconv_expr(child, ctx, prefix_stmts)
                       for child in children],
                 ctx=ast.Load())
-    elif expr_astc.kind.name == 'CALL_EXPR':
+    elif expr_astc.kind == 'CALL_EXPR':
         ctx.enforce_expr_exec = True
-        return call(astconv_expr(children[0], ctx, prefix_stmts),
-                    *[astconv_expr(c, ctx, prefix_stmts)
-                      for c in children[1:]])
+        func_decl_astc = get_direct_callee(expr_astc, ctx)
+        if func_decl_astc is not None:
+            call_astpy = astconv_direct_call(expr_astc, func_decl_astc, ctx,
+                                             prefix_stmts)
+        else:
+            call_astpy = call(astconv_expr(children[0], ctx, prefix_stmts),
+                              *[astconv_expr(c, ctx, prefix_stmts)
+                                for c in children[1:]])
+        if ctx.cooperative:
+            # the called coroutine (or the result of an extern function) is
+            # passed to the scheduler, which sends back the result
+            return ast.Yield(value=call_astpy)
+        return call_astpy
     else:
         raise CompileError('Unsupportet Expression {!r}'
-                            .format(expr_astc.kind.name))
+                            .format(expr_astc.kind))
+
+def astconv_incdec(incdec_astc, ctx, prefix_stmts):
+    """
+    converts an increment/decrement operator to an in-place operation.
+    Returns the modified lvalue (which is the value of the prefix
+    operators).
+    """
+    [lvalue_astc] = incdec_astc.children
+    lvalue_astpy = astconv_expr(lvalue_astc, ctx, prefix_stmts)
+    prefix_stmts.append(ast.Expr(call(
+        attr(lvalue_astpy, INCDEC_METHODS[incdec_astc.operator]),
+        ast.Num(n=1))))
+    add_write_trace(lvalue_astc, lvalue_astpy, ctx, prefix_stmts)
+    return lvalue_astpy
+
+def get_direct_callee(call_astc, ctx):
+    """
+    returns the FUNCTION_DECL of the called function, if the call can be
+    done via the direct entry of the callee (which is only the case for
+    functions defined in the same translation unit). Otherwise None.
+    """
+    callee_astc = call_astc.children[0]
+    while callee_astc.kind == 'UNEXPOSED_EXPR':
+        [callee_astc] = callee_astc.children
+    if callee_astc.kind != 'DECL_REF_EXPR' or \
+            (ctx.local_names is not None and
+             callee_astc.spelling in ctx.local_names):
+        return None
+    func_decl_astc = ctx.direct_funcs.get(callee_astc.spelling)
+    if func_decl_astc is None or \
+            len(func_params(func_decl_astc)) != len(call_astc.children) - 1:
+        return None
+    return func_decl_astc
+
+def is_temporary_of_type(expr_astc, type_astc, ctx):
+    """
+    returns True, if the python code generated for expr_astc will create a
+    new CObj of type type_astc (which can be passed as parameter to a
+    function without creating a copy)
+    """
+    while expr_astc.kind == 'PAREN_EXPR':
+        [expr_astc] = expr_astc.children
+    if expr_astc.type is not type_astc:
+        return False
+    elif expr_astc.kind == 'INTEGER_LITERAL':
+        return type_astc.kind == 'INT'
+    elif expr_astc.kind == 'CALL_EXPR':
+        return get_direct_callee(expr_astc, ctx) is not None
+    else:
+        return False
+
+def is_returnable_struct(expr_astc, ctx):
+    """
+    returns True, if expr_astc is a struct of the function's result type,
+    that can be returned without creating a copy (a local variable/parameter
+    or a temporary, which are not accessible after returning)
+    """
+    while expr_astc.kind in ('UNEXPOSED_EXPR', 'PAREN_EXPR'):
+        [expr_astc] = expr_astc.children
+    result_type = ctx.func_result_type
+    if result_type.kind != 'RECORD' or expr_astc.type is not result_type:
+        return False
+    elif expr_astc.kind == 'DECL_REF_EXPR':
+        return expr_astc.spelling in ctx.local_names
+    else:
+        return is_temporary_of_type(expr_astc, result_type, ctx)
+
+def astconv_direct_call(call_astc, func_decl_astc, ctx, prefix_stmts):
+    """
+    Calls the direct entry of a C function (see astconv_func_decl()).
+    The parameters are casted by the caller (if required at all).
+    """
+    args_astpy = [attr('__globals__')]
+    for arg_astc, param_astc in zip(call_astc.children[1:],
+                                    func_params(func_decl_astc)):
+        arg_astpy = astconv_assigned_value(arg_astc, param_astc.type, ctx,
+                                           prefix_stmts)
+        if not is_temporary_of_type(arg_astc, param_astc.type, ctx):
+            arg_astpy = call(ctype_astpy(param_astc.type), arg_astpy)
+        args_astpy.append(arg_astpy)
+    return call(attr(direct_entry_name(func_decl_astc.spelling)),
+                *args_astpy)
+
+def astconv_operand(expr_astc, ctx, prefix_stmts):
+    """
+    Like astconv_expr(), but int literals are returned as plain python
+    integers instead of CObjs. Only valid for operands of operations,
+    that accept python integers as replacement for C ints.
+    """
+    while expr_astc.kind in ('UNEXPOSED_EXPR', 'PAREN_EXPR') and \
+            expr_astc.type.kind == 'INT':
+        [expr_astc] = expr_astc.children
+    if expr_astc.kind == 'INTEGER_LITERAL' and expr_astc.type.kind == 'INT':
+        return ast.Num(n=expr_astc.value)
+    else:
+        return astconv_expr(expr_astc, ctx, prefix_stmts)
 
 @with_src_location()
 def astconv_var_decl(var_decl_astc, ctx, prefix_stmts):
-    init_val_list = list(var_decl_astc.get_children())
-    if var_decl_astc.type.spelling.startswith('struct '):
-        c_struct_name = var_decl_astc.type.spelling.replace(' ', '_')
-        type_astpy = attr('__globals__', c_struct_name)
-        del init_val_list[0]
-    else:
-        type_astpy = attr('__globals__', TYPE_MAP[var_decl_astc.type.kind])
+    init_val_list = [child_astc
+                     for child_astc in var_decl_astc.children
+                     if child_astc.is_expr]
+    type_astpy = ctype_astpy(var_decl_astc.type)
     if len(init_val_list) == 0:
         args = []
     else:
-        arg = astconv_expr(init_val_list[0], ctx, prefix_stmts)
+        arg = astconv_assigned_value(init_val_list[0], var_decl_astc.type,
+                                     ctx, prefix_stmts)
         if isinstance(arg, ast.Tuple):
             args = arg.elts
         else:
@@ -169,79 +878,539 @@ def astconv_var_decl(var_decl_astc, ctx, prefix_stmts):
         target = attr(var_decl_astc.spelling)
         ctx.local_names.add(var_decl_astc.spelling)
     target.ctx = ast.Store()
+    value_astpy = call(type_astpy, *args)
+    if ctx.local_names is None and var_decl_astc.type.is_const:
+        # const globals with constant initializers are created by
+        # CProgram.init_const_segment()
+        value_astpy = call(attr('datamodel', 'make_readonly'), value_astpy)
     return ast.Assign(
         targets=[target],
-        value=call(type_astpy, *args))
+        value=value_astpy)
+
+def astconv_block_item(stmt_astc, ctx, prefix_stmts):
+    """
+    converts a statement or declaration of a block
+    """
+    if stmt_astc.kind == 'DECL_STMT':
+        [child_astc] = stmt_astc.children
+        add_line_probe(stmt_astc, ctx, prefix_stmts)
+        return astconv_var_decl(child_astc, ctx, prefix_stmts)
+    else:
+        return astconv_stmt(stmt_astc, ctx, prefix_stmts)
 
 def astconv_compound_stmt(comp_stmt_astc, ctx, prefix_stmts):
-    for stmt_astc in comp_stmt_astc.get_children():
-        if stmt_astc.kind.name == 'DECL_STMT':
-            [child_astc] = stmt_astc.get_children()
-            stmt_astpy = astconv_var_decl(child_astc, ctx, prefix_stmts)
-        else:
-            stmt_astpy = astconv_stmt(stmt_astc, ctx, prefix_stmts)
-        prefix_stmts.append(stmt_astpy)
+    for stmt_astc in comp_stmt_astc.children:
+        prefix_stmts.append(astconv_block_item(stmt_astc, ctx, prefix_stmts))
     return ast.Pass()
 
 @with_src_location()
 def astconv_if_stmt(if_stmt_astc, ctx, prefix_stmts):
-    children = list(if_stmt_astc.get_children())
-    return ast.If(
-        test=astconv_expr(children[0], ctx, prefix_stmts),
+    children = if_stmt_astc.children
+    if_astpy = ast.If(
+        test=astconv_condition(children[0], ctx, prefix_stmts),
         body=to_stmt_list(children[1], ctx),
         orelse=([] if len(children) != 3
                 else to_stmt_list(children[2], ctx)))
+    add_branch_probes(if_stmt_astc, ctx, if_astpy.body, if_astpy.orelse)
+    return if_astpy
+
+def preemption_point(ctx):
+    """
+    returns the statements, that are inserted at the beginning of every loop
+    iteration (a yield in cooperative mode, see cymu.scheduler)
+    """
+    if ctx.cooperative:
+        return [ast.Expr(value=ast.Yield(value=None))]
+    else:
+        return []
+
+def return_value(value_astpy, ctx):
+    """
+    returns the statement for returning from a C function
+    """
+    if ctx.cooperative and value_astpy is not None:
+        # python 2 does not support returning values from generators
+        return ast.Raise(type=call(attr('__scheduler__', 'Return'),
+                                   value_astpy),
+                         inst=None,
+                         tback=None)
+    else:
+        return ast.Return(value=value_astpy)
+
+@contextlib.contextmanager
+def jump_scope(ctx, is_loop):
+    """
+    context manager, that makes a new JumpScope the target of the C
+    break/continue statements converted within its body
+
+    :rtype: JumpScope
+    """
+    scope = JumpScope(is_loop)
+    ctx.jump_scopes.append(scope)
+    try:
+        yield scope
+    finally:
+        ctx.jump_scopes.pop()
+
+def unique_name(ctx, prefix):
+    """
+    returns a new name for a helper variable of the generated code
+    """
+    ctx.helper_name_count += 1
+    return '__{}{}__'.format(prefix, ctx.helper_name_count - 1)
+
+def skip_first_iteration(flag_name, stmts_astpy, prefix_stmts):
+    """
+    Returns a statement for the beginning of a loop body, that runs
+    *stmts_astpy* in all but the first iteration.
+    This is used for code that C runs at the end of the loop body (i.e. the
+    increment of a for statement), if the loop body contains continue
+    statements (as python's continue would skip the code at the end).
+    """
+    prefix_stmts.append(ast.Assign(
+        targets=[ast.Name(id=flag_name, ctx=ast.Store())],
+        value=ast.Name(id='True', ctx=ast.Load())))
+    return ast.If(
+        test=ast.Name(id=flag_name, ctx=ast.Load()),
+        body=[ast.Assign(targets=[ast.Name(id=flag_name, ctx=ast.Store())],
+                         value=ast.Name(id='False', ctx=ast.Load()))],
+        orelse=stmts_astpy)
 
 @with_src_location()
 def astconv_while_stmt(while_stmt_astc, ctx, prefix_stmts):
-    [exit_cond_astc, body_astc] = while_stmt_astc.get_children()
-    exit_check_prefix_stmts = []
+    [exit_cond_astc, body_astc] = while_stmt_astc.children
+    exit_check_prefix_stmts = preemption_point(ctx)
     exit_check_astpy = ast.If(
         test=ast.UnaryOp(
             op=ast.Not(),
-            operand=astconv_expr(exit_cond_astc, ctx,
-                                 exit_check_prefix_stmts)),
+            operand=astconv_condition(exit_cond_astc, ctx,
+                                      exit_check_prefix_stmts)),
         body=[ast.Break()],
         orelse=[])
+    with jump_scope(ctx, is_loop=True):
+        loop_body_astpy = to_stmt_list(body_astc, ctx)
+    add_branch_probes(while_stmt_astc, ctx,
+                      loop_body_astpy, exit_check_astpy.body)
     return ast.While(
         test=ast.Name(id='True', ctx=ast.Load()),
-        body=exit_check_prefix_stmts + [exit_check_astpy] +
-             to_stmt_list(body_astc, ctx),
+        body=exit_check_prefix_stmts + [exit_check_astpy] + loop_body_astpy,
         orelse=[])
 
 @with_src_location()
 def astconv_dowhile_stmt(dowhile_stmt_astc, ctx, prefix_stmts):
-    [body_astc, exit_cond_astc] = dowhile_stmt_astc.get_children()
+    [body_astc, exit_cond_astc] = dowhile_stmt_astc.children
     exit_check_prefix_stmts = []
     exit_check_astpy = ast.If(
         test=ast.UnaryOp(
             op=ast.Not(),
-            operand=astconv_expr(exit_cond_astc, ctx,
-                                 exit_check_prefix_stmts)),
+            operand=astconv_condition(exit_cond_astc, ctx,
+                                      exit_check_prefix_stmts)),
         body=[ast.Break()],
         orelse=[])
+    add_branch_probes(dowhile_stmt_astc, ctx,
+                      exit_check_astpy.orelse, exit_check_astpy.body)
+    with jump_scope(ctx, is_loop=True) as scope:
+        loop_body_astpy = to_stmt_list(body_astc, ctx)
+    exit_check_astpy = exit_check_prefix_stmts + [exit_check_astpy]
+    if scope.continued:
+        # the exit check is moved to the beginning of the loop body, as
+        # a continue has to run it
+        set_src_location(exit_check_astpy, dowhile_stmt_astc.location)
+        return ast.While(
+            test=ast.Name(id='True', ctx=ast.Load()),
+            body=[skip_first_iteration(unique_name(ctx, 'first'),
+                                       exit_check_astpy, prefix_stmts)] +
+                 preemption_point(ctx) + loop_body_astpy,
+            orelse=[])
     return ast.While(
         test=ast.Name(id='True', ctx=ast.Load()),
-        body=to_stmt_list(body_astc, ctx) +
-             exit_check_prefix_stmts + [exit_check_astpy],
+        body=preemption_point(ctx) + loop_body_astpy + exit_check_astpy,
         orelse=[])
 
+def written_var_names(stmt_astc):
+    """
+    returns the names of all variables, that are assigned/declared within
+    a statement (accesses via pointers are not included)
+
+    :rtype: set[str]
+    """
+    names = set()
+    for node_astc in stmt_astc.iter_nodes():
+        if node_astc.kind == 'VAR_DECL':
+            names.add(node_astc.spelling)
+        elif (node_astc.kind in ('BINARY_OPERATOR', 'UNARY_OPERATOR') and
+              node_astc.operator in analysis.ASSIGNMENT_OPERATORS) or \
+                node_astc.kind == 'COMPOUND_ASSIGNMENT_OPERATOR':
+            lvalue_astc = skip_implicit_exprs(node_astc.children[0])
+            if lvalue_astc.kind == 'DECL_REF_EXPR':
+                names.add(lvalue_astc.spelling)
+    return names
+
+def addr_taken_var_names(func_decl_astc):
+    """
+    returns the names of all variables, whose address is taken within a
+    function
+
+    :rtype: set[str]
+    """
+    names = set()
+    for node_astc in func_decl_astc.iter_nodes():
+        if node_astc.kind == 'UNARY_OPERATOR' and \
+                node_astc.operator == 'ADDR_OF':
+            operand_astc = skip_implicit_exprs(node_astc.children[0])
+            if operand_astc.kind == 'DECL_REF_EXPR':
+                names.add(operand_astc.spelling)
+    return names
+
+def is_var_ref(expr_astc, name):
+    expr_astc = skip_implicit_exprs(expr_astc)
+    return expr_astc.kind == 'DECL_REF_EXPR' and expr_astc.spelling == name
+
+def counted_loop(for_stmt_astc, ctx):
+    """
+    checks if a for statement is a counted loop of the form
+
+        for (i = start; i < stop; i++)
+
+    (or 'i <= stop' for signed types, '++i', 'i += 1'), where i is a local
+    integer variable and stop is an integer literal or another local
+    variable. Neither i nor stop may be modified within the loop body and
+    their addresses may not be taken.
+
+    :rtype: (str, frontend.Node, bool) | None
+    :return: the name of i, the stop expression and if stop is inclusive
+        or None if the for statement is no counted loop
+    """
+    init_astc, cond_astc, inc_astc, body_astc = for_stmt_astc.children
+    if init_astc.kind == 'DECL_STMT' and len(init_astc.children) == 1 and \
+            init_astc.children[0].children:
+        [var_decl_astc] = init_astc.children
+        name, var_type_astc = var_decl_astc.spelling, var_decl_astc.type
+    elif init_astc.kind == 'BINARY_OPERATOR' and \
+            init_astc.operator == 'ASSIGN':
+        lvalue_astc = skip_implicit_exprs(init_astc.children[0])
+        if lvalue_astc.kind != 'DECL_REF_EXPR' or \
+                lvalue_astc.spelling not in ctx.local_names:
+            return None
+        name, var_type_astc = lvalue_astc.spelling, lvalue_astc.type
+    else:
+        return None
+    if var_type_astc.kind not in TYPE_MAP or \
+            name in ctx.addr_taken_names:
+        return None
+    var_ctype = getattr(CProgram, TYPE_MAP[var_type_astc.kind])
+    if not var_ctype.signed and var_ctype.bits >= 64:
+        # may exceed the value range of xrange()
+        return None
+
+    if cond_astc.kind != 'BINARY_OPERATOR' or \
+            cond_astc.operator not in ('LT', 'LE') or \
+            (cond_astc.operator == 'LE' and not var_ctype.signed):
+        # 'i <= stop' is only allowed for signed types, as it would be an
+        # endless loop if stop is the maximum unsigned value
+        return None
+    left_astc, right_astc = cond_astc.children
+    if not is_var_ref(left_astc, name) or \
+            left_astc.type.kind != var_type_astc.kind or \
+            right_astc.type.kind != var_type_astc.kind:
+        # the comparison is done in another type than the type of i
+        return None
+    stop_astc = skip_implicit_exprs(right_astc)
+    if stop_astc.kind == 'DECL_REF_EXPR':
+        stop_name = stop_astc.spelling
+        if stop_name not in ctx.local_names or stop_name == name or \
+                stop_name in ctx.addr_taken_names:
+            return None
+    elif stop_astc.kind == 'INTEGER_LITERAL':
+        stop_name = None
+    else:
+        return None
+
+    if inc_astc.kind == 'UNARY_OPERATOR':
+        if inc_astc.operator not in ('PRE_INC', 'POST_INC') or \
+                not is_var_ref(inc_astc.children[0], name):
+            return None
+    elif inc_astc.kind == 'COMPOUND_ASSIGNMENT_OPERATOR':
+        step_astc = skip_implicit_exprs(inc_astc.children[1])
+        if inc_astc.operator != 'ADD_ASSIGN' or \
+                not is_var_ref(inc_astc.children[0], name) or \
+                step_astc.kind != 'INTEGER_LITERAL' or step_astc.value != 1:
+            return None
+    else:
+        return None
+
+    written_names = written_var_names(body_astc)
+    if name in written_names or stop_name in written_names:
+        return None
+    return name, right_astc, cond_astc.operator == 'LE'
+
+def astconv_counted_loop(for_stmt_astc, counted_loop_info, ctx,
+                         prefix_stmts):
+    """
+    converts a counted loop (see counted_loop()) to a python for loop over
+    the raw integer values of the loop variable. The loop variable's CObj is
+    only updated in every iteration if its value may be observed within the
+    loop (it is referred or the loop can be left by break).
+    """
+    init_astc, cond_astc, inc_astc, body_astc = for_stmt_astc.children
+    name, stop_astc, inclusive = counted_loop_info
+    prefix_stmts.append(astconv_block_item(init_astc, ctx, prefix_stmts))
+    stop_astpy = call(attr('int'),
+                      astconv_expr(stop_astc, ctx, prefix_stmts))
+    if inclusive:
+        stop_astpy = ast.BinOp(left=stop_astpy, op=ast.Add(),
+                               right=ast.Num(n=1))
+    stop_var = unique_name(ctx, 'stop')
+    prefix_stmts.append(ast.Assign(
+        targets=[ast.Name(id=stop_var, ctx=ast.Store())],
+        value=stop_astpy))
+    loop_var = unique_name(ctx, 'for')
+    with jump_scope(ctx, is_loop=True):
+        loop_body_astpy = to_stmt_list(body_astc, ctx)
+    if any(node_astc.kind == 'BREAK_STMT' or is_var_ref(node_astc, name)
+           for node_astc in body_astc.iter_nodes()):
+        loop_body_astpy.insert(0, ast.Assign(
+            targets=[ast.Attribute(value=attr(name), attr='val',
+                                   ctx=ast.Store())],
+            value=ast.Name(id=loop_var, ctx=ast.Load())))
+        fix_src_locations(loop_body_astpy)
+    if init_astc.kind == 'DECL_STMT':
+        # the loop variable is not visible after the loop
+        exit_astpy = []
+    else:
+        # i gets the value, that failed the loop condition (which is the
+        # start value, if the loop was not entered at all)
+        exit_astpy = [ast.If(
+            test=ast.Compare(left=call(attr('int'), attr(name)),
+                             ops=[ast.Lt()],
+                             comparators=[ast.Name(id=stop_var,
+                                                   ctx=ast.Load())]),
+            body=[ast.Assign(
+                targets=[ast.Attribute(value=attr(name), attr='val',
+                                       ctx=ast.Store())],
+                value=ast.Name(id=stop_var, ctx=ast.Load()))],
+            orelse=[])]
+    add_branch_probes(for_stmt_astc, ctx, loop_body_astpy, exit_astpy)
+    set_src_location(exit_astpy, for_stmt_astc.end_location)
+    # xrange() is imported under a reserved name, as C names (i.e. of local
+    # variables) could shadow the builtin
+    ctx.uses_xrange = True
+    return ast.For(
+        target=ast.Name(id=loop_var, ctx=ast.Store()),
+        iter=call(attr('__xrange__'),
+                  call(attr('int'), attr(name)),
+                  ast.Name(id=stop_var, ctx=ast.Load())),
+        body=preemption_point(ctx) + loop_body_astpy,
+        orelse=exit_astpy)
+
+@with_src_location()
+def astconv_for_stmt(for_stmt_astc, ctx, prefix_stmts):
+    """
+    Counted loops are converted by astconv_counted_loop(). All other for
+    statements are converted like while statements (with the increment at
+    the end of the loop body).
+    """
+    counted_loop_info = counted_loop(for_stmt_astc, ctx)
+    if counted_loop_info is not None:
+        return astconv_counted_loop(for_stmt_astc, counted_loop_info, ctx,
+                                    prefix_stmts)
+    init_astc, cond_astc, inc_astc, body_astc = for_stmt_astc.children
+    prefix_stmts.append(astconv_block_item(init_astc, ctx, prefix_stmts))
+    exit_check_prefix_stmts = preemption_point(ctx)
+    if cond_astc.kind == 'NULL_STMT':
+        exit_check_astpy = []
+    else:
+        exit_check_astpy = [ast.If(
+            test=ast.UnaryOp(
+                op=ast.Not(),
+                operand=astconv_condition(cond_astc, ctx,
+                                          exit_check_prefix_stmts)),
+            body=[ast.Break()],
+            orelse=[])]
+    with jump_scope(ctx, is_loop=True) as scope:
+        loop_body_astpy = to_stmt_list(body_astc, ctx)
+    inc_astpy = ([] if inc_astc.kind == 'NULL_STMT'
+                 else to_stmt_list(inc_astc, ctx))
+    if exit_check_astpy:
+        add_branch_probes(for_stmt_astc, ctx,
+                          loop_body_astpy, exit_check_astpy[0].body)
+    loop_body_astpy = exit_check_prefix_stmts + exit_check_astpy + \
+        loop_body_astpy
+    if scope.continued and inc_astpy:
+        # the increment is moved to the beginning of the loop body, as a
+        # continue has to run it
+        loop_body_astpy.insert(0, skip_first_iteration(
+            unique_name(ctx, 'first'), inc_astpy, prefix_stmts))
+    else:
+        set_src_location(inc_astpy, for_stmt_astc.end_location)
+        loop_body_astpy += inc_astpy
+    return ast.While(
+        test=ast.Name(id='True', ctx=ast.Load()),
+        body=loop_body_astpy,
+        orelse=[])
+
+def case_value(label_astc, switch_type_astc):
+    """
+    returns the value of the constant expression of a case label converted
+    to the type of the switch expression
+    """
+    label_astc = skip_implicit_exprs(label_astc)
+    if label_astc.kind == 'INTEGER_LITERAL':
+        value = label_astc.value
+    elif label_astc.kind == 'UNARY_OPERATOR' and \
+            label_astc.operator in ('MINUS', 'PLUS'):
+        value = case_value(label_astc.children[0], switch_type_astc)
+        if label_astc.operator == 'MINUS':
+            value = -value
+    else:
+        raise CompileError('Unsupported case label {!r} (only integer '
+                           'literals are supported)'.format(label_astc.kind))
+    if switch_type_astc.kind in TYPE_MAP:
+        value = getattr(CProgram, TYPE_MAP[switch_type_astc.kind]).wrap(value)
+    return value
+
+def switch_segments(switch_stmt_astc, ctx):
+    """
+    splits the body of a switch statement at its case/default labels into
+    segments (every segment falls through into the next one).
+
+    :rtype: (list[list[ast.AST]], dict[int, int], int)
+    :return: the python statements of every segment, the case values
+        mapped to the index of their segment and the index of the segment
+        of the default label (None if there is none)
+    """
+    [cond_astc, body_astc] = switch_stmt_astc.children
+    body_items_astc = (body_astc.children
+                       if body_astc.kind == 'COMPOUND_STMT' else [body_astc])
+    segments_astpy = []
+    case_table = {}
+    default_ndx = None
+    for stmt_astc in body_items_astc:
+        if stmt_astc.kind in ('CASE_STMT', 'DEFAULT_STMT') and \
+                (not segments_astpy or segments_astpy[-1]):
+            segments_astpy.append([])
+        while stmt_astc.kind in ('CASE_STMT', 'DEFAULT_STMT'):
+            if stmt_astc.kind == 'CASE_STMT':
+                label_astc, stmt_astc = stmt_astc.children
+                case_table[case_value(label_astc, cond_astc.type)] = \
+                    len(segments_astpy) - 1
+            else:
+                [stmt_astc] = stmt_astc.children
+                default_ndx = len(segments_astpy) - 1
+        if not segments_astpy:
+            # statements before the first label are unreachable
+            continue
+        segment_astpy = segments_astpy[-1]
+        segment_astpy.append(astconv_block_item(stmt_astc, ctx,
+                                                segment_astpy))
+    for segment_astpy in segments_astpy:
+        fix_src_locations(segment_astpy)
+    return segments_astpy, case_table, default_ndx
+
+def segment_dispatch_tree(segments_astpy, case_var, start, stop):
+    """
+    returns the statements, that run the segments start ... stop-1 beginning
+    with the segment whose index is stored in the variable *case_var*.
+    The segments are nested into a binary tree of comparisons, so only
+    O(log(n)) comparisons are required to reach the first segment. Then
+    all following segments are run (fall through) until a break.
+    """
+    if stop - start == 1:
+        return segments_astpy[start]
+    mid = (start + stop) // 2
+    return [ast.If(
+        test=ast.Compare(left=ast.Name(id=case_var, ctx=ast.Load()),
+                         ops=[ast.Lt()],
+                         comparators=[ast.Num(n=mid)]),
+        body=segment_dispatch_tree(segments_astpy, case_var, start, mid),
+        orelse=[])] + \
+        segment_dispatch_tree(segments_astpy, case_var, mid, stop)
+
+@with_src_location()
+def astconv_switch_stmt(switch_stmt_astc, ctx, prefix_stmts):
+    """
+    The value of the switch expression is mapped to the index of the
+    segment of the matching label (see switch_segments()) by a constant
+    dict, that is created once per switch statement at module level.
+    The segments are run within a one-shot loop, which is left after the
+    last segment, so that C's break can be mapped to python's break.
+    """
+    cond_astc = switch_stmt_astc.children[0]
+    cond_astpy = astconv_expr(cond_astc, ctx, prefix_stmts)
+    with jump_scope(ctx, is_loop=False) as scope:
+        segments_astpy, case_table, default_ndx = \
+            switch_segments(switch_stmt_astc, ctx)
+    if not segments_astpy:
+        return ast.Expr(value=cond_astpy)
+    add_branch_probes(switch_stmt_astc, ctx, *segments_astpy)
+    table_name = unique_name(ctx, 'switch')
+    case_var = unique_name(ctx, 'case')
+    ctx.module_stmts.append(ast.Assign(
+        targets=[ast.Name(id=table_name, ctx=ast.Store())],
+        value=ast.Dict(keys=[ast.Num(n=value)
+                             for value in sorted(case_table)],
+                       values=[ast.Num(n=case_table[value])
+                               for value in sorted(case_table)])))
+    # the index len(segments_astpy) (if no label matches) runs no segment
+    no_match_ndx = len(segments_astpy)
+    case_ndx_astpy = call(attr(table_name, 'get'),
+                          call(attr('int'), cond_astpy),
+                          ast.Num(n=no_match_ndx if default_ndx is None
+                                  else default_ndx))
+    # a C continue within the switch is converted to a python continue,
+    # which leaves the one-shot loop via its else clause, that continues
+    # the enclosing loop
+    return ast.For(
+        target=ast.Name(id=case_var, ctx=ast.Store()),
+        iter=ast.Tuple(elts=[case_ndx_astpy], ctx=ast.Load()),
+        body=segment_dispatch_tree(segments_astpy + [[]], case_var,
+                                   0, no_match_ndx + 1) + [ast.Break()],
+        orelse=continue_stmts(ctx) if scope.continued else [])
+
+@with_src_location()
+def astconv_break_stmt(break_stmt_astc, ctx, prefix_stmts):
+    return ast.Break()
+
+def continue_stmts(ctx):
+    """
+    returns the statements for a C continue within the innermost jump scope
+    """
+    for scope in reversed(ctx.jump_scopes):
+        scope.continued = True
+        if scope.is_loop:
+            break
+    else:
+        raise CompileError('continue statement not within a loop')
+    return [ast.Continue()]
+
+@with_src_location()
+def astconv_continue_stmt(continue_stmt_astc, ctx, prefix_stmts):
+    [continue_astpy] = continue_stmts(ctx)
+    return continue_astpy
+
 @with_src_location()
 def astconv_return_stmt(return_stmt_astc, ctx, prefix_stmts):
-    children = list(return_stmt_astc.get_children())
-    if ctx.func_result_type.kind.name == 'VOID':
+    children = return_stmt_astc.children
+    if ctx.func_result_type.kind == 'VOID':
         assert len(children) == 0
         result_astpy = None
     else:
         assert len(children) == 1
-        type_name = TYPE_MAP[ctx.func_result_type.kind]
-        result_astpy = call(
-            attr('__globals__', type_name),
-            astconv_expr(children[0], ctx, prefix_stmts))
-    return ast.Return(value=result_astpy)
+        result_astpy = astconv_assigned_value(
+            children[0], ctx.func_result_type, ctx, prefix_stmts)
+        if not is_returnable_struct(children[0], ctx):
+            result_astpy = call(ctype_astpy(ctx.func_result_type),
+                                result_astpy)
+    return return_value(result_astpy, ctx)
 
 @with_src_location()
 def astconv_expr_as_stmt(stmt_astc, ctx, prefix_stmts):
+    if stmt_astc.kind == 'UNARY_OPERATOR' and \
+            stmt_astc.operator in INCDEC_METHODS:
+        # as the value is not used, postfix and prefix operators are
+        # equivalent
+        astconv_incdec(stmt_astc, ctx, prefix_stmts)
+        return ast.Pass()
     ctx.enforce_expr_exec = False
     expr_astpy = astconv_expr(stmt_astc, ctx, prefix_stmts)
     if ctx.enforce_expr_exec:
@@ -250,18 +1419,31 @@ def astconv_expr_as_stmt(stmt_astc, ctx, prefix_stmts):
         return ast.Pass()
 
 def astconv_stmt(stmt_astc, ctx, prefix_stmts):
-    if stmt_astc.kind.name == 'IF_STMT':
+    if stmt_astc.kind not in ('COMPOUND_STMT', 'NULL_STMT'):
+        add_line_probe(stmt_astc, ctx, prefix_stmts)
+    if stmt_astc.kind == 'IF_STMT':
         return astconv_if_stmt(stmt_astc, ctx, prefix_stmts)
-    elif stmt_astc.kind.name == 'NULL_STMT':
+    elif stmt_astc.kind == 'NULL_STMT':
         return ast.Pass()
-    elif stmt_astc.kind.name == 'WHILE_STMT':
+    elif stmt_astc.kind == 'WHILE_STMT':
         return astconv_while_stmt(stmt_astc, ctx, prefix_stmts)
-    elif stmt_astc.kind.name == 'DO_STMT':
+    elif stmt_astc.kind == 'DO_STMT':
         return astconv_dowhile_stmt(stmt_astc, ctx, prefix_stmts)
-    elif stmt_astc.kind.name == 'COMPOUND_STMT':
+    elif stmt_astc.kind == 'COMPOUND_STMT':
         return astconv_compound_stmt(stmt_astc, ctx, prefix_stmts)
-    elif stmt_astc.kind.name == 'RETURN_STMT':
+    elif stmt_astc.kind == 'RETURN_STMT':
         return astconv_return_stmt(stmt_astc, ctx, prefix_stmts)
+    elif stmt_astc.kind == 'SWITCH_STMT':
+        return astconv_switch_stmt(stmt_astc, ctx, prefix_stmts)
+    elif stmt_astc.kind == 'FOR_STMT':
+        return astconv_for_stmt(stmt_astc, ctx, prefix_stmts)
+    elif stmt_astc.kind == 'BREAK_STMT':
+        return astconv_break_stmt(stmt_astc, ctx, prefix_stmts)
+    elif stmt_astc.kind == 'CONTINUE_STMT':
+        return astconv_continue_stmt(stmt_astc, ctx, prefix_stmts)
+    elif stmt_astc.kind in ('CASE_STMT', 'DEFAULT_STMT'):
+        raise CompileError('case/default labels are only supported as '
+                           'statements of the switch body')
     else:
         return astconv_expr_as_stmt(stmt_astc, ctx, prefix_stmts)
 
@@ -275,68 +1457,180 @@ def to_stmt_list(stmt_astc, ctx):
     fix_src_locations(stmt_list)
     return stmt_list
 
-@with_src_location()
-def astconv_func_param(param_astc, ctx, prefix_stmts):
-    return ast.Assign(
-        targets=[ast.Name(id=param_astc.spelling, ctx=ast.Store())],
-        value=call(attr('__globals__', TYPE_MAP[param_astc.type.kind]),
-                   attr(param_astc.spelling)))
+def is_func_def(func_decl_astc):
+    return any(c.kind == 'COMPOUND_STMT' for c in func_decl_astc.children)
+
+def func_params(func_decl_astc):
+    return [c for c in func_decl_astc.children if c.kind == 'PARM_DECL']
+
+def direct_entry_name(func_name):
+    """
+    returns the name of the module level function, that implements the C
+    function *func_name* (see astconv_func_decl())
+    """
+    return '__c_{}__'.format(func_name)
 
 @with_src_location()
 def astconv_func_decl(func_decl_astc, ctx, prefix_stmts):
-    children = list(func_decl_astc.get_children())
-    if any(c.kind.name == 'COMPOUND_STMT' for c in children):
-        x = func_decl_astc.get_arguments()
+    """
+    Every C function definition is converted to a module level python
+    function (the "direct entry"), that expects its parameters already casted
+    to the parameter types (see astconv_direct_call()).
+    For python callers a method of the same name is added to CModule, that
+    casts the parameters and calls the direct entry. If the function has no
+    parameters, the direct entry is used as method.
+    The direct entry gets a reserved name (see direct_entry_name()), so that
+    C function names cannot shadow the names used by the generated code.
+    """
+    children = func_decl_astc.children
+    if is_func_def(func_decl_astc):
+        func_name = func_decl_astc.spelling
+        params_astc = func_params(func_decl_astc)
         ctx.local_names = { param_astc.spelling
-                            for param_astc in func_decl_astc.get_arguments() }
-        ctx.func_result_type = func_decl_astc.result_type
+                            for param_astc in params_astc }
+        ctx.func_result_type = func_decl_astc.type.result
+        ctx.addr_taken_names = addr_taken_var_names(func_decl_astc)
         params_astpy = \
             [ast.Name(id='__globals__', ctx=ast.Param())] + \
             [ast.Name(id=param_astc.spelling, ctx=ast.Param())
-             for param_astc in func_decl_astc.get_arguments()]
+             for param_astc in params_astc]
         vararg_astpy = (None if func_decl_astc.type.spelling.endswith('(void)')
                         else '_')
-        casted_param_astpy = [
-            astconv_func_param(param_astc, ctx, prefix_stmts)
-            for param_astc in func_decl_astc.get_arguments()]
-        if ctx.func_result_type.kind.name == 'VOID':
+        if ctx.coverage is None:
+            func_probe_astpy = []
+        else:
+            func_probe_astpy = [coverage_probe(ctx.coverage.add_func_probe(
+                func_decl_astc.location.filename,
+                func_decl_astc.location.line,
+                func_name))]
+        if ctx.trace is None:
+            func_trace_astpy = []
+        else:
+            enter_site_ndx, exit_site_ndx = ctx.trace.add_func_sites(
+                func_decl_astc.location.filename,
+                func_decl_astc.location.line,
+                func_decl_astc.end_location.line,
+                func_name)
+            func_trace_astpy = trace_probe(enter_site_ndx, ast.Num(n=0), ctx)
+        if ctx.func_result_type.kind == 'VOID':
             casted_result_astpy = []
         else:
-            casted_result_astpy = [ast.Return(value=call(
-                attr('__globals__', TYPE_MAP[ctx.func_result_type.kind])))]
-        func_astpy = ast.FunctionDef(
-            name=func_decl_astc.spelling,
+            casted_result_astpy = [return_value(
+                call(ctype_astpy(ctx.func_result_type)), ctx)]
+        if ctx.cooperative:
+            # ensure that the function is a generator, even if it contains
+            # no yield
+            casted_result_astpy += [
+                ast.copy_location(stmt_astpy,
+                                  src_location_end_marker(func_decl_astc))
+                for stmt_astpy in [ast.Return(value=None),
+                                   ast.Expr(value=ast.Yield(value=None))]]
+        func_body_astpy = (to_stmt_list(children[-1], ctx=ctx) +
+                           casted_result_astpy)
+        if ctx.trace is not None:
+            # leaving the function is recorded on every return (and
+            # exception)
+            func_body_astpy = [ast.copy_location(
+                ast.TryFinally(
+                    body=func_body_astpy,
+                    finalbody=[ast.copy_location(
+                        stmt_astpy, src_location_end_marker(func_decl_astc))
+                        for stmt_astpy in trace_probe(exit_site_ndx,
+                                                      ast.Num(n=0), ctx)]),
+                func_body_astpy[0])]
+        direct_func_astpy = ast.FunctionDef(
+            name=direct_entry_name(func_name),
             decorator_list=[],
             args=ast.arguments(args=params_astpy,
-                               vararg=vararg_astpy,
+                               vararg=None if params_astc else vararg_astpy,
                                kwarg=None,
                                defaults=[]),
-            body=casted_param_astpy +
-                 to_stmt_list(children[-1], ctx=ctx) +
-                 casted_result_astpy +
+            body=func_probe_astpy +
+                 func_trace_astpy +
+                 func_body_astpy +
                  [src_location_end_marker(func_decl_astc)])
+        direct_func_astpy.lineno = func_decl_astc.location.line
+        direct_func_astpy.col_offset = func_decl_astc.location.column - 1
+        ctx.module_stmts.append(direct_func_astpy)
         del ctx.local_names
         del ctx.func_result_type
-        return func_astpy
+        del ctx.addr_taken_names
+
+        if not params_astc:
+            ctx.module_stmts.append(ast.copy_location(
+                ast.Assign(
+                    targets=[ast.Attribute(value=attr('CModule'),
+                                           attr=func_name,
+                                           ctx=ast.Store())],
+                    value=attr(direct_entry_name(func_name))),
+                direct_func_astpy))
+            return ast.Pass()
+        else:
+            return ast.FunctionDef(
+                name=func_name,
+                decorator_list=[],
+                args=ast.arguments(args=params_astpy,
+                                   vararg=vararg_astpy,
+                                   kwarg=None,
+                                   defaults=[]),
+                body=[ast.Return(value=call(
+                    attr(direct_entry_name(func_name)),
+                    attr('__globals__'),
+                    *[call(ctype_astpy(param_astc.type),
+                           attr(param_astc.spelling))
+                      for param_astc in params_astc]))])
+    elif func_decl_astc.spelling not in ctx.direct_funcs:
+        return astconv_extern_proto(func_decl_astc, ctx, prefix_stmts)
     else:
         return ast.Pass()
 
+def is_supported_type(type_astc):
+    if type_astc.kind == 'POINTER':
+        return is_supported_type(type_astc.pointee)
+    else:
+        return type_astc.kind in TYPE_MAP or type_astc.kind == 'RECORD'
+
+def astconv_extern_proto(func_decl_astc, ctx, prefix_stmts):
+    """
+    Stores the prototype of a declared (but not defined) function in
+    CModule.__extern_protos__ (see cymu.externs).
+    Values of types, that are not supported by cymu, are passed unconverted.
+    """
+    ctx.has_extern_protos = True
+    result_type_astc = func_decl_astc.type.result
+    if is_supported_type(result_type_astc):
+        result_ctype_astpy = ctype_astpy(result_type_astc, in_class_body=True)
+    else:
+        result_ctype_astpy = ast.Name(id='None', ctx=ast.Load())
+    param_ctypes_astpy = [
+        ctype_astpy(param_astc.type, in_class_body=True)
+        if is_supported_type(param_astc.type) else
+        ast.Name(id='None', ctx=ast.Load())
+        for param_astc in func_params(func_decl_astc)]
+    variadic = (func_decl_astc.type.kind == 'FUNCTIONNOPROTO' or
+                func_decl_astc.type.spelling.endswith('...)'))
+    return ast.Assign(
+        targets=[ast.Subscript(
+            value=ast.Name(id='__extern_protos__', ctx=ast.Load()),
+            slice=ast.Index(value=ast.Str(s=func_decl_astc.spelling)),
+            ctx=ast.Store())],
+        value=ast.Tuple(
+            elts=[result_ctype_astpy,
+                  ast.List(elts=param_ctypes_astpy, ctx=ast.Load()),
+                  ast.Name(id=str(variadic), ctx=ast.Load())],
+            ctx=ast.Load()))
+
 @with_src_location()
 def astconv_struct_decl(struct_decl_astc, ctx, prefix_stmts):
     field_astpy_list = []
-    for decl_astc in struct_decl_astc.get_children():
-        if decl_astc.kind.name == 'FIELD_DECL':
-            type_name = decl_astc.type.spelling
-            if type_name.startswith('struct '):
-                type_astpy = attr(type_name.replace(' ', '_'))
-            else:
-                type_astpy = attr('datamodel', 'CProgram',
-                                  TYPE_MAP[decl_astc.type.kind])
+    for decl_astc in struct_decl_astc.children:
+        if decl_astc.kind == 'FIELD_DECL':
+            type_astpy = ctype_astpy(decl_astc.type, in_class_body=True)
             field_astpy_list.append(
                 ast.Tuple(
                     elts=[ast.Str(s=decl_astc.spelling), type_astpy],
                     ctx=ast.Load()))
-        elif decl_astc.kind.name == 'STRUCT_DECL':
+        elif decl_astc.kind == 'STRUCT_DECL':
             substruct_astpy = astconv_struct_decl(
                 decl_astc, ctx, prefix_stmts)
             prefix_stmts.append(substruct_astpy)
@@ -348,37 +1642,227 @@ def astconv_struct_decl(struct_decl_astc, ctx, prefix_stmts):
                    ast.Str(s=struct_decl_astc.spelling),
                    ast.List(elts=field_astpy_list, ctx=ast.Load())))
 
+def const_initializer(expr_astc):
+    """
+    returns the value of a constant initializer as python object (an int
+    or a tuple for initializer lists) or None if the initializer is not
+    constant
+    """
+    while expr_astc.kind in ('UNEXPOSED_EXPR', 'PAREN_EXPR'):
+        [expr_astc] = expr_astc.children
+    if expr_astc.kind == 'INTEGER_LITERAL':
+        return expr_astc.value
+    elif expr_astc.kind == 'INIT_LIST_EXPR':
+        elts = [const_initializer(child) for child in expr_astc.children]
+        if None in elts:
+            return None
+        return tuple(elts)
+    else:
+        return None
+
+def const_astpy(value):
+    if isinstance(value, tuple):
+        return ast.Tuple(elts=map(const_astpy, value), ctx=ast.Load())
+    else:
+        return ast.Num(n=value)
+
+def global_table_entry(var_decl_astc):
+    """
+    returns the entry of CModule.__global_table__ (see
+    datamodel.CProgram.init_global_table()) for a global variable
+    declaration or None if its initializer is not constant
+    """
+    init_val_list = [child_astc
+                     for child_astc in var_decl_astc.children
+                     if child_astc.is_expr]
+    if len(init_val_list) == 0:
+        args = ()
+    else:
+        init_val = const_initializer(init_val_list[0])
+        if init_val is None:
+            return None
+        elif init_val_list[0].kind == 'INIT_LIST_EXPR':
+            args = init_val
+        else:
+            args = (init_val,)
+    return ast.Tuple(
+        elts=[ast.Str(s=var_decl_astc.spelling),
+              ctype_astpy(var_decl_astc.type, in_class_body=True),
+              const_astpy(args)],
+        ctx=ast.Load())
+
+def chunk_global_vars(var_decls_astpy):
+    """
+    moves the statements for initializing global variables into methods
+    of at most GLOBAL_VARS_CHUNK_SIZE statements.
+
+    :return: the methods and the statements, that call the methods
+    """
+    chunk_funcs_astpy = []
+    calls_astpy = []
+    for start in range(0, len(var_decls_astpy), GLOBAL_VARS_CHUNK_SIZE):
+        chunk_astpy = var_decls_astpy[start:start+GLOBAL_VARS_CHUNK_SIZE]
+        func_name = '_global_vars_{}'.format(len(chunk_funcs_astpy))
+        chunk_funcs_astpy.append(ast.copy_location(
+            ast.FunctionDef(
+                name=func_name,
+                decorator_list=[],
+                args=ast.arguments(args=[ast.Name(id='__globals__',
+                                                  ctx=ast.Param())],
+                                   vararg=None,
+                                   kwarg=None,
+                                   defaults=[]),
+                body=chunk_astpy),
+            chunk_astpy[0]))
+        calls_astpy.append(ast.copy_location(
+            ast.Expr(value=call(attr('__globals__', func_name))),
+            chunk_astpy[0]))
+    return chunk_funcs_astpy, calls_astpy
+
+def lazy_global_decls(var_decl_astc, ctx):
+    """
+    returns the statements of the CModule class body, that define a global
+    variable, that is created on first access (see datamodel.LazyGlobal)
+    """
+    var_name = var_decl_astc.spelling
+    table_entry_astpy = global_table_entry(var_decl_astc)
+    if table_entry_astpy is not None:
+        lazy_global_astpy = call(attr('datamodel', 'LazyGlobal'),
+                                 *table_entry_astpy.elts)
+        init_func_astpy = []
+    else:
+        # non-constant initializers are evaluated by a function
+        init_stmts_astpy = []
+        var_decl_astpy = astconv_var_decl(var_decl_astc, ctx,
+                                          init_stmts_astpy)
+        init_stmts_astpy.append(ast.copy_location(
+            ast.Return(value=var_decl_astpy.value), var_decl_astpy))
+        fix_src_locations(init_stmts_astpy)
+        init_func_name = '_init_global_' + var_name
+        init_func_astpy = [ast.copy_location(
+            ast.FunctionDef(
+                name=init_func_name,
+                decorator_list=[],
+                args=ast.arguments(args=[ast.Name(id='__globals__',
+                                                  ctx=ast.Param())],
+                                   vararg=None,
+                                   kwarg=None,
+                                   defaults=[]),
+                body=init_stmts_astpy),
+            var_decl_astpy)]
+        lazy_global_astpy = call(attr('datamodel', 'LazyGlobal'),
+                                 ast.Str(s=var_name),
+                                 ast.Name(id='None', ctx=ast.Load()),
+                                 ast.Tuple(elts=[], ctx=ast.Load()),
+                                 attr(init_func_name))
+    lazy_global_decl_astpy = ast.Assign(
+        targets=[ast.Name(id=var_name, ctx=ast.Store())],
+        value=lazy_global_astpy)
+    lazy_global_decl_astpy.lineno = var_decl_astc.location.line
+    lazy_global_decl_astpy.col_offset = var_decl_astc.location.column - 1
+    return init_func_astpy + [lazy_global_decl_astpy]
+
 def astconv_decl(decl_astc, ctx, prefix_stmts):
-    if decl_astc.kind.name == 'VAR_DECL':
+    if decl_astc.kind == 'VAR_DECL':
         return astconv_var_decl(decl_astc, ctx, prefix_stmts)
-    elif decl_astc.kind.name == 'FUNCTION_DECL':
+    elif decl_astc.kind == 'FUNCTION_DECL':
         return astconv_func_decl(decl_astc, ctx, prefix_stmts)
-    elif decl_astc.kind.name == 'STRUCT_DECL':
+    elif decl_astc.kind == 'STRUCT_DECL':
         return astconv_struct_decl(decl_astc, ctx, prefix_stmts)
     else:
         raise CompileError('Unsupportet Declaration {!r}'
-                           .format(decl_astc.kind.name))
+                           .format(decl_astc.kind))
 
-def get_ast_of_transunit(transunit):
+def get_ast_of_transunit(transunit, coverage=None, cooperative=False,
+                         trace=None, lazy_globals=False):
     """
-    Compile a clang.cindex.
+    Compile the IR of a clang.cindex.TranslationUnit.
 
-    :param clang.cindex.TranslationUnit transunit: Source code that will be
-        tranlated to program object
+    :param frontend.Node transunit: IR of the source code that will be
+        tranlated to program object (see frontend.extract())
+    :param Coverage coverage: if not None, the generated code is instrumented
+        by coverage probes, which are registered in this object
+    :param bool cooperative: if True, all C functions are compiled to
+        coroutines (see cymu.scheduler)
+    :param Trace trace: if not None, the generated code records writes and
+        function calls. The trace sites are registered in this object
+    :param bool lazy_globals: if True, global variables are created on first
+        access instead of when creating the program object
     :return: datamodel.Program prog
     """
     non_var_decls_astpy = []
     var_decls_astpy = []
-    ctx = CompileContext()
-    for decl_astc in transunit.cursor.get_children():
+    ctx = CompileContext(coverage=coverage, module_stmts=[],
+                         helper_name_count=0, jump_scopes=[],
+                         cooperative=cooperative, trace=trace)
+    ctx.direct_funcs = {
+        decl_astc.spelling: decl_astc
+        for decl_astc in transunit.children
+        if decl_astc.kind == 'FUNCTION_DECL' and is_func_def(decl_astc)}
+    global_table_astpy = []
+    const_table_astpy = []
+    table_init_astpy = None
+    for decl_astc in transunit.children:
+        if decl_astc.kind == 'VAR_DECL' and decl_astc.type.is_const:
+            # const globals with constant initializers are shared between
+            # all program objects (see CProgram.init_const_segment())
+            table_entry_astpy = global_table_entry(decl_astc)
+            if table_entry_astpy is not None:
+                const_table_astpy.append(table_entry_astpy)
+                continue
+        if decl_astc.kind == 'VAR_DECL' and lazy_globals:
+            non_var_decls_astpy += lazy_global_decls(decl_astc, ctx)
+            continue
+        elif decl_astc.kind == 'VAR_DECL':
+            table_entry_astpy = global_table_entry(decl_astc)
+            if table_entry_astpy is not None:
+                # consecutive variables of the table are initialized by a
+                # single call of init_global_table()
+                if table_init_astpy is None or \
+                        var_decls_astpy[-1] is not table_init_astpy:
+                    table_init_astpy = ast.Expr(value=call(
+                        attr('__globals__', 'init_global_table'),
+                        ast.Num(n=len(global_table_astpy)),
+                        ast.Num(n=len(global_table_astpy))))
+                    table_init_astpy.lineno = decl_astc.location.line
+                    table_init_astpy.col_offset = \
+                        decl_astc.location.column - 1
+                    var_decls_astpy.append(table_init_astpy)
+                global_table_astpy.append(table_entry_astpy)
+                table_init_astpy.value.args[1].n += 1
+                continue
         prefix_stmts = []
         decl_astpy = astconv_decl(decl_astc, ctx, prefix_stmts)
-        decls_astpy = (var_decls_astpy if decl_astc.kind.name == 'VAR_DECL'
+        decls_astpy = (var_decls_astpy if decl_astc.kind == 'VAR_DECL'
                        else non_var_decls_astpy)
         decls_astpy += prefix_stmts
         decls_astpy.append(decl_astpy)
+    if ctx.has_extern_protos:
+        non_var_decls_astpy.insert(0, ast.Assign(
+            targets=[ast.Name(id='__extern_protos__', ctx=ast.Store())],
+            value=ast.Dict(keys=[], values=[])))
+    global_names = sorted({decl_astc.spelling
+                           for decl_astc in transunit.children
+                           if decl_astc.kind == 'VAR_DECL'})
+    if global_names:
+        non_var_decls_astpy.append(ast.Assign(
+            targets=[ast.Name(id='__global_names__', ctx=ast.Store())],
+            value=ast.Tuple(elts=[ast.Str(s=name) for name in global_names],
+                            ctx=ast.Load())))
+    if global_table_astpy:
+        non_var_decls_astpy.append(ast.Assign(
+            targets=[ast.Name(id='__global_table__', ctx=ast.Store())],
+            value=ast.Tuple(elts=global_table_astpy, ctx=ast.Load())))
+    if const_table_astpy:
+        non_var_decls_astpy.append(ast.Assign(
+            targets=[ast.Name(id='__const_table__', ctx=ast.Store())],
+            value=ast.Tuple(elts=const_table_astpy, ctx=ast.Load())))
     fix_src_locations(non_var_decls_astpy)
     fix_src_locations(var_decls_astpy)
+    if len(var_decls_astpy) > GLOBAL_VARS_CHUNK_SIZE:
+        chunk_funcs_astpy, var_decls_astpy = \
+            chunk_global_vars(var_decls_astpy)
+        non_var_decls_astpy += chunk_funcs_astpy
     if len(var_decls_astpy) == 0:
         var_decls_astpy.append(ast.Pass())
 
@@ -395,37 +1879,333 @@ def get_ast_of_transunit(transunit):
                                kwarg=None,
                                defaults=[]),
             body=var_decls_astpy)])
-    module_astpy = ast.Module(body=[
-        ast.ImportFrom(module='cymu',
-                       names=[ast.alias(name='datamodel', asname=None)]),
-        class_def_astpy])
+    import_names_astpy = [ast.alias(name='datamodel', asname=None)]
+    if cooperative:
+        import_names_astpy.append(
+            ast.alias(name='scheduler', asname='__scheduler__'))
+    imports_astpy = [ast.ImportFrom(module='cymu',
+                                    names=import_names_astpy)]
+    if ctx.uses_xrange:
+        imports_astpy.append(ast.ImportFrom(
+            module='__builtin__',
+            names=[ast.alias(name='xrange', asname='__xrange__')]))
+    module_astpy = ast.Module(
+        body=imports_astpy + [class_def_astpy] + ctx.module_stmts)
     return module_astpy
 
-def compile_transunit(transunit, ignore_warnings=False):
+def check_diagnostics(transunit, ignore_warnings=False):
     severity = (clang.cindex.Diagnostic.Error if ignore_warnings else
                 clang.cindex.Diagnostic.Warning)
     for diag in transunit.diagnostics:
         if diag.severity >= severity:
             raise CompileError(diag.spelling )
 
-    module_astpy = get_ast_of_transunit(transunit)
-    ast.fix_missing_locations(module_astpy)
+def extract_transunit(transunit, ignore_warnings, stats):
+    """
+    checks the diagnostics of transunit and converts it to IR
+    """
+    with stats.phase('diagnostics'):
+        check_diagnostics(transunit, ignore_warnings)
+    with stats.phase('cursor_walk'):
+        extractor = frontend.Extractor()
+        try:
+            transunit_ir = extractor.node(transunit.cursor)
+        except frontend.ExtractError as exc:
+            raise CompileError(str(exc))
+    stats.cursor_count = extractor.cursor_count
+    return transunit_ir
+
+def compile_transunit(transunit, ignore_warnings=False, **options):
+    """
+    :param options: see compile_ir()
+    """
+    stats = options.setdefault('stats', CompileStats())
+    return compile_ir(extract_transunit(transunit, ignore_warnings, stats),
+                      **options)
+
+def get_optimized_ast(transunit_ir, coverage=None, pass_manager=None,
+                      cooperative=False, trace=None, stats=None,
+                      lazy_globals=False):
+    """
+    generates the python AST of a translation unit and runs the
+    optimization passes on it
+
+    :param CompileStats stats: if not None, the durations of the phases are
+        stored in this object
+    """
+    if stats is None:
+        stats = CompileStats()
+    with stats.phase('ast_build'):
+        module_astpy = get_ast_of_transunit(transunit_ir, coverage,
+                                            cooperative, trace, lazy_globals)
+    with stats.phase('optimize'):
+        module_astpy = pass_manager.run(module_astpy)
+    with stats.phase('fix_locations'):
+        ast.fix_missing_locations(module_astpy)
+    return module_astpy
+
+def create_trace(trace):
+    """
+    creates the Trace object for the trace option of compile_ir()
+    """
+    if not trace:
+        return None
+    elif trace is True:
+        return Trace()
+    else:
+        return Trace(capacity=trace)
+
+def prune_transunit(transunit_ir, func_infos, entry_points):
+    """
+    returns a copy of the IR of a translation unit without the functions,
+    that are not reachable from the entry point functions, and without the
+    global variables, that are not referred by the reachable functions.
+    Prototypes of undefined functions and type declarations are kept.
+
+    :param dict[str, analysis.FuncInfo] func_infos: see
+        analysis.analyze_funcs()
+    """
+    unknown_names = [name for name in entry_points if name not in func_infos]
+    if unknown_names:
+        raise CompileError('entry point(s) {} not defined'
+                           .format(', '.join(unknown_names)))
+    func_names, var_names = analysis.reachable_decls(
+        transunit_ir, func_infos, entry_points)
+    decls_ir = [
+        decl_ir for decl_ir in transunit_ir.children
+        if not (decl_ir.kind == 'FUNCTION_DECL' and
+                decl_ir.spelling in func_infos and
+                decl_ir.spelling not in func_names) and
+        not (decl_ir.kind == 'VAR_DECL' and decl_ir.spelling not in var_names)]
+    return frontend.Node(transunit_ir.kind, transunit_ir.spelling,
+                         transunit_ir.type, transunit_ir.location, decls_ir,
+                         transunit_ir.is_expr)
+
+def memoizable_funcs(transunit_ir, purity):
+    """
+    returns the names of the functions, that can be memoized: pure functions
+    with integer parameters and integer result
+
+    :param dict[str, str] purity: see analysis.classify_purity()
+    """
+    return [decl_astc.spelling
+            for decl_astc in transunit_ir.children
+            if decl_astc.kind == 'FUNCTION_DECL' and
+            is_func_def(decl_astc) and
+            purity.get(decl_astc.spelling) == analysis.PURE and
+            decl_astc.type.result.kind in TYPE_MAP and
+            all(param_astc.type.kind in TYPE_MAP
+                for param_astc in func_params(decl_astc))]
+
+def memoize_funcs(cmodule, module, func_names, memoize_opt):
+    """
+    replaces the direct entries of the functions *func_names* in the
+    namespace of the generated module (and the methods of cmodule that
+    refer to them) by memoizing wrappers (see cymu.memo)
+
+    :return: the caches of the functions
+    """
+    maxsize = (memo.LRUCache.DEFAULT_MAXSIZE if memoize_opt is True
+               else memoize_opt)
+    caches = {}
+    for func_name in func_names:
+        entry_name = direct_entry_name(func_name)
+        direct_func = module[entry_name]
+        cache = caches[func_name] = memo.LRUCache(maxsize)
+        memoized_func = module[entry_name] = memo.memoize(direct_func, cache)
+        if cmodule.__dict__.get(func_name) is direct_func:
+            setattr(cmodule, func_name, memoized_func)
+    return caches
+
+def compile_ir(transunit_ir, coverage=False, pass_manager=None,
+               cooperative=False, externs=None, checked=True, trace=False,
+               stats=None, lazy_globals=False, memoize=False,
+               entry_points=None):
+    """
+    Generates the CModule class from the IR of a translation unit.
+    This does not require libclang.
+
+    :param frontend.Node transunit_ir: see frontend.extract()/frontend.load()
+    :param bool coverage: if True, the generated code counts the executions
+        of every line/branch/function. The result is available via the
+        CModule's __coverage__ attribute (see cymu.coverage.Coverage)
+    :param PassManager pass_manager: the optimization passes that are run
+        on the generated python AST. If None, the default passes are run.
+        The statistics of the passes are available via the CModule's
+        __pass_stats__ attribute.
+    :param bool cooperative: if True, all C functions return coroutines,
+        that can be run by a cymu.scheduler.Scheduler
+    :param ExternRegistry externs: if not None, the python functions in this
+        registry are bound to the corresponding declared (but not defined)
+        C functions (see cymu.externs)
+    :param bool checked: if False, the program runs in unchecked mode, where
+        reading uninitialized variables is not detected (they are 0), but
+        accessing variables is faster (see datamodel.AddressSpace)
+    :param bool|int trace: if True, writes to global variables/struct
+        fields and calls of C functions are recorded in a ring buffer, which
+        is available via the CModule's __trace__ attribute (see cymu.trace).
+        If an int is passed, it is the capacity of the ring buffer (the
+        number of events, that are kept)
+    :param CompileStats stats: the object the durations of the compile
+        phases are stored in (used by the compile_...() functions, to include
+        the phases before compile_ir()). If None, a new one is created.
+        The statistics are available via the CModule's __compile_stats__
+        attribute.
+    :param bool lazy_globals: if True, every global variable is created and
+        initialized on its first access (see datamodel.LazyGlobal) instead
+        of when creating the program object. This makes creating program
+        objects with many global variables fast, if only few of them are
+        used.
+    :param bool|int memoize: if True, the results of pure C functions with
+        integer parameters (see cymu.analysis) are cached per CModule in a
+        LRU cache (see cymu.memo). If an int is passed, it is the maximum
+        number of cached results per function. The caches are available via
+        the CModule's __memo_caches__ attribute. Calls that are answered from
+        the cache are not recorded by coverage/trace. Ignored in cooperative
+        mode.
+    :param list[str] entry_points: if not None, only the C functions, that
+        can be called from these functions (directly, indirectly or via
+        function pointers) are compiled and only the global variables that
+        are referred by them are created. All other functions and global
+        variables are not available in the CModule.
+    """
+    if pass_manager is None:
+        pass_manager = PassManager()
+    if stats is None:
+        stats = CompileStats()
+    if stats.cursor_count is None:
+        stats.cursor_count = sum(1 for _ in transunit_ir.iter_nodes())
+    cov = Coverage() if coverage else None
+    trc = create_trace(trace)
+    with stats.phase('purity'):
+        func_infos = analysis.analyze_funcs(transunit_ir)
+        purity = analysis.classify_purity(func_infos)
+    if entry_points is not None:
+        with stats.phase('prune'):
+            transunit_ir = prune_transunit(transunit_ir, func_infos,
+                                           entry_points)
+        kept_names = {decl_ir.spelling for decl_ir in transunit_ir.children}
+        purity = {name: func_purity for name, func_purity in purity.items()
+                  if name in kept_names}
+    module_astpy = get_optimized_ast(transunit_ir, cov, pass_manager,
+                                     cooperative, trc, stats, lazy_globals)
+    if pass_manager.stats:
+        stats.ast_node_count = pass_manager.stats[-1].nodes_after
+    else:
+        stats.ast_node_count = count_nodes(module_astpy)
     if PRINT_PYAST:
-        import pyast_printer
         pyast_printer.print_ast(module_astpy, True)
-    module_pyc = compile(module_astpy, transunit.spelling, 'exec')
-    module = dict()
-    exec module_pyc in module
-    return module['CModule']
-
-def compile_str(c_code, filename='filename.c', ignore_warnings=False):
-    index = clang.cindex.Index.create()
-    transunit = index.parse(filename, unsaved_files=[(filename, c_code)])
-    return compile_transunit(transunit, ignore_warnings)
-
-def compile_file(c_filename, ignore_warnings=False):
-    index = clang.cindex.Index.create()
-    transunit = index.parse(c_filename)
-    return compile_transunit(transunit, ignore_warnings)
-
-config_clang()
+    with stats.phase('bytecode_compile'):
+        module_pyc = compile(module_astpy, transunit_ir.spelling, 'exec')
+    stats.bytecode_size = bytecode_size(module_pyc)
+    with stats.phase('class_creation'):
+        module = dict()
+        if cov is not None:
+            module['__cov__'] = cov.alloc_counters()
+        if trc is not None:
+            module['__trace_counter__'] = trc.counter
+            module['__trace_sites__'] = trc.site_ndxs
+            module['__trace_values__'] = trc.values
+        exec module_pyc in module
+        cmodule = module['CModule']
+        cmodule.__coverage__ = cov
+        cmodule.__trace__ = trc
+        cmodule.__pass_stats__ = pass_manager.stats
+        cmodule.__compile_stats__ = stats
+        cmodule.__cooperative__ = cooperative
+        cmodule.__checked__ = checked
+        cmodule.__lazy_globals__ = lazy_globals
+        cmodule.__purity__ = purity
+        if memoize and not cooperative:
+            cmodule.__memo_caches__ = memoize_funcs(
+                cmodule, module, memoizable_funcs(transunit_ir, purity),
+                memoize)
+        if externs is not None:
+            bind_externs(cmodule, externs)
+    return cmodule
+
+def export_pysource(transunit_ir, fileobj, coverage=False,
+                    pass_manager=None, cooperative=False, line_comments=True,
+                    trace=False, lazy_globals=False, entry_points=None):
+    """
+    Writes the python source code, that compile_ir() would generate for
+    the IR of a translation unit.
+
+    :param fileobj: the file object the source code is written to
+    :param bool line_comments: if True, every line is annotated by a comment
+        with the C source line it was generated from
+    :rtype: list[int|None]
+    :return: the C source line number of every python source line
+        (line N is at index N-1), see pyast_printer.write_source()
+    """
+    if pass_manager is None:
+        pass_manager = PassManager()
+    cov = Coverage() if coverage else None
+    trc = create_trace(trace)
+    if entry_points is not None:
+        transunit_ir = prune_transunit(
+            transunit_ir, analysis.analyze_funcs(transunit_ir), entry_points)
+    module_astpy = get_optimized_ast(transunit_ir, cov, pass_manager,
+                                     cooperative, trc,
+                                     lazy_globals=lazy_globals)
+    return pyast_printer.write_source(module_astpy, fileobj, line_comments)
+
+def parse_str(c_code, filename='filename.c', ignore_warnings=False,
+              stats=None):
+    """
+    parses C code and returns its IR (see frontend.extract()).
+    The IR can be stored via frontend.dump() and compiled later/somewhere
+    else via compile_ir()
+
+    :param CompileStats stats: if not None, the durations of the phases are
+        stored in this object
+    """
+    if stats is None:
+        stats = CompileStats()
+    with stats.phase('parse'):
+        index = clang.cindex.Index.create()
+        transunit = index.parse(filename, unsaved_files=[(filename, c_code)])
+    return extract_transunit(transunit, ignore_warnings, stats)
+
+def parse_file(c_filename, ignore_warnings=False, stats=None):
+    """
+    like parse_str(), but reads the C code from a file
+    """
+    if stats is None:
+        stats = CompileStats()
+    with stats.phase('parse'):
+        index = clang.cindex.Index.create()
+        transunit = index.parse(c_filename)
+    return extract_transunit(transunit, ignore_warnings, stats)
+
+def compile_str(c_code, filename='filename.c', ignore_warnings=False,
+                **options):
+    """
+    :param options: see compile_ir()
+    """
+    stats = options.setdefault('stats', CompileStats())
+    return compile_ir(parse_str(c_code, filename, ignore_warnings, stats),
+                      **options)
+
+def compile_file(c_filename, ignore_warnings=False, **options):
+    """
+    :param options: see compile_ir()
+    """
+    stats = options.setdefault('stats', CompileStats())
+    return compile_ir(parse_file(c_filename, ignore_warnings, stats),
+                      **options)
+
+def compile_irfile(ir_filename, **options):
+    """
+    compiles an IR file that was created by frontend.dump()
+
+    :param options: see compile_ir()
+    """
+    stats = options.setdefault('stats', CompileStats())
+    with stats.phase('load_ir'):
+        with open(ir_filename, 'rb') as ir_file:
+            transunit_ir = frontend.load(ir_file)
+    return compile_ir(transunit_ir, **options)
+
+if clang is not None:
+    config_clang()
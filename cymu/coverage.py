@@ -0,0 +1,139 @@
+"""
+Support for C-level line/branch coverage of compiled C code.
+
+The compiler allocates one counter per probe (line, branch or function entry)
+when compiling with coverage enabled. All counters of a CModule are stored in
+a single preallocated array, so the instrumented code only has to increment
+an array item.
+"""
+import array
+import collections
+
+
+LineProbe = collections.namedtuple('LineProbe', 'filename line')
+BranchProbe = collections.namedtuple('BranchProbe',
+                                     'filename line block branch')
+FuncProbe = collections.namedtuple('FuncProbe', 'filename line name')
+
+
+class Coverage(object):
+    """
+    Probe definitions and execution counters of a single CModule.
+    """
+
+    def __init__(self):
+        self.probes = []
+        self.counters = None
+        self.__block_cnt = 0
+
+    def __add_probe(self, probe):
+        if self.counters is not None:
+            raise ValueError('cannot add probes after allocating counters')
+        self.probes.append(probe)
+        return len(self.probes) - 1
+
+    def add_line_probe(self, filename, line):
+        """
+        :rtype: int
+        :return: index of counter
+        """
+        return self.__add_probe(LineProbe(filename, line))
+
+    def add_func_probe(self, filename, line, name):
+        """
+        :rtype: int
+        :return: index of counter
+        """
+        return self.__add_probe(FuncProbe(filename, line, name))
+
+    def add_branch_probes(self, filename, line, branch_cnt):
+        """
+        :rtype: list[int]
+        :return: list of indices of counters (one per branch)
+        """
+        block = self.__block_cnt
+        self.__block_cnt += 1
+        return [self.__add_probe(BranchProbe(filename, line, block, branch))
+                for branch in range(branch_cnt)]
+
+    def alloc_counters(self):
+        self.counters = array.array('L', [0]) * len(self.probes)
+        return self.counters
+
+    def reset(self):
+        for ndx in range(len(self.counters)):
+            self.counters[ndx] = 0
+
+    def filenames(self):
+        return sorted({probe.filename for probe in self.probes})
+
+    def iter_probes(self, probe_type, filename):
+        for probe, cnt in zip(self.probes, self.counters):
+            if isinstance(probe, probe_type) and probe.filename == filename:
+                yield probe, cnt
+
+    def line_counts(self, filename):
+        """
+        :rtype: dict[int, int]
+        :return: execution count of all instrumented lines of the file
+        """
+        line_counts = {}
+        for probe, cnt in self.iter_probes(LineProbe, filename):
+            line_counts[probe.line] = max(cnt, line_counts.get(probe.line, 0))
+        return line_counts
+
+    def write_lcov(self, fileobj, test_name=''):
+        """
+        writes the collected data in the format of lcov tracefiles (.info)
+        """
+        for filename in self.filenames():
+            fileobj.write('TN:{}\n'.format(test_name))
+            fileobj.write('SF:{}\n'.format(filename))
+            funcs = list(self.iter_probes(FuncProbe, filename))
+            for probe, cnt in funcs:
+                fileobj.write('FN:{},{}\n'.format(probe.line, probe.name))
+            for probe, cnt in funcs:
+                fileobj.write('FNDA:{},{}\n'.format(cnt, probe.name))
+            fileobj.write('FNF:{}\n'.format(len(funcs)))
+            fileobj.write('FNH:{}\n'.format(sum(1 for _, cnt in funcs if cnt)))
+            line_counts = self.line_counts(filename)
+            branches = list(self.iter_probes(BranchProbe, filename))
+            for probe, cnt in branches:
+                # lcov expects '-' as taken count if the block was not
+                # executed at all
+                if line_counts.get(probe.line) == 0:
+                    cnt = '-'
+                fileobj.write('BRDA:{},{},{},{}\n'.format(
+                    probe.line, probe.block, probe.branch, cnt))
+            fileobj.write('BRF:{}\n'.format(len(branches)))
+            fileobj.write('BRH:{}\n'.format(
+                sum(1 for _, cnt in branches if cnt)))
+            for line, cnt in sorted(line_counts.items()):
+                fileobj.write('DA:{},{}\n'.format(line, cnt))
+            fileobj.write('LF:{}\n'.format(len(line_counts)))
+            fileobj.write('LH:{}\n'.format(
+                sum(1 for cnt in line_counts.values() if cnt)))
+            fileobj.write('end_of_record\n')
+
+    def write_gcov(self, fileobj, filename, src_lines=None):
+        """
+        writes the collected data of a single C file in the format of
+        gcov's annotated source files (.gcov).
+
+        :param list[str] src_lines: the content of the C file.
+            If None, the file is read from disk
+        """
+        if src_lines is None:
+            with open(filename) as src_file:
+                src_lines = src_file.read().splitlines()
+        line_counts = self.line_counts(filename)
+        fileobj.write('        -:    0:Source:{}\n'.format(filename))
+        for line, src_line in enumerate(src_lines, 1):
+            if line not in line_counts:
+                cnt_str = '-'
+            elif line_counts[line] == 0:
+                cnt_str = '#####'
+            else:
+                cnt_str = str(line_counts[line])
+            fileobj.write('{:>9}:{:>5}:{}\n'.format(cnt_str, line,
+                                                     src_line.rstrip('\n')))
@@ -1,4 +1,6 @@
 import collections
+import itertools
+import weakref
 
 
 class DataModelError(Exception):
@@ -9,23 +11,180 @@ class VarAccessError(DataModelError):
     pass
 
 
-class AddressSpace(object):
+class ReadOnlyError(DataModelError):
     pass
 
 
+def c_div(dividend, divisor):
+    """
+    integer division with C semantics (rounds towards zero)
+    """
+    quotient = abs(dividend) // abs(divisor)
+    return quotient if (dividend < 0) == (divisor < 0) else -quotient
+
+
+def c_mod(dividend, divisor):
+    """
+    modulo with C semantics (the result has the sign of the dividend)
+    """
+    return dividend - divisor * c_div(dividend, divisor)
+
+
+def promotes_to_unsigned(int_ctype):
+    """
+    returns True, if the integer promotions convert a value of int_ctype to
+    unsigned int (types smaller than int are promoted to (signed) int)
+    """
+    return not int_ctype.signed and \
+        int_ctype.bits >= CProgram.unsigned_int.bits
+
+
+def raw_operands(val, ctype, other):
+    """
+    returns the raw value *val* (of type ctype) and the value of
+    other converted to the type of the usual arithmetic conversions (after
+    the integer promotions).
+    This is only required for the in-place operations whose result depends
+    on the signedness of the operands (/, %).
+    Python integers are treated as int.
+    """
+    other_val = int(other)
+    if promotes_to_unsigned(ctype) or \
+            (isinstance(other, IntCObj) and
+             promotes_to_unsigned(other.ctype)):
+        mask = CProgram.unsigned_int.mask
+        return val & mask, other_val & mask
+    else:
+        return val, other_val
+
+
+class AddressSpace(object):
+    """
+    Maps addresses to CObjs.
+
+    Addresses are assigned on demand (when the address of a CObj is requested
+    the first time). The address index references CObjs only weakly, so CObjs
+    that went out of scope are removed automatically (dereferencing their
+    address afterwards results in a VarAccessError like accessing a dangling
+    pointer).
+    """
+
+    NULL = 0
+    START_ADR = 0x1000
+    # first address of the segment of const globals (see
+    # CProgram.init_const_segment())
+    CONST_START_ADR = 0x80000000
+    ALIGNMENT = 8
+
+    def __init__(self, checked=True, shared=None, start_adr=START_ADR):
+        """
+        :param bool checked: if False, the CObjs of this address space do not
+            track if they are initialized (uninitialized values are 0).
+            This avoids the initialization checks on every access.
+        :param AddressSpace shared: if not None, addresses that are not
+            found in this address space are looked up in *shared* (the
+            segment of const globals, that is shared between all program
+            objects of a CModule)
+        """
+        self.checked = checked
+        self.shared = shared
+        # cache of the BoundCTypes of this address space (see CType.bind())
+        self.bound_ctypes = {}
+        self.__next_adr = start_adr
+        self.__cobjs = weakref.WeakValueDictionary()
+
+    def alloc(self, cobj):
+        """
+        Assigns a new (unused) address to *cobj* and all of its subobjects
+
+        :type cobj: CObj
+        :rtype: int
+        """
+        adr = self.__next_adr
+        size = max(cobj.ctype.sizeof, 1)
+        self.__next_adr += (size + self.ALIGNMENT - 1) & -self.ALIGNMENT
+        self.register(cobj, adr)
+        return adr
+
+    def register(self, cobj, adr):
+        """
+        Makes *cobj* accessible at address *adr*.
+        If another object was already registered at this address before, the
+        other object has precedence (which is the containing struct object
+        for the first field of a struct).
+        """
+        cobj._adr = adr
+        self.__cobjs.setdefault(adr, cobj)
+        cobj._register_subobjs(self, adr)
+
+    def deref(self, adr, ctype):
+        """
+        returns the CObj of type *ctype* at address *adr*.
+
+        :type adr: int
+        :type ctype: CType
+        :rtype: CObj
+        """
+        try:
+            cobj = self.__cobjs[adr]
+        except KeyError:
+            if self.shared is not None:
+                return self.shared.deref(adr, ctype)
+            raise VarAccessError('no object at address 0x{:08X}'.format(adr))
+        while cobj.ctype is not ctype:
+            if not isinstance(cobj, StructCObj) or len(cobj) == 0:
+                raise VarAccessError('no object of type {!r} at address '
+                                     '0x{:08X}'.format(ctype, adr))
+            cobj = cobj[0]
+        return cobj
+
+
+class InitBitmap(object):
+    """
+    The initialization state of all scalar (non-struct) subobjects of a
+    struct object. Every scalar subobject has its own bit, so that the
+    initialization state of a (sub)struct can be checked by comparing the
+    bits of its subobjects with a mask.
+    """
+
+    __slots__ = ('bits',)
+
+    def __init__(self):
+        self.bits = 0
+
+
 class CObj(object):
     """
     All C objects are instances of this class
     """
 
+    # if this object is a subobject of a struct, the InitBitmap of the
+    # struct and the bit of this object within the bitmap
+    _init_bitmap = None
+    _init_bit = 0
+
     def __init__(self, ctype, adr_space):
         self.ctype = ctype
         self.adr_space = adr_space
+        self._adr = None
+        self._container = None
 
     @property
     def initialized(self):
         return False
 
+    @property
+    def adr(self):
+        if self._adr is None:
+            if self._container is not None:
+                _ = self._container.adr
+            else:
+                self.adr_space.alloc(self)
+        return self._adr
+
+    def _register_subobjs(self, adr_space, adr):
+        pass
+
     @property
     def ptr(self):
         return PtrCObj(self.ctype.ptr, self.adr_space, self)
@@ -48,16 +207,19 @@ class BoundCType(object):
 
     def __eq__(self, other):
         if isinstance(other, CType):
-            return self.base_ctype == other
+            return self.base_ctype is other
         elif isinstance(other, BoundCType):
-            return (self.base_ctype == other.base_ctype  and
-                    self.adr_space == other.adr_space)
+            return (self.base_ctype is other.base_ctype  and
+                    self.adr_space is other.adr_space)
         else:
             return NotImplemented
 
     def __ne__(self, other):
         return not self == other
 
+    def __hash__(self):
+        return hash(self.base_ctype)
+
     def __str__(self):
         return str(self.base_ctype)
 
@@ -71,21 +233,76 @@ class BoundCType(object):
 
 
 
+class InterningMeta(type):
+    """
+    Metaclass of CType, that ensures that there is only a single instance
+    per distinct C type (hash consing). Thus C types can be compared by
+    identity and used as dictionary keys.
+
+    The distinct types are identified by the classmethod intern_key(), which
+    gets the constructor parameters.
+    """
+
+    def __init__(cls, name, bases, namespace):
+        super(InterningMeta, cls).__init__(name, bases, namespace)
+        cls._instances = weakref.WeakValueDictionary()
+
+    def __call__(cls, *args, **kwargs):
+        key = cls.intern_key(*args, **kwargs)
+        try:
+            return cls._instances[key]
+        except KeyError:
+            instance = super(InterningMeta, cls).__call__(*args, **kwargs)
+            cls._instances[key] = instance
+            return instance
+
+
 class CType(object):
 
+    __metaclass__ = InterningMeta
+
     COBJ_TYPE = None
+    UNCHECKED_COBJ_TYPE = None
+
+    # cache of the PtrCType referring to this type (see .ptr)
+    _ptr_ctype = None
+
+    @classmethod
+    def intern_key(cls, *args, **kwargs):
+        """
+        returns a hashable object, that identifies the C type created by
+        cls(*args, **kwargs)
+        """
+        return args + tuple(sorted(kwargs.items()))
 
     def bind(self, adr_space):
-        return BoundCType(self, adr_space)
+        """
+        returns the BoundCType of this type for adr_space. There is only one
+        BoundCType per CType and AddressSpace.
+
+        :rtype: BoundCType
+        """
+        bound_ctypes = getattr(adr_space, 'bound_ctypes', None)
+        if bound_ctypes is None:
+            return BoundCType(self, adr_space)
+        try:
+            return bound_ctypes[self]
+        except KeyError:
+            bound_ctype = bound_ctypes[self] = BoundCType(self, adr_space)
+            return bound_ctype
 
     def __call__(self, adr_space, *args, **kwargs):
-        return self.COBJ_TYPE(self, adr_space, *args, **kwargs)
+        if getattr(adr_space, 'checked', True) or \
+                self.UNCHECKED_COBJ_TYPE is None:
+            return self.COBJ_TYPE(self, adr_space, *args, **kwargs)
+        else:
+            return self.UNCHECKED_COBJ_TYPE(self, adr_space, *args, **kwargs)
 
     def __get__(self, instance, owner):
         if instance is None:
             return self
         else:
-            return BoundCType(self, instance.__adr_space__)
+            return self.bind(instance.__adr_space__)
 
     def __repr__(self):
         return "<CType '{}'>".format(self)
@@ -99,7 +316,7 @@ class CType(object):
         if isinstance(cobj, CObj):
             if adr_space is None:
                 adr_space = cobj.adr_space
-            if cobj.ctype == self and cobj.adr_space == adr_space:
+            if cobj.ctype is self and cobj.adr_space is adr_space:
                 return cobj
         else:
             if adr_space is None:
@@ -110,22 +327,34 @@ class CType(object):
     def create_zero_cobj(self, adr_space=None):
         raise NotImplementedError()
 
-    def __eq__(self, other):
-        if isinstance(other, CType):
-            return self.COBJ_TYPE is other.COBJ_TYPE
-        else:
-            return NotImplemented
+    @property
+    def sizeof(self):
+        raise NotImplementedError()
 
-    def __ne__(self, other):
-        return not self == other
+    @property
+    def alignment(self):
+        return self.sizeof
 
     @property
     def ptr(self):
-        return PtrCType(self)
+        ptr_ctype = self._ptr_ctype
+        if ptr_ctype is None:
+            ptr_ctype = self._ptr_ctype = PtrCType(self)
+        return ptr_ctype
 
 
 class IntCObj(CObj):
 
+    # the name of the instance attribute holding the raw value
+    # (see add_hook())
+    _STORAGE_ATTR = '_IntCObj__val'
+
+    # the methods/properties, that modify the object (see make_readonly())
+    _WRITING_ATTRS = ('val', 'set_val', '__iadd__', '__isub__', '__imul__',
+                      '__idiv__', '__itruediv__', '__ifloordiv__', '__imod__',
+                      '__iand__', '__ior__', '__ixor__', '__ilshift__',
+                      '__irshift__')
+
     def __init__(self, ctype, adr_space, init_val=None):
         super(IntCObj, self).__init__(ctype, adr_space)
         self.__val = None
@@ -159,21 +388,72 @@ class IntCObj(CObj):
                 '{!r} cannot be converted to object of class {!r}'
                 .format(new_value, self))
 
-        if ctype.signed:
-            py_obj -= ctype.min()
-            py_obj &= ((1 << ctype.bits) - 1)
-            py_obj += ctype.min()
-        else:
-            py_obj &= ((1 << ctype.bits) - 1)
+        self.__val = ctype.wrap(py_obj)
+        init_bitmap = self._init_bitmap
+        if init_bitmap is not None:
+            init_bitmap.bits |= self._init_bit
 
-        # convert long back to int if possible
-        py_obj_as_int = int(py_obj)
-        if py_obj_as_int == py_obj:
-            py_obj = py_obj_as_int
+    val = property(get_val, set_val)
 
-        self.__val = py_obj
+    def _from_hook(self, value):
+        return self.ctype.wrap(int(value))
 
-    val = property(get_val, set_val)
+    def __raw_val(self):
+        val = self.__val
+        if val is None:
+            raise VarAccessError('variable is not initialized')
+        return val
+
+    # the in-place operators (used for C compound assignments) operate
+    # directly on the raw values without creating temporary CObjs.
+
+    def __iadd__(self, other):
+        self.__val = self.ctype.wrap(self.__raw_val() + int(other))
+        return self
+
+    def __isub__(self, other):
+        self.__val = self.ctype.wrap(self.__raw_val() - int(other))
+        return self
+
+    def __imul__(self, other):
+        self.__val = self.ctype.wrap(self.__raw_val() * int(other))
+        return self
+
+    def __idiv__(self, other):
+        self_val, other_val = raw_operands(self.__raw_val(), self.ctype,
+                                           other)
+        self.__val = self.ctype.wrap(c_div(self_val, other_val))
+        return self
+
+    __itruediv__ = __ifloordiv__ = __idiv__
+
+    def __imod__(self, other):
+        self_val, other_val = raw_operands(self.__raw_val(), self.ctype,
+                                           other)
+        self.__val = self.ctype.wrap(c_mod(self_val, other_val))
+        return self
+
+    def __iand__(self, other):
+        self.__val = self.ctype.wrap(self.__raw_val() & int(other))
+        return self
+
+    def __ior__(self, other):
+        self.__val = self.ctype.wrap(self.__raw_val() | int(other))
+        return self
+
+    def __ixor__(self, other):
+        self.__val = self.ctype.wrap(self.__raw_val() ^ int(other))
+        return self
+
+    def __ilshift__(self, other):
+        self.__val = self.ctype.wrap(self.__raw_val() << int(other))
+        return self
+
+    def __irshift__(self, other):
+        # the signedness of the result depends only on the (promoted) left
+        # operand, whose raw value is already in its value range
+        self.__val = self.ctype.wrap(self.__raw_val() >> int(other))
+        return self
 
     def __repr__(self):
         if self.initialized:
@@ -189,36 +469,141 @@ class IntCObj(CObj):
         return True if self.__val else False
 
     def __int__(self):
-        if self.__val is None:
+        val = self.__val
+        if val is None:
             raise VarAccessError('variable is not initialized')
         else:
-            return self.__val
+            return val
+
+    def __add__(self, other):
+        if isinstance(other, PtrCObj):
+            return NotImplemented
+        self_casted, other_casted = self.ctype.implicit_cast(self, other)
+        pyobj = self_casted.__val + other_casted.__val
+        return self_casted.ctype(self.adr_space, pyobj)
+
+    def __radd__(self, other):
+        return self + other
 
     def __sub__(self, other):
+        if isinstance(other, PtrCObj):
+            return NotImplemented
         self_casted, other_casted = self.ctype.implicit_cast(self, other)
         pyobj = self_casted.__val - other_casted.__val
         return self_casted.ctype(self.adr_space, pyobj)
 
-    def __isub__(self, other):
-        self.val = self - other
-        return self
-
     def __rsub__(self, other):
         self_casted, other_casted = self.ctype.implicit_cast(self, other)
         return other_casted - self_casted
 
 
+class UncheckedIntCObj(IntCObj):
+    """
+    IntCObj of an unchecked AddressSpace. Is always initialized (to 0 if no
+    init value is passed), so reading the value requires no checks.
+    """
+
+    def __init__(self, ctype, adr_space, init_val=None):
+        super(UncheckedIntCObj, self).__init__(ctype, adr_space, init_val)
+        if init_val is None:
+            self._IntCObj__val = 0
+
+    @property
+    def initialized(self):
+        return True
+
+    def get_val(self):
+        return self._IntCObj__val
+
+    def set_val(self, new_value):
+        if isinstance(new_value, IntCObj):
+            self._IntCObj__val = self.ctype.wrap(new_value._IntCObj__val)
+        else:
+            super(UncheckedIntCObj, self).set_val(new_value)
+
+    val = property(get_val, set_val)
+
+    def __int__(self):
+        return self._IntCObj__val
+
+    # the in-place operators access the raw value without the
+    # initialization check of IntCObj
+
+    def __iadd__(self, other):
+        self._IntCObj__val = self.ctype.wrap(self._IntCObj__val + int(other))
+        return self
+
+    def __isub__(self, other):
+        self._IntCObj__val = self.ctype.wrap(self._IntCObj__val - int(other))
+        return self
+
+    def __imul__(self, other):
+        self._IntCObj__val = self.ctype.wrap(self._IntCObj__val * int(other))
+        return self
+
+    def __idiv__(self, other):
+        self_val, other_val = raw_operands(self._IntCObj__val, self.ctype,
+                                           other)
+        self._IntCObj__val = self.ctype.wrap(c_div(self_val, other_val))
+        return self
+
+    __itruediv__ = __ifloordiv__ = __idiv__
+
+    def __imod__(self, other):
+        self_val, other_val = raw_operands(self._IntCObj__val, self.ctype,
+                                           other)
+        self._IntCObj__val = self.ctype.wrap(c_mod(self_val, other_val))
+        return self
+
+    def __iand__(self, other):
+        self._IntCObj__val = self.ctype.wrap(self._IntCObj__val & int(other))
+        return self
+
+    def __ior__(self, other):
+        self._IntCObj__val = self.ctype.wrap(self._IntCObj__val | int(other))
+        return self
+
+    def __ixor__(self, other):
+        self._IntCObj__val = self.ctype.wrap(self._IntCObj__val ^ int(other))
+        return self
+
+    def __ilshift__(self, other):
+        self._IntCObj__val = self.ctype.wrap(self._IntCObj__val << int(other))
+        return self
+
+    def __irshift__(self, other):
+        self._IntCObj__val = self.ctype.wrap(self._IntCObj__val >> int(other))
+        return self
+
+
 class IntCType(CType):
 
     COBJ_TYPE = IntCObj
+    UNCHECKED_COBJ_TYPE = UncheckedIntCObj
+
+    @classmethod
+    def intern_key(cls, name, bits, signed):
+        return name, bits, signed
 
     def __init__(self, name, bits, signed):
         super(IntCType, self).__init__()
         self.bits = bits
         self.signed = signed
+        self.mask = (1 << bits) - 1
         self.implicit_cast = None
         self.name = name
 
+    def wrap(self, value):
+        """
+        converts a python integer to the value range of this type
+        (by cutting off all bits that do not fit into the type)
+        """
+        value &= self.mask
+        if self.signed and value > (self.mask >> 1):
+            value -= self.mask + 1
+        # convert long back to int if possible
+        return int(value)
+
     def min(self):
         if self.signed:
             return -(1 << (self.bits - 1))
@@ -248,11 +633,9 @@ class IntCType(CType):
     def create_zero_cobj(self, adr_space=None):
         return self(adr_space, 0)
 
-    def __eq__(self, other):
-        equality = super(IntCType, self).__eq__(other)
-        if equality != True:
-            return equality
-        return self.name == other.name
+    @property
+    def sizeof(self):
+        return self.bits // 8
 
     def __str__(self):
         return self.name
@@ -260,11 +643,21 @@ class IntCType(CType):
 
 class StructCObj(CObj, collections.Sequence):
 
+    _WRITING_ATTRS = ('val', 'set_val')
+
     def __init__(self, ctype, adr_space, *args, **argv):
         super(StructCObj, self).__init__(ctype, adr_space)
-        for attr_name, attr_ctype in ctype.fields:
-            self.__dict__[attr_name] = attr_ctype(adr_space)
-        if len(args) > 0 or len(argv) > 0:
+        if getattr(adr_space, 'checked', True):
+            self._create_fields(InitBitmap(), 0)
+        else:
+            self._create_fields(None, 0)
+        if len(args) == 1 and len(argv) == 0 and \
+                isinstance(args[0], StructCObj) and \
+                args[0].ctype == self.ctype:
+            # copy of another struct (i.e. for passing structs by value).
+            # A struct of another type initializes only the first field
+            self.val = args[0]
+        elif len(args) > 0 or len(argv) > 0:
             if len(args) > len(self.ctype.fields):
                 raise TypeError(
                     'too much positional initialization values (must be {}, '
@@ -277,31 +670,106 @@ class StructCObj(CObj, collections.Sequence):
 
     def __repr__(self):
         if self.initialized:
-            return '{}({})'.format(self.ctype.struct_name, ', '.join(
-                nm+'='+repr(getattr(self, nm)
-                            if isinstance(getattr(self, nm), StructCObj)
-                            else getattr(self, nm).val)
-                for nm, ctype in self.ctype.fields))
+            return self._repr_fields()
         else:
             return '{}()'.format(self.ctype.struct_name)
 
+    def _repr_fields(self):
+        """
+        like __repr__(), but without checking if self (and the nested
+        structs) are initialized
+        """
+        fields = self.__dict__
+        return '{}({})'.format(self.ctype.struct_name, ', '.join(
+            fname + '=' + (repr(getattr(fields[fname], storage_attr))
+                           if storage_attr is not None
+                           else fields[fname]._repr_fields())
+            for fname, storage_attr in self.ctype.field_storage_attrs))
+
+    def _create_fields(self, init_bitmap, first_bit):
+        """
+        creates the CObjs of all fields. Every scalar field (also of nested
+        structs) gets its own bit in *init_bitmap*, starting at *first_bit*.
+
+        :return: the first bit after the bits of this struct
+        """
+        next_bit = first_bit
+        # all scalar subobjects (also of nested structs) in declaration order
+        scalar_cobjs = []
+        for attr_name, attr_ctype in self.ctype.fields:
+            if isinstance(attr_ctype, StructCType):
+                field_cobj = self.__class__.__new__(self.__class__)
+                CObj.__init__(field_cobj, attr_ctype, self.adr_space)
+                next_bit = field_cobj._create_fields(init_bitmap, next_bit)
+                scalar_cobjs += field_cobj._scalar_cobjs
+            else:
+                field_cobj = attr_ctype(self.adr_space)
+                scalar_cobjs.append(field_cobj)
+                if init_bitmap is not None:
+                    field_cobj._init_bitmap = init_bitmap
+                    field_cobj._init_bit = 1 << next_bit
+                    if field_cobj.initialized:
+                        init_bitmap.bits |= field_cobj._init_bit
+                next_bit += 1
+            field_cobj._container = self
+            self.__dict__[attr_name] = field_cobj
+        self._scalar_cobjs = scalar_cobjs
+        self._init_bitmap = init_bitmap
+        self._init_mask = (1 << next_bit) - (1 << first_bit)
+        return next_bit
+
     @property
     def initialized(self):
-        return all(getattr(self, fname).initialized
-                   for fname, ftype in self.ctype.fields)
+        init_bitmap = self._init_bitmap
+        if init_bitmap is None:
+            return True
+        return init_bitmap.bits & self._init_mask == self._init_mask
+
+    def _register_subobjs(self, adr_space, adr):
+        for (fname, _), offset in zip(self.ctype.fields, self.ctype.offsets):
+            adr_space.register(getattr(self, fname), adr + offset)
 
     def get_val(self):
         if self.initialized:
-            return {fname: getattr(self, fname).val
-                    for fname, ftype in self.ctype.fields}
+            return self._field_vals()
         else:
             raise VarAccessError('struct is not initialized')
 
+    def _field_vals(self):
+        """
+        like get_val(), but without checking if self (and the nested
+        structs) are initialized. As the initialization state of all
+        subobjects is checked at once by get_val(), the values are collected
+        in a single pass.
+        """
+        fields = self.__dict__
+        return {fname: (getattr(fields[fname], storage_attr)
+                        if storage_attr is not None
+                        else fields[fname]._field_vals())
+                for fname, storage_attr in self.ctype.field_storage_attrs}
+
+    def _copy_scalars(self, other):
+        """
+        copies the raw values of all scalar subobjects of *other* (a fully
+        initialized struct of the same ctype) without converting/checking
+        them again
+        """
+        for dest_cobj, src_cobj in zip(self._scalar_cobjs,
+                                       other._scalar_cobjs):
+            storage_attr = dest_cobj._STORAGE_ATTR
+            setattr(dest_cobj, storage_attr, getattr(src_cobj, storage_attr))
+        init_bitmap = self._init_bitmap
+        if init_bitmap is not None:
+            init_bitmap.bits |= self._init_mask
+
     def set_val(self, new_value):
         if isinstance(new_value, StructCObj):
-            if new_value.ctype != self.ctype:
+            if new_value.ctype is not self.ctype:
                     raise TypeError('expected mapping {!r} but got {!r}'
                                     .format(self.ctype, new_value.ctype))
+            if new_value.initialized:
+                self._copy_scalars(new_value)
+                return
             for fname, _ in self.ctype.fields:
                 getattr(self, fname).val = getattr(new_value, fname)
         elif isinstance(new_value, collections.Mapping):
@@ -343,64 +811,212 @@ class StructCObj(CObj, collections.Sequence):
 class StructCType(CType):
 
     COBJ_TYPE = StructCObj
+    UNCHECKED_COBJ_TYPE = StructCObj
+
+    @classmethod
+    def intern_key(cls, struct_name, fields):
+        return struct_name, tuple(tuple(field) for field in fields)
 
     def __init__(self, struct_name, fields):
         super(StructCType, self).__init__()
-        self.fields = fields
+        self.fields = [tuple(field) for field in fields]
         self.struct_name = struct_name
+        # (name, name of the attribute holding the raw value) of every
+        # field. The attribute name is None for nested structs
+        self.field_storage_attrs = [
+            (fname, None if isinstance(ftype, StructCType)
+                    else ftype.COBJ_TYPE._STORAGE_ATTR)
+            for fname, ftype in self.fields]
 
     def create_zero_cobj(self, adr_space=None):
         init_vals = {fname: ftype.create_zero_cobj(adr_space)
                      for fname, ftype in self.fields}
         return self(adr_space, **init_vals)
 
+    @property
+    def offsets(self):
+        """
+        list of the offsets of all fields (in the same order as .fields).
+        Every field is aligned to its natural alignment.
+        """
+        offsets = []
+        cur_offset = 0
+        for fname, ftype in self.fields:
+            cur_offset += -cur_offset % ftype.alignment
+            offsets.append(cur_offset)
+            cur_offset += ftype.sizeof
+        return offsets
+
+    @property
+    def alignment(self):
+        return max([ftype.alignment for fname, ftype in self.fields] or [1])
+
+    @property
+    def sizeof(self):
+        if not self.fields:
+            return 0
+        fname, last_ftype = self.fields[-1]
+        size = self.offsets[-1] + last_ftype.sizeof
+        return size + -size % self.alignment
+
     def __str__(self):
         return 'struct ' + self.struct_name
 
-    def __eq__(self, other):
-        equality = super(StructCType, self).__eq__(other)
-        if equality != True:
-            return equality
-        return (self.struct_name == other.struct_name  and
-                self.fields == other.fields)
-
 
 class PtrCObj(CObj):
+    """
+    A pointer is stored as address (an integer) into its address space.
+    The referred object is looked up on every access to .ref
+    """
+
+    # the name of the instance attribute holding the address
+    # (see add_hook())
+    _STORAGE_ATTR = '_PtrCObj__adr'
+
+    _WRITING_ATTRS = ('val', 'set_val', 'ref', 'set_ref', '__iadd__',
+                      '__isub__')
 
-    def __init__(self, ctype, adr_space, init_ref=None):
+    def __init__(self, ctype, adr_space, init_val=None):
         super(PtrCObj, self).__init__(ctype, adr_space)
-        self.__ref = None
-        if init_ref is not None:
-            self.ref = init_ref
+        self.__adr = None
+        if init_val is None:
+            pass
+        elif isinstance(init_val, CObj) and not isinstance(init_val, PtrCObj):
+            self.ref = init_val
+        else:
+            self.val = init_val
 
     @property
     def initialized(self):
-        return self.__ref is not None
+        return self.__adr is not None
 
-    def get_ref(self):
+    def get_val(self):
         if self.initialized:
-            return self.__ref
+            return self.__adr
         else:
             raise VarAccessError('pointer is not initialized')
 
+    def set_val(self, new_value):
+        if isinstance(new_value, PtrCObj):
+            if new_value.ctype is not self.ctype:
+                raise TypeError('expected {!r} but got {!r}'
+                                .format(self.ctype, new_value.ctype))
+            self.__adr = new_value.val
+        elif isinstance(new_value, (int, long)):
+            self.__adr = int(new_value & ((1 << self.ctype.sizeof*8) - 1))
+        elif isinstance(new_value, tuple) and len(new_value) == 1:
+            self.val = new_value[0]
+            return
+        else:
+            raise TypeError(
+                '{!r} cannot be converted to object of class {!r}'
+                .format(new_value, self))
+        init_bitmap = self._init_bitmap
+        if init_bitmap is not None:
+            init_bitmap.bits |= self._init_bit
+
+    val = property(get_val, set_val)
+
+    def _from_hook(self, value):
+        return int(value) & ((1 << self.ctype.sizeof*8) - 1)
+
+    def get_ref(self):
+        return self.adr_space.deref(self.val, self.ctype.ref)
+
     def set_ref(self, new_ref):
         if not isinstance(new_ref, CObj):
             raise ValueError('cannot assign non-CObject to {!r}.ref'
                              .format(self))
-        elif new_ref.ctype != self.ctype.ref:
+        elif new_ref.ctype is not self.ctype.ref:
             raise ValueError('{!r} has to match {!r}.ref'
                              .format(new_ref.ctype, self.ctype))
-        elif new_ref.adr_space != self.adr_space:
+        elif new_ref.adr_space is not self.adr_space and \
+                (new_ref.adr_space is None or
+                 new_ref.adr_space is not getattr(self.adr_space, 'shared',
+                                                  None)):
             raise ValueError('Addressspace of pointer has to match .ref')
         else:
-            self.__ref = new_ref
+            self.val = new_ref.adr
 
     ref = property(get_ref, set_ref)
 
+    def __repr__(self):
+        if self.initialized:
+            return '{}(0x{:08X})'.format(self.ctype, self.__adr)
+        else:
+            return '{}()'.format(self.ctype)
+
+    def __int__(self):
+        return self.val
+
+    def __nonzero__(self):
+        return bool(self.__adr)
+
+    def __cmp__(self, other):
+        if isinstance(other, PtrCObj):
+            if other.ctype is not self.ctype:
+                raise TypeError('cannot compare {!r} with {!r}'
+                                .format(self.ctype, other.ctype))
+            return cmp(self.val, other.val)
+        return cmp(self.val, int(other))
+
+    def __add__(self, other):
+        if isinstance(other, PtrCObj):
+            return NotImplemented
+        return self.ctype(self.adr_space,
+                          self.val + int(other) * self.ctype.ref.sizeof)
+
+    __radd__ = __add__
+
+    def __iadd__(self, other):
+        self.val = self + other
+        return self
+
+    def __sub__(self, other):
+        if isinstance(other, PtrCObj):
+            if other.ctype is not self.ctype:
+                raise TypeError('cannot subtract {!r} from {!r}'
+                                .format(other.ctype, self.ctype))
+            return CProgram.int(self.adr_space,
+                                (self.val - other.val) //
+                                self.ctype.ref.sizeof)
+        return self.ctype(self.adr_space,
+                          self.val - int(other) * self.ctype.ref.sizeof)
+
+    def __isub__(self, other):
+        self.val = self - other
+        return self
+
+
+class UncheckedPtrCObj(PtrCObj):
+    """
+    PtrCObj of an unchecked AddressSpace. Is always initialized (to NULL if
+    no init value is passed)
+    """
+
+    def __init__(self, ctype, adr_space, init_val=None):
+        super(UncheckedPtrCObj, self).__init__(ctype, adr_space, init_val)
+        if init_val is None:
+            self._PtrCObj__adr = AddressSpace.NULL
+
+    @property
+    def initialized(self):
+        return True
+
+    def get_val(self):
+        return self._PtrCObj__adr
+
+    val = property(get_val, PtrCObj.set_val)
+
 
 class PtrCType(CType):
 
     COBJ_TYPE = PtrCObj
+    UNCHECKED_COBJ_TYPE = UncheckedPtrCObj
+
+    @classmethod
+    def intern_key(cls, ref):
+        return ref,
 
     def __init__(self, ref):
         super(PtrCType, self).__init__()
@@ -409,23 +1025,260 @@ class PtrCType(CType):
     def __str__(self):
         return str(self.ref) + ' *'
 
-    def __eq__(self, other):
-        equality = super(PtrCType, self).__eq__(other)
-        if equality != True:
-            return equality
-        return self.ref == other.ref
+    @property
+    def sizeof(self):
+        return 4
+
+
+# cache of the hooked subclasses of CObj classes (see hooked_class())
+_hooked_classes = {}
+
+def hooked_class(cobj_class):
+    """
+    returns a subclass of *cobj_class* (IntCObj or PtrCObj or one of their
+    subclasses), whose raw value is accessed via a property, which calls the
+    read/write hooks of the object.
+    """
+    try:
+        return _hooked_classes[cobj_class]
+    except KeyError:
+        pass
+    storage_attr = cobj_class._STORAGE_ATTR
+
+    def get_storage(self):
+        value = self.__dict__[storage_attr]
+        if self._read_hook is not None:
+            hooked_value = self._read_hook(self, value)
+            if hooked_value is not None:
+                value = self._from_hook(hooked_value)
+        return value
+
+    def set_storage(self, value):
+        if self._write_hook is not None and value is not None:
+            hooked_value = self._write_hook(self, value)
+            if hooked_value is not None:
+                value = self._from_hook(hooked_value)
+        self.__dict__[storage_attr] = value
+
+    def initialized(self):
+        return (self._read_hook is not None or
+                self.__dict__[storage_attr] is not None)
+
+    hooked_cls = type('Hooked' + cobj_class.__name__, (cobj_class,), {
+        '__doc__': 'Version of {} with read/write hooks (see add_hook())'
+                   .format(cobj_class.__name__),
+        storage_attr: property(get_storage, set_storage),
+        'initialized': property(initialized),
+        '_unhooked_class': cobj_class,
+        '_read_hook': None,
+        '_write_hook': None})
+    _hooked_classes[cobj_class] = hooked_cls
+    return hooked_cls
+
+def add_hook(cobj, on_read=None, on_write=None):
+    """
+    Attaches callbacks to an integer or pointer object (i.e. a global
+    variable or struct field, that emulates a memory mapped register).
+    Only the passed object is switched to a (slower) hooked class, all other
+    objects are not affected.
+
+    :param IntCObj|PtrCObj cobj: the object to hook
+    :param on_read: on_read(cobj, value) is called whenever the C code reads
+        the value of cobj. value is the last written value (None if
+        uninitialized). If it returns not None, the result is used as value.
+    :param on_write: on_write(cobj, value) is called whenever the C code
+        writes to cobj. If it returns not None, the result is stored
+        instead of value.
+    """
+    if not isinstance(cobj, (IntCObj, PtrCObj)):
+        raise TypeError('only integers and pointers can be hooked (not {!r})'
+                        .format(cobj.ctype))
+    if not hasattr(cobj, '_unhooked_class'):
+        cobj.__class__ = hooked_class(cobj.__class__)
+    cobj._read_hook = on_read
+    cobj._write_hook = on_write
+
+def remove_hook(cobj):
+    """
+    Removes the callbacks attached by add_hook() from *cobj*
+    """
+    if hasattr(cobj, '_unhooked_class'):
+        del cobj._read_hook
+        del cobj._write_hook
+        cobj.__class__ = cobj._unhooked_class
+
+
+# cache of the read-only subclasses of CObj classes (see readonly_class())
+_readonly_classes = {}
+
+def readonly_class(cobj_class):
+    """
+    returns a subclass of *cobj_class*, whose methods/properties for
+    modifying the object raise a ReadOnlyError. Reading is as fast as for
+    cobj_class.
+    """
+    try:
+        return _readonly_classes[cobj_class]
+    except KeyError:
+        pass
+
+    def raise_readonly(self, *args):
+        raise ReadOnlyError('cannot modify const object {!r}'.format(self))
+
+    namespace = {
+        '__doc__': 'Version of {} whose value cannot be modified (see '
+                   'make_readonly())'.format(cobj_class.__name__),
+        '_writable_class': cobj_class}
+    for attr_name in cobj_class._WRITING_ATTRS:
+        attr_obj = getattr(cobj_class, attr_name)
+        if isinstance(attr_obj, property):
+            namespace[attr_name] = property(attr_obj.fget, raise_readonly)
+        else:
+            namespace[attr_name] = raise_readonly
+    readonly_cls = type('ReadOnly' + cobj_class.__name__, (cobj_class,),
+                        namespace)
+    _readonly_classes[cobj_class] = readonly_cls
+    return readonly_cls
+
+def make_readonly(cobj):
+    """
+    Switches *cobj* (and all of its subobjects) to a class, that raises a
+    ReadOnlyError on every modification (used for const global variables).
+
+    :return: cobj
+    """
+    if isinstance(cobj, StructCObj):
+        for field_cobj in cobj:
+            make_readonly(field_cobj)
+    if not hasattr(cobj, '_writable_class'):
+        cobj.__class__ = readonly_class(cobj.__class__)
+    return cobj
+
+
+class LazyGlobal(object):
+    """
+    Descriptor for a global variable of a CModule, that was compiled with
+    lazy globals. The CObj of the variable is created on first access and
+    stored in the program object (which hides the descriptor afterwards).
+    """
+
+    def __init__(self, name, ctype=None, args=(), init_func=None):
+        """
+        :param str name: name of the variable
+        :param CType ctype: the variable is created by ctype(adr_space, *args)
+        :param init_func: if not None, init_func(prog) is called instead of
+            ctype() to create the variable (for non-constant initializers)
+        """
+        self.name = name
+        self.ctype = ctype
+        self.args = args
+        self.init_func = init_func
+
+    def __get__(self, instance, owner):
+        if instance is None:
+            return self
+        if self.init_func is None:
+            cobj = self.ctype(instance.__adr_space__, *self.args)
+        else:
+            cobj = self.init_func(instance)
+        instance.__dict__[self.name] = cobj
+        return cobj
 
 
 class CProgram(object):
 
+    # is set to a cymu.coverage.Coverage object by the compiler if the
+    # program was compiled with coverage instrumentation
+    __coverage__ = None
+
+    # is set to a cymu.trace.Trace object by the compiler if the program
+    # was compiled with tracing enabled
+    __trace__ = None
+
+    # is set by the compiler to the list of statistics of the optimization
+    # passes (see cymu.optimizer.PassStats)
+    __pass_stats__ = None
+
+    # is set by the compiler to the durations of the compile phases and the
+    # sizes of the intermediate results (see cymu.compiler.CompileStats)
+    __compile_stats__ = None
+
+    # is set to True by the compiler if the program was compiled in
+    # cooperative mode (see cymu.scheduler)
+    __cooperative__ = False
+
+    # maps the names of declared (but not defined) C functions to their
+    # prototypes (result ctype, list of param ctypes, is variadic). Ctypes
+    # not supported by cymu are None (see cymu.externs)
+    __extern_protos__ = {}
+
+    # the names of all global variables of the program (set by the
+    # compiler). Used by the optimizer (see
+    # cymu.optimizer.hoist_global_attrs())
+    __global_names__ = ()
+
+    # is set to True by the compiler if the global variables are created on
+    # first access (see LazyGlobal)
+    __lazy_globals__ = False
+
+    # is set by the compiler to the purity class of every defined C function
+    # (see cymu.analysis)
+    __purity__ = {}
+
+    # is set by the compiler to the result caches of the memoized C
+    # functions (see cymu.memo)
+    __memo_caches__ = {}
+
+    # if False, the CObjs of the program do not check for uninitialized
+    # values (see AddressSpace)
+    __checked__ = True
+
+    # the const global variables with constant initializers as tuples
+    # (name, ctype, init args). They are created once per class by
+    # init_const_segment()
+    __const_table__ = ()
+
+    # the AddressSpace of the const global variables (see
+    # init_const_segment())
+    __const_segment__ = None
+
     def __init__(self):
         super(CProgram, self).__init__()
-        self.__adr_space__ = AddressSpace()
+        cls = type(self)
+        if cls.__const_table__ and '__const_segment__' not in cls.__dict__:
+            cls.init_const_segment()
+        self.__adr_space__ = AddressSpace(self.__checked__,
+                                          shared=cls.__const_segment__)
         self.global_vars()
 
+    @classmethod
+    def init_const_segment(cls):
+        """
+        creates the variables of __const_table__ as read-only class
+        attributes, so that they are shared between all program objects
+        instead of being copied into every program object
+        """
+        adr_space = cls.__const_segment__ = AddressSpace(
+            cls.__checked__, start_adr=AddressSpace.CONST_START_ADR)
+        for name, ctype, args in cls.__const_table__:
+            setattr(cls, name, make_readonly(ctype(adr_space, *args)))
+
+    # the global variables with constant initializers as tuples
+    # (name, ctype, init args). They are created by init_global_table()
+    __global_table__ = ()
+
     def global_vars(self):
         return
 
+    def init_global_table(self, start, stop):
+        """
+        creates the global variables start ... stop-1 of __global_table__
+        """
+        adr_space = self.__adr_space__
+        for name, ctype, args in \
+                itertools.islice(self.__global_table__, start, stop):
+            setattr(self, name, ctype(adr_space, *args))
+
     def __repr__(self):
         return "<CProgram>"
 
@@ -0,0 +1,154 @@
+"""
+Binding of python functions to C functions, that are declared but not
+defined within a CModule ("extern functions").
+
+For every C prototype a marshalling thunk is generated once (when binding
+the function). It converts the C objects passed by the C code to python
+objects (ints for integer parameters, converted to the value range of the
+parameter type) and the result of the python function to a C object of the
+result type.
+"""
+import types
+
+from cymu.datamodel import IntCType
+from cymu.scheduler import Return
+
+
+class ExternRegistry(object):
+    """
+    Maps names of extern C functions to python functions.
+    """
+
+    def __init__(self, funcs=None):
+        """
+        :param dict[str, callable] funcs: initial content of the registry
+        """
+        self.__funcs = dict(funcs or {})
+
+    def register(self, name, func=None):
+        """
+        Registers *func* as implementation of the C function *name*. If func
+        is omitted, a decorator is returned:
+
+            @registry.register('read_reg')
+            def read_reg(adr):
+                ...
+        """
+        if func is None:
+            return lambda func: self.register(name, func)
+        self.__funcs[name] = func
+        return func
+
+    def __contains__(self, name):
+        return name in self.__funcs
+
+    def __getitem__(self, name):
+        return self.__funcs[name]
+
+    def names(self):
+        return sorted(self.__funcs)
+
+
+def coroutine_result(coroutine, result_ctype, adr_space):
+    """
+    converts the result of a coroutine (that implements an extern function
+    of a cooperative CModule) to result_ctype
+    """
+    result = yield coroutine
+    raise Return(result_ctype(adr_space, result))
+
+
+# cache of thunk factories. The key is the signature of the thunk (see
+# thunk_factory())
+_thunk_factories = {}
+
+def int_param_src(param, ctype):
+    """
+    returns the source code of an expression, that converts the integer
+    CObj (or python int) *param* to a python int in the value range of ctype
+    (like IntCType.wrap())
+    """
+    if ctype.signed:
+        sign_bit = 1 << (ctype.bits - 1)
+        return '((int({}) + {}) & {}) - {}'.format(param, sign_bit,
+                                                   ctype.mask, sign_bit)
+    else:
+        return 'int({}) & {}'.format(param, ctype.mask)
+
+def thunk_factory(int_ctypes, variadic, convert_result, cooperative):
+    """
+    returns a function, that creates thunks for the given signature
+    (func, result_ctype) -> thunk. The source code of the factory is generated
+    and compiled once per signature.
+
+    :param tuple[IntCType] int_ctypes: for every parameter its type, if it
+        is an integer (which is passed as python int to the python function)
+        or None
+    """
+    key = int_ctypes, variadic, convert_result, cooperative
+    try:
+        return _thunk_factories[key]
+    except KeyError:
+        pass
+    params = ['p{}'.format(ndx) for ndx in range(len(int_ctypes))]
+    args = [param if ctype is None else int_param_src(param, ctype)
+            for param, ctype in zip(params, int_ctypes)]
+    if variadic:
+        params.append('*varargs')
+        args.append('*varargs')
+    call_src = 'func({})'.format(', '.join(args))
+    if not convert_result:
+        body_src = ['return ' + call_src]
+    else:
+        body_src = ['result = ' + call_src]
+        if cooperative:
+            body_src += [
+                'if type(result) is GeneratorType:',
+                '    return coroutine_result(',
+                '        result, result_ctype, __globals__.__adr_space__)']
+        body_src += [
+            'return result_ctype(__globals__.__adr_space__, result)']
+    factory_src = '\n'.join(
+        ['def factory(func, result_ctype):',
+         '    def thunk({}):'.format(', '.join(['__globals__'] + params))] +
+        ['        ' + line for line in body_src] +
+        ['    return thunk'])
+    namespace = dict(GeneratorType=types.GeneratorType,
+                     coroutine_result=coroutine_result)
+    exec compile(factory_src, '<thunk factory>', 'exec') in namespace
+    factory = _thunk_factories[key] = namespace['factory']
+    return factory
+
+def make_thunk(name, func, prototype, cooperative=False):
+    """
+    creates a method for CModule, that calls *func* with marshalled
+    parameters.
+
+    :param tuple prototype: the prototype of the C function as stored in
+        CModule.__extern_protos__
+    """
+    result_ctype, param_ctypes, variadic = prototype
+    int_ctypes = tuple(param_ctype if isinstance(param_ctype, IntCType)
+                       else None
+                       for param_ctype in param_ctypes)
+    factory = thunk_factory(int_ctypes, variadic, result_ctype is not None,
+                            cooperative)
+    thunk = factory(func, result_ctype)
+    thunk.__name__ = name
+    return thunk
+
+def bind_externs(cmodule, registry):
+    """
+    Binds all extern functions of *cmodule*, that are registered in
+    *registry* (by adding a marshalling thunk as method).
+
+    :type registry: ExternRegistry
+    :return: the names of the bound functions
+    """
+    bound_names = []
+    for name, prototype in sorted(cmodule.__extern_protos__.items()):
+        if name in registry:
+            setattr(cmodule, name, make_thunk(name, registry[name], prototype,
+                                              cmodule.__cooperative__))
+            bound_names.append(name)
+    return bound_names
@@ -0,0 +1,465 @@
+"""
+The frontend walks the cursor tree of a clang translation unit once and
+converts it into a lightweight tree of python objects (the "IR").
+
+Every access to a clang cursor is a ctypes call into libclang. Thus the
+compiler does not work on the cursors directly but on the IR, which
+contains only the information the compiler actually needs.
+
+The IR can be stored to disk (see dump() and load()), so that the code
+generation can be done without libclang.
+"""
+import array
+import struct
+import sys
+import zlib
+
+
+class SrcLocation(object):
+
+    __slots__ = ('filename', 'line', 'column')
+
+    def __init__(self, filename, line, column):
+        self.filename = filename
+        self.line = line
+        self.column = column
+
+    def __repr__(self):
+        return '{}:{}:{}'.format(self.filename, self.line, self.column)
+
+
+class Type(object):
+    """
+    A canonical C type.
+
+    :ivar str kind: the name of the clang TypeKind (i.e. 'INT' or 'POINTER')
+    :ivar str spelling: the C name of the type
+    :ivar Type pointee: the referred type (only for kind 'POINTER')
+    :ivar str decl_spelling: the name of the declaration (only for kind
+        'RECORD', i.e. 's' for 'struct s')
+    :ivar Type result: the result type (only for function types)
+    :ivar bool is_const: True if the type is const qualified
+    """
+
+    __slots__ = ('kind', 'spelling', 'pointee', 'decl_spelling', 'result',
+                 'is_const')
+
+    def __init__(self, kind, spelling, pointee=None, decl_spelling=None,
+                 result=None, is_const=False):
+        self.kind = kind
+        self.spelling = spelling
+        self.pointee = pointee
+        self.decl_spelling = decl_spelling
+        self.result = result
+        self.is_const = is_const
+
+    def __repr__(self):
+        return '<Type {}>'.format(self.spelling)
+
+
+class Node(object):
+    """
+    A node of the IR. Corresponds to a clang cursor.
+
+    :ivar str kind: the name of the clang CursorKind (i.e. 'VAR_DECL')
+    :ivar str spelling: the name of the declaration/referred declaration
+    :ivar Type type: the (canonical) type of the cursor
+    :ivar SrcLocation location: the start of the cursor's source range
+    :ivar SrcLocation end_location: the end of the cursor's source range
+        (only for kinds 'FUNCTION_DECL' and 'FOR_STMT')
+    :ivar list[Node] children: the child nodes. A 'FOR_STMT' has always
+        the children [init, cond, inc, body], where missing parts are
+        represented by 'NULL_STMT' nodes
+    :ivar bool is_expr: True if this is an expression
+    :ivar str operator: the name of the operator kind (i.e. 'SUB_ASSIGN'),
+        only for operator nodes
+    :ivar int value: the value of integer literals
+    """
+
+    __slots__ = ('kind', 'spelling', 'type', 'location', 'end_location',
+                 'children', 'is_expr', 'operator', 'value')
+
+    def __init__(self, kind, spelling, type, location, children,
+                 is_expr=False, end_location=None, operator=None, value=None):
+        self.kind = kind
+        self.spelling = spelling
+        self.type = type
+        self.location = location
+        self.end_location = end_location
+        self.children = children
+        self.is_expr = is_expr
+        self.operator = operator
+        self.value = value
+
+    def __repr__(self):
+        return '<Node {} {!r}>'.format(self.kind, self.spelling)
+
+    def iter_nodes(self):
+        """
+        Iterates over this node and all its (recursive) children
+        """
+        node_stack = [self]
+        while node_stack:
+            node = node_stack.pop()
+            yield node
+            node_stack.extend(reversed(node.children))
+
+
+def parse_int_literal(spelling):
+    """
+    converts the spelling of a C integer literal (i.e. '0x10UL') to int
+    """
+    return int(spelling.rstrip('uUlL'), 0)
+
+
+class ExtractError(Exception):
+    """
+    raised if the clang cursor tree cannot be converted to IR
+    """
+
+
+class Extractor(object):
+    """
+    Converts a clang cursor tree to an IR tree.
+    Types and filenames are shared between all nodes that refer them.
+    """
+
+    OPERATOR_KINDS = {'BINARY_OPERATOR', 'UNARY_OPERATOR',
+                      'COMPOUND_ASSIGNMENT_OPERATOR'}
+
+    def __init__(self):
+        self.__types = {}
+        self.__filenames = {}
+        self.__expr_kinds = {}
+        self.cursor_count = 0
+
+    def filename(self, file_obj):
+        if file_obj is None:
+            return None
+        filename = file_obj.name
+        return self.__filenames.setdefault(filename, filename)
+
+    def location(self, src_location):
+        return SrcLocation(self.filename(src_location.file),
+                           src_location.line,
+                           src_location.column)
+
+    def type(self, type_c):
+        """
+        :type type_c: clang.cindex.Type
+        :rtype: Type
+        """
+        type_c = type_c.get_canonical()
+        kind = type_c.kind.name
+        spelling = type_c.spelling
+        try:
+            return self.__types[kind, spelling]
+        except KeyError:
+            pass
+        type_ir = Type(kind, spelling,
+                       is_const=type_c.is_const_qualified())
+        self.__types[kind, spelling] = type_ir
+        if kind == 'POINTER':
+            type_ir.pointee = self.type(type_c.get_pointee())
+        elif kind == 'RECORD':
+            type_ir.decl_spelling = type_c.get_declaration().spelling
+        elif kind in ('FUNCTIONPROTO', 'FUNCTIONNOPROTO'):
+            type_ir.result = self.type(type_c.get_result())
+        return type_ir
+
+    def is_expr(self, cursor_kind):
+        try:
+            return self.__expr_kinds[cursor_kind]
+        except KeyError:
+            is_expr = cursor_kind.is_expression()
+            self.__expr_kinds[cursor_kind] = is_expr
+            return is_expr
+
+    def node(self, cursor):
+        """
+        :type cursor: clang.cindex.Cursor
+        :rtype: Node
+        """
+        self.cursor_count += 1
+        cursor_kind = cursor.kind
+        kind = cursor_kind.name
+        node_ir = Node(kind,
+                       cursor.spelling,
+                       self.type(cursor.type),
+                       self.location(cursor.location),
+                       [self.node(child) for child in cursor.get_children()],
+                       self.is_expr(cursor_kind))
+        if kind in self.OPERATOR_KINDS:
+            node_ir.operator = cursor.operator_kind.name
+        elif kind == 'INTEGER_LITERAL':
+            node_ir.value = parse_int_literal(
+                next(cursor.get_tokens()).spelling)
+        elif kind == 'FUNCTION_DECL':
+            node_ir.end_location = self.location(cursor.extent.end)
+        elif kind == 'FOR_STMT':
+            node_ir.end_location = self.location(cursor.extent.end)
+            node_ir.children = self.for_stmt_parts(cursor, node_ir)
+        return node_ir
+
+    def for_stmt_parts(self, cursor, for_stmt_ir):
+        """
+        clang omits the missing parts of a for statement (i.e. the
+        condition of 'for (;;)') from the children of the cursor. Thus, if
+        only some parts are missing, the parts are assigned by their
+        position relative to the separators of the for statement's header.
+
+        :rtype: list[Node]
+        :return: [init, cond, inc, body]
+        """
+        children_ir = for_stmt_ir.children
+        null_stmt_ir = Node('NULL_STMT', '', for_stmt_ir.type,
+                            for_stmt_ir.location, [])
+        if len(children_ir) == 4:
+            return children_ir
+        elif len(children_ir) == 1:
+            return [null_stmt_ir] * 3 + children_ir
+        tokens = cursor.get_tokens()
+        first_token = next(tokens, None)
+        if first_token is None or first_token.spelling != 'for' or \
+                (first_token.location.line, first_token.location.column) \
+                != (for_stmt_ir.location.line, for_stmt_ir.location.column):
+            raise ExtractError(
+                '{}: cannot determine the parts of a for statement '
+                'generated by a macro'.format(for_stmt_ir.location))
+        separators = []
+        depth = 0
+        for token in tokens:
+            spelling = token.spelling
+            if spelling == '(':
+                depth += 1
+            elif spelling == ')':
+                depth -= 1
+                if depth == 0:
+                    separators.append((token.location.line,
+                                       token.location.column))
+                    break
+            elif spelling == ';' and depth == 1:
+                separators.append((token.location.line,
+                                   token.location.column))
+        parts = [None] * 4
+        for child_ir in children_ir:
+            position = (child_ir.location.line, child_ir.location.column)
+            slot = sum(1 for separator in separators if separator < position)
+            if len(separators) != 3 or parts[slot] is not None:
+                raise ExtractError(
+                    '{}: cannot determine the parts of a for statement '
+                    '(is its header generated by a macro?)'
+                    .format(for_stmt_ir.location))
+            parts[slot] = child_ir
+        if parts[3] is None:
+            raise ExtractError('{}: for statement without body'
+                               .format(for_stmt_ir.location))
+        return [null_stmt_ir if part_ir is None else part_ir
+                for part_ir in parts]
+
+
+def extract(transunit):
+    """
+    converts a translation unit to IR
+
+    :type transunit: clang.cindex.TranslationUnit
+    :rtype: Node
+    :return: a node of kind 'TRANSLATION_UNIT'
+    """
+    return Extractor().node(transunit.cursor)
+
+
+class IRFormatError(Exception):
+    pass
+
+
+# The IR file format (all integers are little endian):
+#   header:   MAGIC, IR_VERSION (uint16)
+#   payload:  zlib compressed:
+#     string table:   uint32 byte length + strings separated by '\0'
+#     type table:     uint32 count + count * TYPE_FIELDS int32
+#     node table:     uint32 count + count * NODE_FIELDS int32 (preorder)
+# All references to strings/types are indices into the corresponding table,
+# -1 represents None.
+MAGIC = b'CYMUIR'
+IR_VERSION = 3
+TYPE_FIELDS = 6     # kind, spelling, pointee, decl_spelling, result,
+                    # is_const
+NODE_FIELDS = 13    # kind, spelling, type, filename, line, column,
+                    # child count, is_expr, operator, value, end_filename,
+                    # end_line, end_column
+
+
+def _int32_array(values):
+    arr = array.array('i', values)
+    if sys.byteorder != 'little':
+        arr.byteswap()
+    return arr
+
+
+def dumps(transunit_ir):
+    """
+    converts a IR tree to a binary string
+
+    :type transunit_ir: Node
+    :rtype: bytes
+    """
+    strings = {}
+    def str_ndx(string):
+        if string is None:
+            return -1
+        try:
+            return strings[string]
+        except KeyError:
+            strings[string] = len(strings)
+            return len(strings) - 1
+
+    types = {}
+    type_table = []
+    def type_ndx(type_ir):
+        if type_ir is None:
+            return -1
+        try:
+            return types[id(type_ir)]
+        except KeyError:
+            ndx = types[id(type_ir)] = len(types)
+            type_table.extend([0] * TYPE_FIELDS)
+            type_table[ndx*TYPE_FIELDS:(ndx+1)*TYPE_FIELDS] = [
+                str_ndx(type_ir.kind),
+                str_ndx(type_ir.spelling),
+                type_ndx(type_ir.pointee),
+                str_ndx(type_ir.decl_spelling),
+                type_ndx(type_ir.result),
+                int(type_ir.is_const)]
+            return ndx
+
+    node_table = []
+    node_cnt = 0
+    for node in transunit_ir.iter_nodes():
+        node_cnt += 1
+        end_location = node.end_location or SrcLocation(None, -1, -1)
+        node_table += [
+            str_ndx(node.kind),
+            str_ndx(node.spelling),
+            type_ndx(node.type),
+            str_ndx(node.location.filename),
+            node.location.line,
+            node.location.column,
+            len(node.children),
+            int(node.is_expr),
+            str_ndx(node.operator),
+            str_ndx(None if node.value is None else str(node.value)),
+            str_ndx(end_location.filename),
+            end_location.line,
+            end_location.column]
+
+    string_list = sorted(strings, key=strings.get)
+    string_data = b'\0'.join(string_list)
+    payload = b''.join([
+        struct.pack('<I', len(string_data)),
+        string_data,
+        struct.pack('<I', len(types)),
+        _int32_array(type_table).tostring(),
+        struct.pack('<I', node_cnt),
+        _int32_array(node_table).tostring()])
+    return MAGIC + struct.pack('<H', IR_VERSION) + zlib.compress(payload)
+
+
+def loads(data):
+    """
+    converts a binary string created by dumps() back to an IR tree
+
+    :type data: bytes
+    :rtype: Node
+    """
+    header_len = len(MAGIC) + 2
+    if data[:len(MAGIC)] != MAGIC:
+        raise IRFormatError('not a cymu IR file')
+    [version] = struct.unpack('<H', data[len(MAGIC):header_len])
+    if version != IR_VERSION:
+        raise IRFormatError('unsupported IR version {} (expected {})'
+                            .format(version, IR_VERSION))
+    try:
+        payload = zlib.decompress(data[header_len:])
+    except zlib.error as exc:
+        raise IRFormatError('corrupted IR file ({})'.format(exc))
+
+    def read_table(offset, fields):
+        [cnt] = struct.unpack_from('<I', payload, offset)
+        offset += 4
+        table = array.array('i')
+        end_offset = offset + cnt * fields * table.itemsize
+        table.fromstring(payload[offset:end_offset])
+        if sys.byteorder != 'little':
+            table.byteswap()
+        return table, end_offset
+
+    [strings_len] = struct.unpack_from('<I', payload, 0)
+    strings = payload[4:4 + strings_len].split(b'\0')
+    type_table, offset = read_table(4 + strings_len, TYPE_FIELDS)
+    node_table, offset = read_table(offset, NODE_FIELDS)
+
+    # None is appended, so that index -1 maps to None
+    strings.append(None)
+    types = [Type(strings[type_table[ndx]], strings[type_table[ndx+1]],
+                  decl_spelling=strings[type_table[ndx+3]],
+                  is_const=bool(type_table[ndx+5]))
+             for ndx in range(0, len(type_table), TYPE_FIELDS)]
+    types.append(None)
+    for type_ir, ndx in zip(types, range(0, len(type_table), TYPE_FIELDS)):
+        type_ir.pointee = types[type_table[ndx+2]]
+        type_ir.result = types[type_table[ndx+4]]
+
+    locations = {}
+    def location(filename_ndx, line, column):
+        try:
+            return locations[filename_ndx, line, column]
+        except KeyError:
+            loc = SrcLocation(strings[filename_ndx], line, column)
+            locations[filename_ndx, line, column] = loc
+            return loc
+
+    root = None
+    parent_stack = []   # list of (children-list, remaining child count)
+    for ndx in xrange(0, len(node_table), NODE_FIELDS):
+        (kind, spelling, type_ndx, filename, line, column, child_cnt,
+         is_expr, operator, value, end_filename, end_line, end_column) = \
+            node_table[ndx:ndx+NODE_FIELDS]
+        node = Node(strings[kind],
+                    strings[spelling],
+                    types[type_ndx],
+                    location(filename, line, column),
+                    [],
+                    bool(is_expr),
+                    None if end_line == -1 else
+                    location(end_filename, end_line, end_column),
+                    strings[operator],
+                    None if value == -1 else int(strings[value]))
+        if parent_stack:
+            siblings, remaining = parent_stack[-1]
+            siblings.append(node)
+            if remaining == 1:
+                parent_stack.pop()
+            else:
+                parent_stack[-1] = siblings, remaining - 1
+        else:
+            root = node
+        if child_cnt > 0:
+            parent_stack.append((node.children, child_cnt))
+    if root is None or parent_stack:
+        raise IRFormatError('corrupted IR file (incomplete node table)')
+    return root
+
+
+def dump(transunit_ir, fileobj):
+    """
+    writes the IR tree in binary form to a (binary) file object
+    """
+    fileobj.write(dumps(transunit_ir))
+
+
+def load(fileobj):
+    """
+    reads an IR tree that was written by dump()
+    """
+    return loads(fileobj.read())
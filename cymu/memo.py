@@ -0,0 +1,85 @@
+"""
+Memoization of pure C functions (see cymu.analysis).
+
+The results of a memoized function are cached per CModule (as they do not
+depend on the program object) in a LRU cache, that is keyed on the integer
+values of the arguments. Only the raw result value is cached, every call
+returns a new CObj, so that callers may modify the result.
+"""
+import collections
+
+from cymu.datamodel import VarAccessError
+
+
+class LRUCache(object):
+    """
+    Maps argument tuples to (result ctype, raw result value). If more than
+    *maxsize* entries are stored, the least recently used one is dropped.
+    """
+
+    DEFAULT_MAXSIZE = 1024
+
+    def __init__(self, maxsize=DEFAULT_MAXSIZE):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self.__entries = collections.OrderedDict()
+
+    def __len__(self):
+        return len(self.__entries)
+
+    def __contains__(self, key):
+        return key in self.__entries
+
+    def lookup(self, key):
+        """
+        returns the entry of *key* (and marks it as most recently used) or
+        None if there is no entry
+        """
+        entries = self.__entries
+        try:
+            entry = entries.pop(key)
+        except KeyError:
+            self.misses += 1
+            return None
+        entries[key] = entry
+        self.hits += 1
+        return entry
+
+    def store(self, key, entry):
+        entries = self.__entries
+        entries[key] = entry
+        if len(entries) > self.maxsize:
+            entries.popitem(last=False)
+
+    def clear(self):
+        self.__entries.clear()
+        self.hits = self.misses = 0
+
+
+def memoize(func, cache):
+    """
+    returns a wrapper of the direct entry of a C function (see
+    cymu.compiler.astconv_func_decl()), that caches its results in *cache*.
+
+    :type cache: LRUCache
+    """
+    def memoized(__globals__, *args):
+        try:
+            key = tuple([int(arg) for arg in args])
+        except VarAccessError:
+            # the function decides how to handle uninitialized arguments
+            return func(__globals__, *args)
+        entry = cache.lookup(key)
+        if entry is not None:
+            result_ctype, result_val = entry
+            return result_ctype(__globals__.__adr_space__, result_val)
+        result = func(__globals__, *args)
+        try:
+            cache.store(key, (result.ctype, int(result)))
+        except VarAccessError:
+            pass
+        return result
+    memoized.__name__ = func.__name__
+    memoized.__wrapped__ = func
+    return memoized
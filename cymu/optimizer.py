@@ -0,0 +1,335 @@
+"""
+Optimization passes, that are run on the python AST generated by the
+compiler (before it is compiled to bytecode).
+
+A pass is a callable, that gets the ast.Module generated by the compiler
+and returns the (modified) ast.Module. Custom passes can be added to a
+PassManager via PassManager.register().
+"""
+import ast
+import collections
+import operator
+import time
+
+from cymu.datamodel import CProgram, IntCType
+
+
+INT_CTYPE_NAMES = frozenset(name for name, ctype in vars(CProgram).items()
+                            if isinstance(ctype, IntCType))
+
+
+# methods of CProgram, which create global variables without assigning
+# them explicitly (see CProgram.init_global_table())
+GLOBALS_CREATING_METHODS = frozenset(['init_global_table'])
+
+
+PassStats = collections.namedtuple(
+    'PassStats', 'name duration nodes_before nodes_after')
+
+
+def count_nodes(node_astpy):
+    return sum(1 for _ in ast.walk(node_astpy))
+
+
+def iter_stmt_lists(node_astpy):
+    """
+    Iterates over all statement lists (.body, .orelse, ...) of all nodes
+    """
+    for node in ast.walk(node_astpy):
+        for fieldname in ('body', 'orelse', 'finalbody'):
+            stmt_list = getattr(node, fieldname, None)
+            if isinstance(stmt_list, list):
+                yield stmt_list
+
+
+def is_ctype_expr(expr_astpy):
+    """
+    returns True, if expr_astpy is an expression generated by the compiler
+    for retrieving an integer CType (or a pointer to such a CType)
+    """
+    while isinstance(expr_astpy, ast.Attribute) and expr_astpy.attr == 'ptr':
+        expr_astpy = expr_astpy.value
+    return (isinstance(expr_astpy, ast.Attribute) and
+            expr_astpy.attr in INT_CTYPE_NAMES and
+            isinstance(expr_astpy.value, ast.Name) and
+            expr_astpy.value.id == '__globals__')
+
+
+def int_constant(expr_astpy):
+    """
+    If expr_astpy is a constant of type int (as generated by the compiler for
+    C integer literals), its value is returned. Otherwise None.
+    """
+    if isinstance(expr_astpy, ast.Call) and \
+            is_ctype_expr(expr_astpy.func) and \
+            expr_astpy.func.attr == 'int' and \
+            len(expr_astpy.args) == 1 and \
+            isinstance(expr_astpy.args[0], ast.Num) and \
+            not expr_astpy.keywords:
+        return expr_astpy.args[0].n
+    return None
+
+
+def bool_constant(expr_astpy):
+    """
+    If expr_astpy is a constant, its truth value is returned.
+    Otherwise None.
+    """
+    if isinstance(expr_astpy, ast.Name) and expr_astpy.id in ('True', 'False'):
+        return expr_astpy.id == 'True'
+    elif isinstance(expr_astpy, ast.UnaryOp) and \
+            isinstance(expr_astpy.op, ast.Not):
+        operand = bool_constant(expr_astpy.operand)
+        return None if operand is None else not operand
+    if isinstance(expr_astpy, ast.Num):
+        return expr_astpy.n != 0
+    int_value = int_constant(expr_astpy)
+    return None if int_value is None else int_value != 0
+
+
+def remove_dead_pass(module_astpy):
+    """
+    Removes all ast.Pass statements, that are not the last statement of a
+    statement list.
+    The last statement is kept, as it is required for syntactical reasons
+    or as source location marker (i.e. for the end of a C function).
+    """
+    for stmt_list in iter_stmt_lists(module_astpy):
+        stmt_list[:-1] = [stmt for stmt in stmt_list[:-1]
+                          if not isinstance(stmt, ast.Pass)]
+    return module_astpy
+
+
+class RedundantCastEliminator(ast.NodeTransformer):
+    """
+    Replaces casts of a newly created CObj to the same type
+    (i.e. "__globals__.int(__globals__.int(3))") by the inner CObj.
+    """
+
+    def visit_Call(self, node):
+        self.generic_visit(node)
+        if is_ctype_expr(node.func) and \
+                len(node.args) == 1 and not node.keywords and \
+                isinstance(node.args[0], ast.Call) and \
+                ast.dump(node.args[0].func) == ast.dump(node.func):
+            return node.args[0]
+        return node
+
+
+def eliminate_redundant_casts(module_astpy):
+    return RedundantCastEliminator().visit(module_astpy)
+
+
+# the operators on raw python integers, that are calculated at compile time
+# if both operands are constants
+RAW_INT_OPERATORS = {
+    ast.Add: operator.add,
+    ast.Sub: operator.sub,
+    ast.Mult: operator.mul,
+    ast.BitAnd: operator.and_,
+    ast.BitOr: operator.or_,
+    ast.BitXor: operator.xor,
+    ast.RShift: operator.rshift }
+
+# maximum shift count of shifts, that are calculated at compile time
+MAX_FOLDED_SHIFT_COUNT = 64
+
+
+class ConstantFolder(ast.NodeTransformer):
+    """
+    Calculates additions/subtractions of int constants and operations on
+    constant raw python integers (see cymu.compiler.astconv_int_value()) at
+    compile time and removes if-statements with constant conditions.
+    """
+
+    def visit_BinOp(self, node):
+        self.generic_visit(node)
+        if isinstance(node.left, ast.Num) and isinstance(node.right, ast.Num):
+            return self.fold_raw_int_op(node)
+        left_value = int_constant(node.left)
+        right_value = int_constant(node.right)
+        if left_value is None or right_value is None:
+            return node
+        if isinstance(node.op, ast.Add):
+            result = left_value + right_value
+        elif isinstance(node.op, ast.Sub):
+            result = left_value - right_value
+        else:
+            return node
+        result = CProgram.int.wrap(result)
+        return ast.copy_location(
+            ast.Call(func=node.left.func,
+                     args=[ast.Num(n=result)],
+                     keywords=[],
+                     starargs=None,
+                     kwargs=None),
+            node)
+
+    def fold_raw_int_op(self, node):
+        left_value, right_value = node.left.n, node.right.n
+        op_type = type(node.op)
+        if op_type in (ast.LShift, ast.RShift) and \
+                not 0 <= right_value <= MAX_FOLDED_SHIFT_COUNT:
+            return node
+        elif op_type is ast.LShift:
+            result = left_value << right_value
+        elif op_type in RAW_INT_OPERATORS:
+            result = RAW_INT_OPERATORS[op_type](left_value, right_value)
+        else:
+            return node
+        return ast.copy_location(ast.Num(n=result), node)
+
+    def visit_If(self, node):
+        self.generic_visit(node)
+        condition = bool_constant(node.test)
+        if condition is None:
+            return node
+        stmt_list = node.body if condition else node.orelse
+        return stmt_list or ast.copy_location(ast.Pass(), node)
+
+
+def fold_constants(module_astpy):
+    return ConstantFolder().visit(module_astpy)
+
+
+class GlobalAttrReplacer(ast.NodeTransformer):
+    """
+    Replaces reads of "__globals__.<name>" by reads of local variables.
+    """
+
+    def __init__(self, local_names):
+        """
+        :param dict[str, str] local_names: maps attribute names of
+            __globals__ to the names of the local variables
+        """
+        self.local_names = local_names
+
+    def visit_Attribute(self, node):
+        if isinstance(node.value, ast.Name) and \
+                node.value.id == '__globals__' and \
+                isinstance(node.ctx, ast.Load) and \
+                node.attr in self.local_names:
+            return ast.copy_location(
+                ast.Name(id=self.local_names[node.attr], ctx=ast.Load()),
+                node)
+        return self.generic_visit(node)
+
+
+def global_var_names(module_astpy):
+    """
+    returns the names of the global variables, that the compiler stored in
+    CModule.__global_names__ (see datamodel.CProgram)
+    """
+    for node in ast.walk(module_astpy):
+        if isinstance(node, ast.Assign) and \
+                isinstance(node.targets[0], ast.Name) and \
+                node.targets[0].id == '__global_names__':
+            return {elt.s for elt in node.value.elts}
+    return set()
+
+
+def hoist_global_attrs(module_astpy):
+    """
+    Within every function, attributes of __globals__ (global variables and
+    types), that are read more than once and never assigned, are read only
+    once at the beginning of the function and stored in a local variable.
+    In functions, that create global variables via
+    GLOBALS_CREATING_METHODS, only types are hoisted.
+    Of the global variables only the ones listed in
+    CModule.__global_names__ are hoisted. Other attributes (i.e. extern
+    functions) are never hoisted, as they might not be bound at all if they
+    are not used.
+    """
+    var_names = global_var_names(module_astpy)
+    for func_astpy in ast.walk(module_astpy):
+        if not isinstance(func_astpy, ast.FunctionDef):
+            continue
+        load_cnts = collections.Counter()
+        stores = set()
+        creates_globals = False
+        for node in ast.walk(func_astpy):
+            if isinstance(node, ast.Attribute) and \
+                    isinstance(node.value, ast.Name) and \
+                    node.value.id == '__globals__':
+                if isinstance(node.ctx, ast.Load):
+                    load_cnts[node.attr] += 1
+                else:
+                    stores.add(node.attr)
+                if node.attr in GLOBALS_CREATING_METHODS:
+                    creates_globals = True
+        local_names = {attrname: '__g_{}__'.format(attrname)
+                       for attrname, load_cnt in load_cnts.items()
+                       if load_cnt >= 2 and attrname not in stores and
+                       (attrname in INT_CTYPE_NAMES or
+                        attrname.startswith('struct_') or
+                        (not creates_globals and
+                         attrname in var_names))}
+        if not local_names:
+            continue
+        replacer = GlobalAttrReplacer(local_names)
+        func_astpy.body = [replacer.visit(stmt) for stmt in func_astpy.body]
+        func_astpy.body[:0] = [
+            ast.copy_location(
+                ast.Assign(
+                    targets=[ast.Name(id=local_name, ctx=ast.Store())],
+                    value=ast.Attribute(
+                        value=ast.Name(id='__globals__', ctx=ast.Load()),
+                        attr=attrname,
+                        ctx=ast.Load())),
+                func_astpy)
+            for attrname, local_name in sorted(local_names.items())]
+    return module_astpy
+
+
+DEFAULT_PASSES = [
+    ('eliminate_redundant_casts', eliminate_redundant_casts),
+    ('fold_constants', fold_constants),
+    ('remove_dead_pass', remove_dead_pass),
+    ('hoist_global_attrs', hoist_global_attrs)]
+
+
+class PassManager(object):
+    """
+    Runs a sequence of optimization passes and records per pass the
+    execution time and the number of AST nodes before/after the pass.
+    """
+
+    def __init__(self, passes=None):
+        """
+        :param list[(str, callable)] passes: list of passes (name, func).
+            If None, DEFAULT_PASSES is used.
+        """
+        self.passes = list(DEFAULT_PASSES if passes is None else passes)
+        self.stats = []
+
+    def register(self, name, pass_func, before=None):
+        """
+        adds a pass to the pipeline
+
+        :param str name: name of pass (used for the statistics)
+        :param callable pass_func: gets a ast.Module and returns a ast.Module
+        :param str before: if not None, the pass is inserted before the pass
+            of this name. Otherwise it is appended.
+        """
+        if before is None:
+            self.passes.append((name, pass_func))
+        else:
+            pass_names = [pass_name for pass_name, _ in self.passes]
+            self.passes.insert(pass_names.index(before), (name, pass_func))
+
+    def run(self, module_astpy):
+        """
+        :type module_astpy: ast.Module
+        :rtype: ast.Module
+        """
+        self.stats = []
+        nodes_after = count_nodes(module_astpy)
+        for name, pass_func in self.passes:
+            nodes_before = nodes_after
+            start_time = time.time()
+            module_astpy = pass_func(module_astpy)
+            duration = time.time() - start_time
+            nodes_after = count_nodes(module_astpy)
+            self.stats.append(
+                PassStats(name, duration, nodes_before, nodes_after))
+        return module_astpy
@@ -1,34 +1,384 @@
 import ast
+import sys
 
-def print_ast(node, include_attributes=False):
+
+def is_complex_field(x):
+    return (isinstance(x, ast.AST) and len(x._fields) > 0) or \
+           isinstance(x, list)
+
+def iter_ast_dump(node, include_attributes=False, max_depth=None,
+                  node_filter=None):
+    """
+    Iterates over the chunks of the formatted dump of the tree in *node*
+    (see print_ast()).
+    Does not use recursion, so that it works on arbitrary deep trees.
+    """
+    # every item of the stack is either a string, that shall be output as is
+    # or a tuple (value, indent, depth), which has to be formatted
+    stack = [(node, 0, 0)]
+    while stack:
+        item = stack.pop()
+        if isinstance(item, basestring):
+            yield item
+            continue
+        value, indent, depth = item
+        if isinstance(value, ast.AST):
+            if (max_depth is not None and depth > max_depth) or \
+                    (node_filter is not None and not node_filter(value)):
+                yield '%s(...)' % value.__class__.__name__
+                continue
+            fields = list(ast.iter_fields(value))
+            if any(is_complex_field(b) for a, b in fields):
+                indent_str = '\n'+'    '*(indent+1)
+            else:
+                indent_str = ''
+            items = []
+            for ndx, (a, b) in enumerate(fields):
+                items.append('%s%s%s=' % (ndx and ', ' or '', indent_str, a))
+                items.append((b, indent+1, depth+1))
+            if include_attributes and value._attributes:
+                items.append(fields and ', ' or ' ')
+                for ndx, a in enumerate(value._attributes):
+                    items.append('%s%s%s=' % (ndx and ', ' or '',
+                                              indent_str, a))
+                    items.append((getattr(value, a, None), indent+1, depth+1))
+            items.append(')')
+            stack.extend(reversed(items))
+            yield '%s(' % value.__class__.__name__
+        elif isinstance(value, list):
+            indent_str = '\n'+'    '*(indent+1) if value else ''
+            items = []
+            for ndx, x in enumerate(value):
+                items.append((ndx and ', ' or '') + indent_str)
+                items.append((x, indent+1, depth))
+            items.append(']')
+            stack.extend(reversed(items))
+            yield '['
+        else:
+            yield repr(value)
+
+def print_ast(node, include_attributes=False, fileobj=None, max_depth=None,
+              node_filter=None):
     """
     Prints a formatted dump of the tree in *node*.
     Derived from ast.dump, but extended provides a more clean presentation by
     adding new lines and indents
+
+    :param fileobj: the file object the dump is written to (incrementally).
+        If None, sys.stdout is used
+    :param int max_depth: if not None, nodes that are nested deeper are
+        printed as "ClassName(...)"
+    :param node_filter: if not None, a callable that gets an ast.AST object.
+        If it returns False, the node is printed as "ClassName(...)"
     """
-    def is_complex_field(x):
-        return (isinstance(x, ast.AST) and len(x._fields) > 0) or \
-               isinstance(x, list)
-    def _format(node, indent=0):
-        indent_str = '\n'+'    '*(indent+1)
-        if isinstance(node, ast.AST):
-            fields = [(a, _format(b, indent+1)) for a, b in ast.iter_fields(node)]
-            if not any(is_complex_field(b) for a, b in ast.iter_fields(node)):
-                indent_str = ''
-            rv = '%s(%s' % (node.__class__.__name__, ', '.join(
-                ('%s%s=%s' % ((indent_str,)+field)
-                 for field in fields)
-            ))
-            if include_attributes and node._attributes:
-                rv += fields and ', ' or ' '
-                rv += ', '.join('%s%s=%s' % (indent_str, a, _format(getattr(node, a), indent+1))
-                                for a in node._attributes)
-            return rv + ')'
-        elif isinstance(node, list):
-            if len(node) == 0:
-                indent_str = ''
-            return '[%s]' % ', '.join(indent_str + _format(x, indent+1) for x in node)
-        return repr(node)
     if not isinstance(node, ast.AST):
         raise TypeError('expected AST, got %r' % node.__class__.__name__)
-    print _format(node)
+    if fileobj is None:
+        fileobj = sys.stdout
+    for chunk in iter_ast_dump(node, include_attributes, max_depth,
+                               node_filter):
+        fileobj.write(chunk)
+    fileobj.write('\n')
+
+
+BINOP_SYMBOLS = {
+    ast.Add: '+', ast.Sub: '-', ast.Mult: '*', ast.Div: '/',
+    ast.FloorDiv: '//', ast.Mod: '%', ast.Pow: '**',
+    ast.LShift: '<<', ast.RShift: '>>',
+    ast.BitOr: '|', ast.BitXor: '^', ast.BitAnd: '&' }
+
+UNARYOP_SYMBOLS = {
+    ast.Invert: '~', ast.Not: 'not ', ast.UAdd: '+', ast.USub: '-' }
+
+CMPOP_SYMBOLS = {
+    ast.Eq: '==', ast.NotEq: '!=', ast.Lt: '<', ast.LtE: '<=',
+    ast.Gt: '>', ast.GtE: '>=', ast.Is: 'is', ast.IsNot: 'is not',
+    ast.In: 'in', ast.NotIn: 'not in' }
+
+BOOLOP_SYMBOLS = {ast.And: 'and', ast.Or: 'or'}
+
+
+class SourceGenerator(object):
+    """
+    Converts a python AST (as generated by cymu.compiler) back to
+    python source code.
+    """
+
+    def __init__(self):
+        # list of (python source line, lineno of the generating AST node)
+        self.lines = []
+
+    def line(self, indent, text, node):
+        self.lines.append(('    ' * indent + text,
+                           getattr(node, 'lineno', None)))
+
+    def body(self, indent, stmts):
+        for stmt in stmts:
+            self.stmt(indent, stmt)
+
+    def stmt(self, indent, node):
+        try:
+            stmt_method = getattr(self, 'stmt_' + node.__class__.__name__)
+        except AttributeError:
+            raise TypeError('unsupported statement %r'
+                            % node.__class__.__name__)
+        stmt_method(indent, node)
+
+    def stmt_Module(self, indent, node):
+        self.body(indent, node.body)
+
+    def stmt_ImportFrom(self, indent, node):
+        self.line(indent, 'from %s%s import %s' % (
+            '.' * (getattr(node, 'level', None) or 0), node.module or '',
+            ', '.join(alias.name if alias.asname is None else
+                      '%s as %s' % (alias.name, alias.asname)
+                      for alias in node.names)), node)
+
+    def stmt_Import(self, indent, node):
+        self.line(indent, 'import %s' % ', '.join(
+            alias.name if alias.asname is None else
+            '%s as %s' % (alias.name, alias.asname)
+            for alias in node.names), node)
+
+    def decorators(self, indent, node):
+        for decorator in node.decorator_list:
+            self.line(indent, '@' + self.expr(decorator), decorator)
+
+    def stmt_ClassDef(self, indent, node):
+        self.decorators(indent, node)
+        self.line(indent, 'class %s(%s):' % (
+            node.name, ', '.join(self.expr(base) for base in node.bases)),
+            node)
+        self.body(indent + 1, node.body)
+
+    def stmt_FunctionDef(self, indent, node):
+        self.decorators(indent, node)
+        args = node.args
+        arg_strs = [self.expr(arg) for arg in args.args]
+        for ndx, default in enumerate(args.defaults):
+            arg_ndx = len(arg_strs) - len(args.defaults) + ndx
+            arg_strs[arg_ndx] += '=' + self.expr(default)
+        if args.vararg is not None:
+            arg_strs.append('*' + args.vararg)
+        if args.kwarg is not None:
+            arg_strs.append('**' + args.kwarg)
+        self.line(indent, 'def %s(%s):' % (node.name, ', '.join(arg_strs)),
+                  node)
+        self.body(indent + 1, node.body)
+
+    def stmt_Assign(self, indent, node):
+        self.line(indent, '%s = %s' % (
+            ' = '.join(self.expr(target) for target in node.targets),
+            self.expr(node.value)), node)
+
+    def stmt_AugAssign(self, indent, node):
+        self.line(indent, '%s %s= %s' % (
+            self.expr(node.target), BINOP_SYMBOLS[type(node.op)],
+            self.expr(node.value)), node)
+
+    def stmt_Expr(self, indent, node):
+        self.line(indent, self.expr(node.value), node)
+
+    def stmt_Return(self, indent, node):
+        if node.value is None:
+            self.line(indent, 'return', node)
+        else:
+            self.line(indent, 'return ' + self.expr(node.value), node)
+
+    def stmt_Delete(self, indent, node):
+        self.line(indent, 'del ' + ', '.join(self.expr(target)
+                                             for target in node.targets),
+                  node)
+
+    def stmt_Global(self, indent, node):
+        self.line(indent, 'global ' + ', '.join(node.names), node)
+
+    def stmt_Pass(self, indent, node):
+        self.line(indent, 'pass', node)
+
+    def stmt_Break(self, indent, node):
+        self.line(indent, 'break', node)
+
+    def stmt_Continue(self, indent, node):
+        self.line(indent, 'continue', node)
+
+    def stmt_Raise(self, indent, node):
+        exc_parts = [self.expr(part) for part in (node.type, node.inst,
+                                                  node.tback)
+                     if part is not None]
+        self.line(indent, ' '.join(['raise', ', '.join(exc_parts)]).rstrip(),
+                  node)
+
+    def orelse(self, indent, node):
+        orelse = node.orelse
+        if len(orelse) == 1 and isinstance(orelse[0], ast.If) and \
+                isinstance(node, ast.If):
+            self.line(indent, 'elif %s:' % self.expr(orelse[0].test),
+                      orelse[0])
+            self.body(indent + 1, orelse[0].body)
+            self.orelse(indent, orelse[0])
+        elif orelse:
+            self.line(indent, 'else:', orelse[0])
+            self.body(indent + 1, orelse)
+
+    def stmt_If(self, indent, node):
+        self.line(indent, 'if %s:' % self.expr(node.test), node)
+        self.body(indent + 1, node.body)
+        self.orelse(indent, node)
+
+    def stmt_While(self, indent, node):
+        self.line(indent, 'while %s:' % self.expr(node.test), node)
+        self.body(indent + 1, node.body)
+        self.orelse(indent, node)
+
+    def stmt_For(self, indent, node):
+        self.line(indent, 'for %s in %s:' % (self.expr(node.target),
+                                             self.expr(node.iter)), node)
+        self.body(indent + 1, node.body)
+        self.orelse(indent, node)
+
+    def stmt_TryExcept(self, indent, node):
+        self.line(indent, 'try:', node)
+        self.body(indent + 1, node.body)
+        for handler in node.handlers:
+            handler_str = 'except'
+            if handler.type is not None:
+                handler_str += ' ' + self.expr(handler.type)
+                if handler.name is not None:
+                    handler_str += ' as ' + self.expr(handler.name)
+            self.line(indent, handler_str + ':', handler)
+            self.body(indent + 1, handler.body)
+        self.orelse(indent, node)
+
+    def stmt_TryFinally(self, indent, node):
+        self.line(indent, 'try:', node)
+        self.body(indent + 1, node.body)
+        self.line(indent, 'finally:', node.finalbody[0])
+        self.body(indent + 1, node.finalbody)
+
+    def operand(self, node):
+        """
+        converts an expression, that is an operand of another expression
+        """
+        expr_str = self.expr(node)
+        if isinstance(node, (ast.BinOp, ast.UnaryOp, ast.BoolOp,
+                             ast.Compare, ast.Lambda, ast.IfExp,
+                             ast.Yield)) or \
+                (isinstance(node, ast.Num) and node.n < 0):
+            return '(' + expr_str + ')'
+        return expr_str
+
+    def expr(self, node):
+        try:
+            expr_method = getattr(self, 'expr_' + node.__class__.__name__)
+        except AttributeError:
+            raise TypeError('unsupported expression %r'
+                            % node.__class__.__name__)
+        return expr_method(node)
+
+    def expr_Name(self, node):
+        return node.id
+
+    def expr_Num(self, node):
+        return repr(node.n)
+
+    def expr_Str(self, node):
+        return repr(node.s)
+
+    def expr_Attribute(self, node):
+        if isinstance(node.value, ast.Num):
+            return '(%s).%s' % (self.expr(node.value), node.attr)
+        return '%s.%s' % (self.operand(node.value), node.attr)
+
+    def expr_Call(self, node):
+        arg_strs = [self.expr(arg) for arg in node.args]
+        arg_strs += ['%s=%s' % (keyword.arg, self.expr(keyword.value))
+                     for keyword in node.keywords]
+        if node.starargs is not None:
+            arg_strs.append('*' + self.expr(node.starargs))
+        if node.kwargs is not None:
+            arg_strs.append('**' + self.expr(node.kwargs))
+        return '%s(%s)' % (self.operand(node.func), ', '.join(arg_strs))
+
+    def expr_BinOp(self, node):
+        return '%s %s %s' % (self.operand(node.left),
+                             BINOP_SYMBOLS[type(node.op)],
+                             self.operand(node.right))
+
+    def expr_UnaryOp(self, node):
+        return UNARYOP_SYMBOLS[type(node.op)] + self.operand(node.operand)
+
+    def expr_BoolOp(self, node):
+        return (' %s ' % BOOLOP_SYMBOLS[type(node.op)]).join(
+            self.operand(value) for value in node.values)
+
+    def expr_Compare(self, node):
+        return self.operand(node.left) + ''.join(
+            ' %s %s' % (CMPOP_SYMBOLS[type(op)], self.operand(comparator))
+            for op, comparator in zip(node.ops, node.comparators))
+
+    def expr_IfExp(self, node):
+        return '%s if %s else %s' % (self.operand(node.body),
+                                     self.operand(node.test),
+                                     self.operand(node.orelse))
+
+    def expr_Lambda(self, node):
+        return 'lambda %s: %s' % (
+            ', '.join(self.expr(arg) for arg in node.args.args),
+            self.expr(node.body))
+
+    def expr_Yield(self, node):
+        if node.value is None:
+            return 'yield'
+        return 'yield ' + self.expr(node.value)
+
+    def expr_Subscript(self, node):
+        return '%s[%s]' % (self.operand(node.value), self.expr(node.slice))
+
+    def expr_Index(self, node):
+        return self.expr(node.value)
+
+    def expr_Slice(self, node):
+        return '%s:%s' % (
+            '' if node.lower is None else self.expr(node.lower),
+            '' if node.upper is None else self.expr(node.upper))
+
+    def expr_Tuple(self, node):
+        if len(node.elts) == 1:
+            return '(%s,)' % self.expr(node.elts[0])
+        return '(%s)' % ', '.join(self.expr(elt) for elt in node.elts)
+
+    def expr_List(self, node):
+        return '[%s]' % ', '.join(self.expr(elt) for elt in node.elts)
+
+    def expr_Dict(self, node):
+        return '{%s}' % ', '.join(
+            '%s: %s' % (self.expr(key), self.expr(value))
+            for key, value in zip(node.keys, node.values))
+
+
+def write_source(node, fileobj=None, line_comments=False):
+    """
+    Writes the python source code of the tree in *node*.
+
+    :param fileobj: the file object the source code is written to.
+        If None, sys.stdout is used
+    :param bool line_comments: if True, every line is annotated by a comment
+        with the line number of the source code the AST was generated from
+        (for trees generated by cymu.compiler this is the C source code)
+    :rtype: list[int|None]
+    :return: a line map, that contains for every python source line
+        (line N is at index N-1) the line number of the source code the
+        AST was generated from.
+    """
+    if fileobj is None:
+        fileobj = sys.stdout
+    generator = SourceGenerator()
+    generator.stmt(0, node)
+    line_map = []
+    for text, lineno in generator.lines:
+        if line_comments and lineno is not None:
+            text = '%-60s # line %d' % (text, lineno)
+        fileobj.write(text + '\n')
+        line_map.append(lineno)
+    return line_map
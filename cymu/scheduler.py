@@ -0,0 +1,225 @@
+"""
+Cooperative multitasking of programs, that were compiled in cooperative
+mode (see compiler.compile_str(..., cooperative=True)).
+
+In cooperative mode every C function returns a generator (the
+"coroutine"), which yields:
+
+* None at the beginning of every loop iteration (preemption point)
+* the coroutine of every called C function
+* the result of every call of an extern (python) function. If an extern
+  function returns a generator, it is run as coroutine. This allows extern
+  functions to wait for an Event by "value = yield event"
+
+A Scheduler runs many coroutines (Tasks) interleaved in a single thread.
+"""
+import collections
+import sys
+import types
+
+
+class Return(StopIteration):
+    """
+    Raised by a coroutine to return a value (as python 2 does not support
+    "return value" within generators)
+    """
+
+    @property
+    def value(self):
+        return self.args[0] if self.args else None
+
+
+class DeadlockError(Exception):
+    pass
+
+
+class Event(object):
+    """
+    An event from outside of the emulated programs. A coroutine that yields
+    a not yet set event is suspended until the event is set. The value passed
+    to set() is the result of the yield expression.
+    """
+
+    def __init__(self):
+        self.is_set = False
+        self.value = None
+        self.__waiting_tasks = []
+
+    def set(self, value=None):
+        self.is_set = True
+        self.value = value
+        waiting_tasks, self.__waiting_tasks = self.__waiting_tasks, []
+        for task in waiting_tasks:
+            task.resume(value)
+
+    def clear(self):
+        self.is_set = False
+        self.value = None
+
+    def add_waiting_task(self, task):
+        self.__waiting_tasks.append(task)
+
+
+class Task(object):
+    """
+    A coroutine that is run by a Scheduler.
+
+    :ivar str state: one of READY, WAITING, DONE
+    :ivar int quota: the maximum number of preemption points, that are passed
+        before the scheduler switches to the next task
+    :ivar int steps: the number of preemption points passed so far
+    """
+
+    READY = 'ready'
+    WAITING = 'waiting'
+    DONE = 'done'
+
+    def __init__(self, scheduler, coroutine, quota):
+        self.scheduler = scheduler
+        self.quota = quota
+        self.state = self.READY
+        self.steps = 0
+        self.__gen_stack = [coroutine]
+        self.__send_value = None
+        self.__exc_info = None
+        self.__result = None
+
+    def __repr__(self):
+        return '<Task {} ({} steps)>'.format(self.state, self.steps)
+
+    @property
+    def done(self):
+        return self.state == self.DONE
+
+    def result(self):
+        """
+        returns the result of the task's coroutine or reraises the exception
+        the coroutine was terminated by
+        """
+        if not self.done:
+            raise ValueError('task is not finished yet')
+        if self.__exc_info is not None:
+            raise self.__exc_info[0], self.__exc_info[1], self.__exc_info[2]
+        return self.__result
+
+    def resume(self, value):
+        self.__send_value = value
+        self.state = self.READY
+        self.scheduler.make_ready(self)
+
+    def __finish(self, result, exc_info=None):
+        self.state = self.DONE
+        self.__result = result
+        self.__exc_info = exc_info
+
+    def run_slice(self):
+        """
+        Runs the task until its quota is exhausted, it waits for an event or
+        it is finished.
+        """
+        gen_stack = self.__gen_stack
+        remaining_quota = self.quota
+        while remaining_quota > 0:
+            gen = gen_stack[-1]
+            try:
+                if self.__exc_info is not None:
+                    exc_info, self.__exc_info = self.__exc_info, None
+                    yielded = gen.throw(*exc_info)
+                else:
+                    yielded = gen.send(self.__send_value)
+            except StopIteration as exc:
+                gen_stack.pop()
+                result = exc.args[0] if exc.args else None
+                if not gen_stack:
+                    self.__finish(result)
+                    return
+                self.__send_value = result
+                continue
+            except Exception:
+                gen_stack.pop()
+                if not gen_stack:
+                    self.__finish(None, sys.exc_info())
+                    return
+                self.__exc_info = sys.exc_info()
+                continue
+            self.__send_value = None
+            if isinstance(yielded, types.GeneratorType):
+                gen_stack.append(yielded)
+            elif isinstance(yielded, Event):
+                if yielded.is_set:
+                    self.__send_value = yielded.value
+                else:
+                    self.state = self.WAITING
+                    yielded.add_waiting_task(self)
+                    return
+            else:
+                self.__send_value = yielded
+                self.steps += 1
+                remaining_quota -= 1
+
+
+class Scheduler(object):
+    """
+    Runs tasks round robin. Every task is run until it passed *quota*
+    preemption points (loop iterations/calls of extern functions) or it waits
+    for an Event.
+    """
+
+    def __init__(self, quota=100):
+        self.quota = quota
+        self.tasks = []
+        self.__ready_tasks = collections.deque()
+
+    def spawn(self, coroutine, quota=None):
+        """
+        :param coroutine: a generator, i.e. the result of calling a function
+            of a cooperative CModule
+        :param int quota: if not None, overrides the quota of the scheduler
+            for this task
+        :rtype: Task
+        """
+        task = Task(self, coroutine, self.quota if quota is None else quota)
+        self.tasks.append(task)
+        self.__ready_tasks.append(task)
+        return task
+
+    def make_ready(self, task):
+        self.__ready_tasks.append(task)
+
+    def run_once(self):
+        """
+        Runs every ready task for one time slice.
+
+        :return: True if there are still ready tasks
+        """
+        for _ in range(len(self.__ready_tasks)):
+            task = self.__ready_tasks.popleft()
+            task.run_slice()
+            if task.state == Task.READY:
+                self.__ready_tasks.append(task)
+        return bool(self.__ready_tasks)
+
+    def run(self):
+        """
+        Runs until all tasks are finished or waiting for events.
+        """
+        while self.run_once():
+            pass
+
+    def run_until_complete(self, task):
+        """
+        Runs until *task* is finished and returns its result.
+        """
+        while not task.done:
+            if not self.run_once() and not task.done:
+                raise DeadlockError('{!r} is waiting for an event that '
+                                    'cannot be set anymore'.format(task))
+        return task.result()
+
+
+def run(coroutine):
+    """
+    Runs a single coroutine to its end and returns its result
+    """
+    scheduler = Scheduler()
+    return scheduler.run_until_complete(scheduler.spawn(coroutine))
@@ -0,0 +1,170 @@
+"""
+Recording of the execution of compiled C code (writes to global variables
+and struct fields and entering/leaving of C functions).
+
+Like for coverage, the compiler registers one site per instrumented
+statement when compiling with tracing enabled. At runtime only the index of
+the site and the written value is stored per event. The events are stored
+in a preallocated ring buffer (two arrays), so only the last *capacity*
+events are kept. The generated code stores the events directly into the
+arrays (see cymu.compiler.trace_probe()) instead of calling record().
+
+Overhead: on a loop, that does nothing but writes to globals and struct
+fields (2000 iterations of "g += i; st.a = g;"), tracing increases the
+runtime by about 25% (calling record() per event cost about 45%). Code that
+computes more between the traced writes has proportionally less overhead,
+but the "few percent" are only reached if traced writes are rare.
+
+The recorded writes can be applied to another program object via replay().
+"""
+import array
+import collections
+
+
+# a statement that writes to a global variable or struct field.
+# path is the tuple of attribute names of the written object relative to the
+# program object (i.e. ('glob_struct', 'field')) or None if the written
+# object cannot be reached statically (i.e. when writing via pointers)
+WriteSite = collections.namedtuple('WriteSite', 'filename line path is_ptr')
+
+FuncSite = collections.namedtuple('FuncSite', 'filename line name exit')
+
+TraceEvent = collections.namedtuple('TraceEvent', 'site value')
+
+
+class Trace(object):
+    """
+    Site definitions and the ring buffer of recorded events of a single
+    CModule.
+    """
+
+    DEFAULT_CAPACITY = 0x10000
+
+    def __init__(self, capacity=DEFAULT_CAPACITY):
+        """
+        :param int capacity: maximum number of events, that are kept
+        """
+        self.sites = []
+        self.capacity = capacity
+        self.site_ndxs = array.array('l', [-1]) * capacity
+        self.values = array.array('d', [0.0]) * capacity
+        # the number of recorded events (in a list, so that the generated
+        # code can update it in place)
+        self.counter = [0]
+        self.record = self.__create_recorder()
+
+    def __create_recorder(self):
+        # the recorder is a closure (instead of a method), as accessing
+        # closure variables is faster than accessing attributes
+        site_ndxs = self.site_ndxs
+        values = self.values
+        counter = self.counter
+        capacity = self.capacity
+        def record(site_ndx, value):
+            """
+            Stores an event (like the instrumented code does).
+
+            :param value: the written CObj (or a python int)
+            """
+            cnt = counter[0]
+            ndx = cnt % capacity
+            site_ndxs[ndx] = site_ndx
+            values[ndx] = int(value)
+            counter[0] = cnt + 1
+        return record
+
+    @property
+    def count(self):
+        """
+        number of events recorded since creation/last reset()
+        """
+        return self.counter[0]
+
+    def __add_site(self, site):
+        self.sites.append(site)
+        return len(self.sites) - 1
+
+    def add_write_site(self, filename, line, path=None, is_ptr=False):
+        """
+        :param tuple[str] path: see WriteSite
+        :rtype: int
+        :return: index of site
+        """
+        return self.__add_site(
+            WriteSite(filename, line, None if path is None else tuple(path),
+                      is_ptr))
+
+    def add_func_sites(self, filename, line, end_line, name):
+        """
+        :rtype: (int, int)
+        :return: index of site for entering and for leaving the function
+        """
+        return (self.__add_site(FuncSite(filename, line, name, False)),
+                self.__add_site(FuncSite(filename, end_line, name, True)))
+
+    def reset(self):
+        """
+        drops all recorded events
+        """
+        self.counter[0] = 0
+
+    def events(self):
+        """
+        Iterates over the events in the buffer (oldest first)
+
+        :rtype: collections.Iterable[TraceEvent]
+        """
+        for cnt in xrange(self.dropped_count, self.count):
+            ndx = cnt % self.capacity
+            yield TraceEvent(self.sites[self.site_ndxs[ndx]],
+                             int(self.values[ndx]))
+
+    @property
+    def dropped_count(self):
+        """
+        number of events, that were overwritten in the ring buffer
+        """
+        return max(self.count - self.capacity, 0)
+
+    def write_log(self, fileobj):
+        """
+        writes the events in the buffer as human readable text
+        """
+        for site, value in self.events():
+            if isinstance(site, FuncSite):
+                action = ('leave ' if site.exit else 'enter ') + site.name
+            elif site.path is None:
+                action = '<indirect> = {}'.format(value)
+            else:
+                action = '{} = {}'.format('.'.join(site.path), value)
+            fileobj.write('{}:{}: {}\n'.format(site.filename, site.line,
+                                               action))
+
+
+def replay(trace, prog, until=None):
+    """
+    Applies the recorded writes to *prog* (usually a new instance of the
+    CModule, that recorded the trace). Writes to objects that cannot be
+    reached statically and writes of pointers (as the addresses of the
+    objects are different in prog) are skipped.
+
+    :type trace: Trace
+    :type prog: datamodel.CProgram
+    :param int until: if not None, only the first *until* events of the
+        buffer are replayed
+    :rtype: int
+    :return: the number of applied writes
+    """
+    applied_cnt = 0
+    for event_ndx, (site, value) in enumerate(trace.events()):
+        if until is not None and event_ndx >= until:
+            break
+        if not isinstance(site, WriteSite) or site.path is None or \
+                site.is_ptr:
+            continue
+        cobj = prog
+        for attrname in site.path:
+            cobj = getattr(cobj, attrname)
+        cobj.val = value
+        applied_cnt += 1
+    return applied_cnt
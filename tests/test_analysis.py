@@ -0,0 +1,70 @@
+from cymu import compiler
+from cymu.analysis import analyze_funcs, classify_purity, reachable_decls, \
+    PURE, READS_GLOBALS, WRITES_GLOBALS
+
+
+def purity_of(c_src):
+    return classify_purity(analyze_funcs(compiler.parse_str(c_src, 'test.c')))
+
+
+def test_analyzeFuncs_collectsCalleesAndGlobalRefs():
+    func_infos = analyze_funcs(compiler.parse_str(
+        'int a, b;\n'
+        'int g(int x);\n'
+        'int h(void) { return 1; }\n'
+        'int f(int b) { return a + b + h() + g(1); }\n'))
+    assert list(func_infos) == ['h', 'f']
+    assert func_infos['f'].callees == {'h'}
+    assert func_infos['f'].global_refs == {'a'}
+    assert func_infos['f'].calls_unknown
+
+def test_classifyPurity_onLocalsAndParamsOnly_returnsPure():
+    assert purity_of('int f(int a) { int l = a; l += 1; return l; }') \
+           == {'f': PURE}
+
+def test_classifyPurity_onReadOfGlobal_returnsReadsGlobals():
+    assert purity_of('int g; int f(int a) { return a + g; }') \
+           == {'f': READS_GLOBALS}
+
+def test_classifyPurity_onDerefOfPtr_returnsReadsGlobals():
+    assert purity_of('int f(int * p) { return *p; }') == {'f': READS_GLOBALS}
+
+def test_classifyPurity_onWriteToGlobalField_returnsWritesGlobals():
+    assert purity_of('struct s { int x; } g;\n'
+                     'void f(int a) { g.x = a; }') == {'f': WRITES_GLOBALS}
+
+def test_classifyPurity_onWriteViaPtr_returnsWritesGlobals():
+    assert purity_of('struct s { int x; };\n'
+                     'void f(struct s * p) { p->x = 1; }') \
+           == {'f': WRITES_GLOBALS}
+
+def test_classifyPurity_onLocalShadowingGlobal_returnsPure():
+    assert purity_of('int g; int f(int g) { g = 3; return g; }') \
+           == {'f': PURE}
+
+def test_classifyPurity_onCallOfUndefinedFunc_returnsWritesGlobals():
+    assert purity_of('int ext(int a);\n'
+                     'int f(int a) { return ext(a); }') \
+           == {'f': WRITES_GLOBALS}
+
+def test_classifyPurity_onCallees_propagatesEffectsTransitively():
+    assert purity_of('int g;\n'
+                     'int rd(void) { return g; }\n'
+                     'int mid(int a) { return rd() + a; }\n'
+                     'int top(int a) { return mid(a); }\n'
+                     'int rec(int a) { if (a) return rec(a - 1); return 0; }') \
+           == {'rd': READS_GLOBALS, 'mid': READS_GLOBALS,
+               'top': READS_GLOBALS, 'rec': PURE}
+
+def test_reachableDecls_returnsCalledFuncsAndReferredVars():
+    transunit_ir = compiler.parse_str(
+        'int a, b = 2, c, d;\n'
+        'int *pb = &b;\n'
+        'int leaf(void) { return *pb; }\n'
+        'int (*fptr)(void) = leaf;\n'
+        'int mid(void) { return a + fptr(); }\n'
+        'int dead(void) { return c + mid(); }\n'
+        'int main(void) { return mid(); }\n')
+    assert reachable_decls(transunit_ir, analyze_funcs(transunit_ir),
+                           ['main']) == ({'main', 'mid', 'leaf'},
+                                         {'a', 'fptr', 'pb', 'b'})
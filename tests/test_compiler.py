@@ -1,7 +1,11 @@
+import StringIO
+
 import pytest
 
 from cymu import compiler
-from cymu.datamodel import CProgram, StructCType, IntCObj
+from cymu.datamodel import CProgram, StructCType, IntCObj, VarAccessError, \
+    add_hook, ReadOnlyError
+from cymu.coverage import LineProbe, BranchProbe, FuncProbe
 
 
 def compile_ccode(c_src, ignore_warnings=False):
@@ -82,6 +86,99 @@ def test_assignmentSubOp_ok():
     prog = run_ccode('inoutp -= 3;', inoutp=7)
     assert prog.inoutp == 4
 
+@pytest.mark.parametrize(('op', 'operand', 'result'), [
+    ('+=', '3', 10), ('-=', '3', 4), ('*=', '3', 21), ('/=', '2', 3),
+    ('%=', '4', 3), ('&=', '5', 5), ('|=', '8', 15), ('^=', '5', 2),
+    ('<<=', '2', 28), ('>>=', '1', 3), ('-=', 'inp', 5)])
+def test_compoundAssignmentOp_ok(op, operand, result):
+    prog = run_ccode('inoutp {} {};'.format(op, operand), inoutp=7, inp=2)
+    assert prog.inoutp == result
+
+@pytest.mark.parametrize(('op', 'result'), [
+    ('+', 9), ('-', 5), ('*', 14), ('/', 3), ('%', 1), ('&', 2), ('|', 7),
+    ('^', 5), ('<<', 28), ('>>', 1), ('<', 0), ('<=', 0), ('>', 1),
+    ('>=', 1), ('==', 0), ('!=', 1), ('&&', 1), ('||', 1)])
+def test_binaryOp_ok(op, result):
+    prog = run_ccode('outp = inp1 {} inp2;'.format(op), inp1=7, inp2=2, outp=0)
+    assert prog.outp == result
+
+@pytest.mark.parametrize(('inp1', 'inp2', 'op', 'result'), [
+    (-7, 2, '/', -3), (-7, 2, '%', -1), (7, -2, '/', -3), (7, -2, '%', 1)])
+def test_binaryOp_onNegativeDivision_truncatesTowardsZero(inp1, inp2, op,
+                                                          result):
+    prog = compile_ccode('int f(int a, int b) { return a %s b; }' % op)
+    assert prog.f(inp1, inp2) == result
+
+def test_binaryOp_onSignedOverflow_wrapsResult():
+    prog = run_ccode('outp = inp * inp + inp;', inp=0x10000, outp=0)
+    assert prog.outp == 0x10000
+
+def test_binaryOp_onUnsignedOperands_wrapsResult():
+    prog = compile_ccode('unsigned int u = 1; unsigned int r;\n'
+                         'void f(void) { r = u - 2; }')
+    prog.f()
+    assert prog.r == 0xFFFFFFFF
+
+def test_binaryOp_onMixedSignedness_comparesAsUnsigned():
+    prog = compile_ccode('unsigned int u = 1; int i = 0; int r;\n'
+                         'void f(void) { i -= 1; r = i < u; }')
+    prog.f()
+    assert prog.r == 0
+
+def test_binaryOp_onAssignmentToChar_wrapsToChar():
+    prog = compile_ccode('char c; int i = 200;\n'
+                         'void f(void) { c = i + 100; }')
+    prog.f()
+    assert prog.c == 44
+
+@pytest.mark.parametrize(('op', 'inp', 'calls'), [
+    ('&&', 0, 0), ('&&', 1, 1), ('||', 0, 1), ('||', 1, 0)])
+def test_logicalOp_skipsRightOperandIfResultIsKnown(op, inp, calls):
+    prog = compile_ccode('int calls;\n'
+                         'int g(void) { calls += 1; return 1; }\n'
+                         'int f(int x) { return x %s g(); }' % op)
+    prog.calls.val = 0
+    prog.f(inp)
+    assert prog.calls == calls
+
+def test_logicalOp_inCondition_skipsRightOperandIfResultIsKnown():
+    prog = compile_ccode('int calls;\n'
+                         'int g(void) { calls += 1; return 1; }\n'
+                         'int f(int x) { if (x || g()) return 1; return 0; }')
+    prog.calls.val = 0
+    assert prog.f(1) == 1
+    assert prog.calls == 0
+
+def test_logicalOp_onRightOperandWithPrefixStmt_raisesCompileError():
+    with pytest.raises(compiler.CompileError):
+        run_ccode('if (inp && (inp -= 1)) inp = 0;', inp=0)
+
+def test_binaryOp_onIntOperands_generatesPythonIntArithmetic():
+    output = StringIO.StringIO()
+    compiler.export_pysource(
+        compiler.parse_str('int f(int x) { return x * 3 + 1 < 10; }'), output)
+    assert 'int(x) * 3' in output.getvalue()
+    assert '__globals__.int(3)' not in output.getvalue()
+
+@pytest.mark.parametrize(('decls', 'c_src', 'result'), [
+    ('int r = 0-8; unsigned int s = 1;', 'r >>= s;', -4),
+    ('unsigned char r = 200;', 'r /= 0-2;', 156),
+    ('short r = 30000; unsigned int s = 7;', 'r /= s;', 4285),
+    ('char r = 0-100; unsigned int s = 7;', 'r %= s;', 2),
+    ('int r = 0-10; unsigned int s = 3, t = 0;', 'r /= s + t;', 1431655762),
+    ('int r = 0-10;', 'r %= 7u;', 1)])
+def test_compoundAssignmentOp_onMixedTypes_usesPromotedCommonType(decls, c_src,
+                                                                 result):
+    prog = compile_ccode(decls + '\nvoid f(void) { ' + c_src + ' }')
+    prog.f()
+    assert prog.r == result
+
+def test_compoundAssignmentOp_keepsCObj():
+    prog = compile_ccode('int a = 1; void func() { a += 1; }')
+    a_cobj = prog.a
+    prog.func()
+    assert prog.a is a_cobj
+
 def test_assignment_inExpr_ok():
     prog = run_ccode('outp2 = outp1 = inoutp0 -= 1;',
                      inoutp0=3, outp1=None, outp2=None)
@@ -161,6 +258,194 @@ def test_doWhileStmt_onNeverNonZeroCondition_doEnterLoopBlockOnce(loopcnt):
 def test_doWhileStmt_withPrefixStmt_executesPrefixStmtBeforeEveryLoop():
     prog = run_ccode('do ; while (inp -= 1);', inp=3)
 
+FOR_SRC = ('int last_i;\n'
+           'int sum(int start, int stop) {\n'
+           '    int i;\n'
+           '    int s = 0;\n'
+           '    for (i = start; i < stop; i++)\n'
+           '        s += i;\n'
+           '    last_i = i;\n'
+           '    return s;\n'
+           '}\n')
+
+@pytest.mark.parametrize(('start', 'stop', 'result', 'last_i'), [
+    (0, 5, 10, 5), (3, 4, 3, 4), (2, 2, 0, 2), (5, -3, 0, 5)])
+def test_forStmt_onCountedLoop_runsLoopAndSetsFinalLoopVar(start, stop,
+                                                           result, last_i):
+    prog = compile_ccode(FOR_SRC)
+    assert prog.sum(start, stop) == result
+    assert prog.last_i == last_i
+
+def test_forStmt_onCountedLoop_iteratesOverPythonRange():
+    output = StringIO.StringIO()
+    compiler.export_pysource(compiler.parse_str(FOR_SRC), output)
+    assert '__xrange__(' in output.getvalue()
+    assert 'while True' not in output.getvalue()
+
+def test_forStmt_onCountedLoopWithCNamesOfBuiltins_ok():
+    prog = compile_ccode('int max(int a, int b) { return b; }\n'
+                         'int f(int n) {\n'
+                         '    int xrange;\n'
+                         '    int s = 0;\n'
+                         '    for (xrange = 0; xrange < n; xrange++)\n'
+                         '        s = max(xrange, s + xrange);\n'
+                         '    return s + xrange;\n'
+                         '}\n')
+    assert prog.f(4) == 10
+
+def test_forStmt_onCountedLoopWithInclusiveStopAndDecl_ok():
+    prog = compile_ccode('int f(int n) {\n'
+                         '    int s = 0;\n'
+                         '    for (int j = 1; j <= n; ++j) s += j;\n'
+                         '    return s;\n'
+                         '}\n')
+    assert prog.f(4) == 10
+
+def test_forStmt_onCountedLoopWithBreak_keepsLoopVarOfBreak():
+    prog = run_ccode('int i;\n'
+                     'for (i = 0; i < 10; i += 1)\n'
+                     '    if (inoutp -= 1) ; else break;\n'
+                     'outp = i;', inoutp=3, outp=0)
+    assert prog.outp == 2
+
+@pytest.mark.parametrize('c_src', [
+    'for (i = 0; i < inp; i++) outp += i;',
+    'for (i = 0; i < inp; i++) { outp += i; inp -= 0; }',
+    'for (i = 0; i < inp; i++) { outp += i; i += 0; }'])
+def test_forStmt_onNonCountedLoop_runsAsGeneralLoop(c_src):
+    prog = run_ccode(c_src, i=None, inp=4, outp=0)
+    assert prog.outp == 6 and prog.i == 4
+
+def test_forStmt_onGeneralLoop_runsIncrementAfterBody():
+    prog = run_ccode('for (inoutp = 3; inoutp; inoutp -= 1) outp += inoutp;',
+                     inoutp=0, outp=0)
+    assert prog.outp == 6 and prog.inoutp == 0
+
+def test_forStmt_withoutParts_loopsUntilBreak():
+    prog = run_ccode('for (;;) { outp += 1; if (inoutp -= 1) ; else break; }',
+                     inoutp=3, outp=0)
+    assert prog.outp == 3
+
+def test_continueStmt_inForStmt_runsIncrement():
+    prog = run_ccode('for (inoutp = 4; inoutp; inoutp -= 1) {\n'
+                     '    if (inp -= 1) continue;\n'
+                     '    outp += 1;\n'
+                     '}', inoutp=0, inp=3, outp=0)
+    assert prog.outp == 1 and prog.inoutp == 0
+
+def test_continueStmt_inDoWhileStmt_evaluatesCondition():
+    prog = run_ccode('do {\n'
+                     '    outp += 1;\n'
+                     '    continue;\n'
+                     '} while (inoutp -= 1);', inoutp=3, outp=0)
+    assert prog.outp == 3
+
+def test_continueStmt_inSwitchStmt_continuesEnclosingLoop():
+    prog = run_ccode('while (inoutp) {\n'
+                     '    inoutp -= 1;\n'
+                     '    switch (inoutp) {\n'
+                     '    case 1: continue;\n'
+                     '    default: outp += 10;\n'
+                     '    }\n'
+                     '    outp += 1;\n'
+                     '}', inoutp=3, outp=0)
+    assert prog.outp == 22
+
+def test_incDecOp_asStmt_modifiesVar():
+    prog = run_ccode('inoutp1++; ++inoutp1; inoutp2--; --inoutp2;',
+                     inoutp1=0, inoutp2=0)
+    assert prog.inoutp1 == 2 and prog.inoutp2 == -2
+
+def test_preIncOp_inExpr_returnsNewValue():
+    prog = run_ccode('outp = ++inoutp;', inoutp=1, outp=0)
+    assert prog.outp == 2 and prog.inoutp == 2
+
+def test_postIncOp_inExpr_raisesCompileError():
+    with pytest.raises(compiler.CompileError):
+        run_ccode('outp = inoutp++;', inoutp=1, outp=0)
+
+SWITCH_SRC = ('int f(int x) {\n'
+              '    int r = 0;\n'
+              '    switch (x) {\n'
+              '    case 1: r = 10;\n'
+              '    case 2: case 3: r += 1; break;\n'
+              '    case -5: r = 5; break;\n'
+              '    case 1000: r = 7; break;\n'
+              '    default: r = 99;\n'
+              '    }\n'
+              '    return r;\n'
+              '}\n')
+
+@pytest.mark.parametrize(('x', 'result'), [(1, 11), (2, 1), (3, 1), (-5, 5),
+                                           (1000, 7), (4, 99), (-1, 99)])
+def test_switchStmt_runsMatchingCaseAndFallsThroughToBreak(x, result):
+    prog = compile_ccode(SWITCH_SRC)
+    assert prog.f(x) == result
+
+def test_switchStmt_withoutDefault_onNoMatch_runsNoCase():
+    prog = run_ccode('switch (inp) { case 1: outp = 1; case 2: outp = 2; }',
+                     inp=3, outp=0)
+    assert prog.outp == 0
+
+def test_switchStmt_onDefaultInMiddle_fallsThroughToNextCase():
+    prog = run_ccode('switch (inp) {\n'
+                     'case 1: outp += 1;\n'
+                     'default: outp += 10;\n'
+                     'case 2: outp += 100;\n'
+                     '}', inp=5, outp=0)
+    assert prog.outp == 110
+
+@pytest.mark.parametrize('x', range(10))
+def test_switchStmt_onDenseCases_runsMatchingCase(x):
+    prog = compile_ccode(
+        'int f(int x) {\n'
+        '    switch (x) {\n' +
+        ''.join('    case {0}: return {0} + {0};\n'.format(i)
+                for i in range(10)) +
+        '    }\n'
+        '    return 100;\n'
+        '}\n')
+    assert prog.f(x) == x * 2
+
+def test_switchStmt_onUnsignedCond_wrapsNegativeCaseLabel():
+    prog = compile_ccode('int f(unsigned x) {\n'
+                         '    switch (x) { case -1: return 1; }\n'
+                         '    return 0;\n'
+                         '}\n')
+    assert prog.f(0xFFFFFFFF) == 1
+
+def test_switchStmt_withoutLabels_evaluatesCondOnly():
+    prog = run_ccode('switch (inoutp -= 1) { outp = 1; }', inoutp=3, outp=0)
+    assert prog.inoutp == 2 and prog.outp == 0
+
+def test_switchStmt_nested_breaksInnerSwitchOnly():
+    prog = run_ccode('switch (inp1) {\n'
+                     'case 1:\n'
+                     '    switch (inp2) { case 2: outp += 1; break; }\n'
+                     '    outp += 10;\n'
+                     '    break;\n'
+                     'default: outp = 100;\n'
+                     '}', inp1=1, inp2=2, outp=0)
+    assert prog.outp == 11
+
+def test_switchStmt_withBreakInLoop_leavesSwitchOnly():
+    prog = run_ccode('while (inoutp) {\n'
+                     '    inoutp -= 1;\n'
+                     '    switch (inoutp) { case 1: break; default: ; }\n'
+                     '    outp += 1;\n'
+                     '}', inoutp=3, outp=0)
+    assert prog.outp == 3
+
+def test_breakStmt_inWhileStmt_leavesLoop():
+    prog = run_ccode('while (1) { outp += 1; if (inoutp -= 1) ; else break; }',
+                     inoutp=3, outp=0)
+    assert prog.outp == 3
+
+def test_switchStmt_onNonConstantCaseLabel_raisesCompileError():
+    with pytest.raises(compiler.CompileError):
+        compile_ccode('enum { A = 1 };\n'
+                      'void f(int x) { switch (x) { case A: ; } }')
+
 def get_linenos(func):
     assert func.__func__.__code__.co_filename == 'test.c'
     linenos = [func.__func__.__code__.co_firstlineno]
@@ -322,6 +607,64 @@ def test_callFunc_onValueReturned_processesValue():
     prog.func()
     assert prog.outp == 111
 
+def test_callFunc_onFuncDefinedInModule_passesParams():
+    prog = compile_ccode(
+        'int outp1, outp2;\n'
+        'void sub_func(int p1, int p2) { outp1 = p1; outp2 = p2; }\n'
+        'void func() { sub_func(12, 34); }\n')
+    prog.func()
+    assert prog.outp1 == 12
+    assert prog.outp2 == 34
+
+def test_callFunc_onFuncDefinedInModule_castsParams():
+    prog = compile_ccode(
+        'int inp = 0x1FF, outp;\n'
+        'void sub_func(unsigned char p) { outp = p; }\n'
+        'void func() { sub_func(inp); }\n')
+    prog.func()
+    assert prog.outp == 0xFF
+
+def test_callFunc_onFuncDefinedInModule_doesNotChangeCallersValue():
+    prog = compile_ccode(
+        'int inp = 1;\n'
+        'void sub_func(int p) { p = 2; }\n'
+        'void func() { sub_func(inp); }\n')
+    prog.func()
+    assert prog.inp == 1
+
+def test_callFunc_onNestedCallsOfFuncDefinedInModule_returnsResult():
+    prog = compile_ccode(
+        'int outp;\n'
+        'int sub_func(int p) { p -= 1; return p; }\n'
+        'void func() { outp = sub_func(sub_func(3)); }\n')
+    prog.func()
+    assert prog.outp == 1
+
+def test_callFunc_onFuncDefinedInModule_callsDirectlyWithoutInstanceLookup():
+    prog = compile_ccode(
+        'int outp;\n'
+        'void sub_func(int p) { outp = p; }\n'
+        'void func() { sub_func(1); }\n')
+    prog.sub_func = lambda p: None
+    prog.func()
+    assert prog.outp == 1
+
+@pytest.mark.parametrize('func_name', ['datamodel', 'CModule'])
+def test_callFunc_onFuncNameOfGeneratedCode_doesNotShadowIt(func_name):
+    prog = compile_ccode('int {0}(int a) {{ return a / 2; }}\n'
+                         'int f(int a) {{ return {0}(a) / 2; }}'
+                         .format(func_name))
+    assert prog.f(12) == 3
+
+def test_callFunc_onFuncDefinedLaterInModule_ok():
+    prog = compile_ccode(
+        'int outp;\n'
+        'void sub_func(int p);\n'
+        'void func() { sub_func(1); }\n'
+        'void sub_func(int p) { outp = p; }\n')
+    prog.func()
+    assert prog.outp == 1
+
 def test_structDef_returnCStructObj():
     prog = compile_ccode('struct s { };')
     struct_s = prog.struct_s
@@ -419,6 +762,358 @@ def test_structInitialization_onNestedStructs():
     assert prog.s.nested.a == 1
     assert prog.s.b == 2
 
+def test_addrOfOp_onGlobalVar_returnsPtrToVar():
+    prog = compile_ccode("""
+        int a = 3;
+        int *p = &a;
+    """)
+    assert prog.p.ref is prog.a
+
+def test_derefOp_inAssignmentDest_changesReferredVar():
+    prog = compile_ccode("""
+        int a, *p = &a;
+        void func() {
+            *p = 4;
+        }
+    """)
+    prog.func()
+    assert prog.a == 4
+
+def test_derefOp_onPtrToLocalVar_readsLocalVar():
+    prog = run_ccode('int a = 5; int *p = &a; outp = *p;', outp=None)
+    assert prog.outp == 5
+
+def test_arrowOp_accessesFieldOfReferredStruct():
+    prog = compile_ccode("""
+        struct s {
+            int a;
+            int b;
+        } s = { 1, 2 };
+        struct s *p = &s;
+        int outp;
+        void func() {
+            p->b = 3;
+            outp = p->a;
+        }
+    """)
+    prog.func()
+    assert prog.s.b == 3
+    assert prog.outp == 1
+
+def test_addrOfOp_onStructField_returnsPtrIntoStruct():
+    prog = compile_ccode("""
+        struct s {
+            int a;
+            int b;
+        } s = { 1, 2 };
+        int *p = &s.b;
+    """)
+    assert prog.p.ref is prog.s.b
+    assert prog.p.val == prog.s.adr + 4
+
+def test_ptrAddOp_onPtrIntoStruct_advancesToNextField():
+    prog = compile_ccode("""
+        struct s {
+            int a;
+            int b;
+        } s = { 1, 2 };
+        int *p = &s.a;
+        int outp;
+        void func() {
+            outp = *(p + 1);
+            p = p + 1;
+        }
+    """)
+    prog.func()
+    assert prog.outp == 2
+    assert prog.p.ref is prog.s.b
+
+def test_ptrSubOp_onTwoPtrs_returnsNumberOfElements():
+    prog = compile_ccode("""
+        struct s {
+            int a;
+            int b;
+        } s;
+        int *p1 = &s.a, *p2 = &s.b;
+        int outp;
+        void func() {
+            outp = p2 - p1;
+        }
+    """)
+    prog.func()
+    assert prog.outp == 1
+
+def test_structParam_isPassedByValue():
+    prog = compile_ccode("""
+        struct s { int a; int b; } g = { 1, 2 }, outp;
+        struct s modify(struct s v) {
+            v.a = 3;
+            return v;
+        }
+        void func() {
+            outp = modify(g);
+        }
+    """)
+    prog.func()
+    assert prog.outp.val == dict(a=3, b=2)
+    assert prog.g.val == dict(a=1, b=2)
+
+def test_structReturn_onGlobalStruct_returnsCopy():
+    prog = compile_ccode("""
+        struct s { int a; } g = { 1 };
+        struct s get(void) { return g; }
+    """)
+    result = prog.get()
+    assert result.val == dict(a=1)
+    assert result is not prog.g
+
+def test_castOp_onPtrToInt_returnsAddress():
+    prog = compile_ccode("""
+        int a, outp;
+        void func() {
+            outp = (int) &a;
+        }
+    """, ignore_warnings=True)
+    prog.func()
+    assert prog.outp == prog.a.adr
+
+def test_ptrVarDecl_withZeroInitialization_createsNullPtr():
+    prog = compile_ccode('int *p = 0;')
+    assert prog.p.val == 0
+    assert not prog.p
+
+def test_funcDecl_withPtrParam_canModifyReferredVar():
+    prog = compile_ccode(
+        'int a;\n'
+        'void f(int *p) { *p = 7; }\n'
+        'void func() { f(&a); }\n')
+    prog.f(prog.a.ptr)
+    assert prog.a == 7
+
+def test_compile_withCoverage_countsLineExecutions():
+    prog_cls = compiler.compile_str(
+        'int a = 3;\n'
+        'void func() {\n'
+        '    while (a)\n'
+        '        a -= 1;\n'
+        '}\n',
+        'test.c', coverage=True)
+    prog_cls().func()
+    assert prog_cls.__coverage__.line_counts('test.c') == {3: 1, 4: 3}
+
+def test_compile_withCoverage_countsBranchesAndFuncCalls():
+    prog_cls = compiler.compile_str(
+        'int a = 1;\n'
+        'void func() {\n'
+        '    if (a)\n'
+        '        a = 0;\n'
+        '}\n',
+        'test.c', coverage=True)
+    prog = prog_cls()
+    prog.func()
+    prog.func()
+    cov = prog_cls.__coverage__
+    assert {(probe, cnt) for probe, cnt in zip(cov.probes, cov.counters)
+            if not isinstance(probe, LineProbe)} == {
+        (BranchProbe('test.c', 3, 0, 0), 1),
+        (BranchProbe('test.c', 3, 0, 1), 1),
+        (FuncProbe('test.c', 2, 'func'), 2)}
+
+def test_compile_withoutCoverage_hasNoCoverageObj():
+    prog = compile_ccode('void func() { }')
+    assert prog.__coverage__ is None
+
+def test_exportPysource_writesCompilableSourceWithLineMap():
+    fileobj = StringIO.StringIO()
+    line_map = compiler.export_pysource(
+        compiler.parse_str('int a;\n'
+                           'void func() {\n'
+                           '    a = 3;\n'
+                           '}\n'),
+        fileobj)
+    pysrc_lines = fileobj.getvalue().splitlines()
+    assert len(pysrc_lines) == len(line_map)
+    assert [pysrc_line.split('#')[0].strip()
+            for pysrc_line, c_line in zip(pysrc_lines, line_map)
+            if c_line == 3] == ['__globals__.a.val = __globals__.int(3)']
+    compile(fileobj.getvalue(), 'test.py', 'exec')
+
+def test_compile_withUnchecked_readsUninitializedVarsAsZero():
+    prog = compiler.compile_str('int a;\n'
+                                'int func() { int b; return a + b; }',
+                                checked=False)()
+    assert prog.func() == 0
+
+def test_compile_withChecked_raisesOnUninitializedVars():
+    prog = compile_ccode('int func() { int b; return b; }')
+    with pytest.raises(VarAccessError):
+        prog.func()
+
+def test_compile_onHookedStructField_callsHooksFromCCode():
+    prog = compile_ccode('struct regs { int status; int data; };\n'
+                         'struct regs uart;\n'
+                         'int func(int v) {\n'
+                         '    uart.data = v;\n'
+                         '    return uart.status;\n'
+                         '}')
+    writes = []
+    add_hook(prog.uart.status, on_read=lambda cobj, val: 7)
+    add_hook(prog.uart.data, on_write=lambda cobj, val: writes.append(val))
+    assert prog.func(3) == 7
+    assert writes == [3]
+    assert prog.uart.data == 3
+
+def test_compile_setsCompileStats():
+    cmodule = compiler.compile_str('int a;\n'
+                                   'void f(void) { a = 1; }', 'test.c')
+    stats = cmodule.__compile_stats__
+    assert list(stats.durations) == [
+        'parse', 'diagnostics', 'cursor_walk', 'purity', 'ast_build',
+        'optimize', 'fix_locations', 'bytecode_compile', 'class_creation']
+    assert all(duration >= 0 for duration in stats.durations.values())
+    assert stats.total_duration == sum(stats.durations.values())
+    assert stats.cursor_count > 3
+    assert stats.ast_node_count > 10
+    assert stats.bytecode_size > 0
+
+def test_compileIr_onStoredIr_countsIrNodesAsCursors():
+    transunit_ir = compiler.parse_str('int a;')
+    stats = compiler.compile_ir(transunit_ir).__compile_stats__
+    assert 'parse' not in stats.durations
+    assert stats.cursor_count == 2
+
+def test_compileStats_writeReport_writesPhasesAndSizes():
+    stats = compiler.CompileStats()
+    with stats.phase('parse'):
+        pass
+    stats.cursor_count = 3
+    fileobj = StringIO.StringIO()
+    stats.write_report(fileobj)
+    report_lines = fileobj.getvalue().splitlines()
+    assert [line.split()[0] for line in report_lines] == [
+        'parse', 'total', 'cursor_count', 'ast_node_count', 'bytecode_size']
+    assert report_lines[2].split() == ['cursor_count', '3']
+
+def test_compile_onConstGlobalInitializers_createsGlobalTable():
+    cmodule = compiler.compile_str('struct s { int a; char b; };\n'
+                                   'struct s g = { 1, (300) };\n'
+                                   'int a = 3;\n'
+                                   'int b;\n',
+                                   ignore_warnings=True)
+    assert cmodule.__global_table__ == (
+        ('g', cmodule.struct_s, (1, 300)),
+        ('a', CProgram.int, (3,)),
+        ('b', CProgram.int, ()))
+    prog = cmodule()
+    assert prog.g.val == dict(a=1, b=44)
+    assert prog.a == 3
+    assert not prog.b.initialized
+
+def test_compile_onMixedGlobalInitializers_keepsInitOrder():
+    prog = compile_ccode('int a = 1;\n'
+                         'int *p = &a;\n'
+                         'int b = 2;\n'
+                         'int *q = &b;\n')
+    assert [name for name, ctype, args in prog.__global_table__] \
+           == ['a', 'b']
+    assert prog.p.ref is prog.a
+    assert prog.q.ref is prog.b
+
+def test_compile_onManyGlobals_splitsGlobalVarsIntoChunks(monkeypatch):
+    monkeypatch.setattr(compiler, 'GLOBAL_VARS_CHUNK_SIZE', 2)
+    prog = compile_ccode('int a, b;\n'
+                         'int *p1 = &a, *p2 = &b, *p3 = &a;\n')
+    assert hasattr(prog, '_global_vars_1')
+    assert not hasattr(prog, '_global_vars_2')
+    assert prog.p3.ref is prog.a
+
+def test_compile_setsGlobalNames():
+    cmodule = compiler.compile_str('int b = 1; const int a = 2; int f();')
+    assert cmodule.__global_names__ == ('a', 'b')
+
+def test_compile_withLazyGlobals_createsGlobalsOnFirstAccess():
+    cmodule = compiler.compile_str('int a = 3;\n'
+                                   'int b;\n'
+                                   'int f(void) { return a; }',
+                                   lazy_globals=True)
+    assert cmodule.__lazy_globals__
+    prog = cmodule()
+    assert 'a' not in vars(prog) and 'b' not in vars(prog)
+    assert prog.f() == 3
+    assert 'a' in vars(prog) and 'b' not in vars(prog)
+    assert prog.a is prog.a
+
+def test_compile_withLazyGlobals_evaluatesNonConstInitializersOnAccess():
+    prog = compiler.compile_str('struct s { int x; int y; };\n'
+                                'struct s g = { 1, 2 };\n'
+                                'int *p = &g.y;\n',
+                                lazy_globals=True)()
+    assert prog.p.ref is prog.g.y
+    assert prog.p.ref == 2
+
+def test_compile_onConstGlobals_sharesThemBetweenPrograms():
+    cmodule = compiler.compile_str('struct s { int a; int b; };\n'
+                                   'const struct s tbl = { 1, 2 };\n'
+                                   'const int k = 5;\n'
+                                   'const int *pk = &k;\n'
+                                   'int f(void) { return tbl.b + *pk; }')
+    assert [name for name, ctype, args in cmodule.__const_table__] \
+           == ['tbl', 'k']
+    prog1, prog2 = cmodule(), cmodule()
+    assert prog1.tbl is prog2.tbl and prog1.k is prog2.k
+    assert 'k' not in vars(prog1)
+    assert prog1.pk.ref is prog1.k
+    assert prog1.f() == 7
+
+def test_compile_onConstGlobal_raisesReadOnlyErrorOnWrite():
+    prog = compile_ccode('const int k = 5;\n'
+                         'void f(void) { *(int *)&k = 3; }')
+    with pytest.raises(ReadOnlyError):
+        prog.f()
+    assert prog.k == 5
+
+def test_compile_onConstGlobalWithNonConstInitializer_createsReadonlyVar():
+    prog = compile_ccode('int a;\n'
+                         'int * const p = &a;\n')
+    assert 'p' in vars(prog)
+    with pytest.raises(ReadOnlyError):
+        prog.p.val = 0
+    prog.p.ref.val = 3
+    assert prog.a == 3
+
+PRUNE_SRC = ('int a, b = 2, c;\n'
+             'int *pb = &b;\n'
+             'int unused(void);\n'
+             'int ext(void);\n'
+             'int helper(void) { return *pb + a; }\n'
+             'int dead(void) { c = 1; return unused(); }\n'
+             'int unused(void) { return c; }\n'
+             'int main(void) { return helper(); }\n')
+
+def test_compile_withEntryPoints_dropsUnreachableFuncsAndGlobals():
+    cmodule = compiler.compile_str(PRUNE_SRC, entry_points=['main'])
+    assert hasattr(cmodule, 'main') and hasattr(cmodule, 'helper')
+    assert not hasattr(cmodule, 'dead') and not hasattr(cmodule, 'unused')
+    assert cmodule.__extern_protos__ == {'ext': (CProgram.int, [], False)}
+    assert sorted(cmodule.__purity__) == ['helper', 'main']
+    prog = cmodule()
+    assert sorted(name for name in vars(prog) if name != '__adr_space__') \
+           == ['a', 'b', 'pb']
+    prog.a.val = 1
+    assert prog.main() == 3
+    assert 'prune' in cmodule.__compile_stats__.durations
+
+def test_compile_withUnknownEntryPoint_raisesCompileError():
+    with pytest.raises(compiler.CompileError):
+        compiler.compile_str(PRUNE_SRC, entry_points=['ext'])
+
+def test_exportPysource_withEntryPoints_exportsOnlyReachableFuncs():
+    output = StringIO.StringIO()
+    compiler.export_pysource(compiler.parse_str(PRUNE_SRC), output,
+                             entry_points=['dead'])
+    assert 'def __c_unused__(' in output.getvalue()
+    assert 'def __c_main__(' not in output.getvalue()
+
 ### implement support for unnamed structs
 
 ### test source line map of struct definition (var defs in different lines!!!)
@@ -0,0 +1,97 @@
+import StringIO
+
+import pytest
+
+from cymu.coverage import Coverage, LineProbe, BranchProbe, FuncProbe
+
+
+@pytest.fixture
+def cov():
+    cov = Coverage()
+    cov.add_func_probe('test.c', 1, 'func')
+    cov.add_line_probe('test.c', 2)
+    cov.add_line_probe('test.c', 3)
+    cov.add_branch_probes('test.c', 2, 2)
+    cov.alloc_counters()
+    return cov
+
+
+def test_addProbe_returnsIndexOfCounter():
+    cov = Coverage()
+    assert cov.add_line_probe('test.c', 10) == 0
+    assert cov.add_func_probe('test.c', 11, 'f') == 1
+    assert cov.add_branch_probes('test.c', 12, 2) == [2, 3]
+
+def test_addProbe_storesProbeDefinition():
+    cov = Coverage()
+    cov.add_line_probe('test.c', 10)
+    cov.add_branch_probes('test.c', 11, 1)
+    cov.add_func_probe('test.c', 12, 'f')
+    assert cov.probes == [LineProbe('test.c', 10),
+                          BranchProbe('test.c', 11, 0, 0),
+                          FuncProbe('test.c', 12, 'f')]
+
+def test_addBranchProbes_onMultipleCalls_usesDifferentBlocks():
+    cov = Coverage()
+    cov.add_branch_probes('test.c', 10, 1)
+    cov.add_branch_probes('test.c', 10, 1)
+    assert cov.probes[0].block != cov.probes[1].block
+
+def test_addProbe_afterAllocCounters_raisesValueError(cov):
+    with pytest.raises(ValueError):
+        cov.add_line_probe('test.c', 10)
+
+def test_allocCounters_returnsZeroedCounterPerProbe(cov):
+    assert list(cov.counters) == [0] * 5
+
+def test_reset_zeroesCounters(cov):
+    cov.counters[1] = 3
+    cov.reset()
+    assert list(cov.counters) == [0] * 5
+
+def test_lineCounts_onMultipleProbesPerLine_returnsMax():
+    cov = Coverage()
+    cov.add_line_probe('test.c', 10)
+    cov.add_line_probe('test.c', 10)
+    cov.add_line_probe('other.c', 10)
+    cov.alloc_counters()
+    cov.counters[:] = cov.counters.__class__('L', [2, 3, 4])
+    assert cov.line_counts('test.c') == {10: 3}
+
+def test_writeLcov(cov):
+    cov.counters[:] = cov.counters.__class__('L', [1, 1, 0, 1, 0])
+    lcov_file = StringIO.StringIO()
+    cov.write_lcov(lcov_file)
+    assert lcov_file.getvalue() == (
+        'TN:\n'
+        'SF:test.c\n'
+        'FN:1,func\n'
+        'FNDA:1,func\n'
+        'FNF:1\n'
+        'FNH:1\n'
+        'BRDA:2,0,0,1\n'
+        'BRDA:2,0,1,0\n'
+        'BRF:2\n'
+        'BRH:1\n'
+        'DA:2,1\n'
+        'DA:3,0\n'
+        'LF:2\n'
+        'LH:1\n'
+        'end_of_record\n')
+
+def test_writeLcov_onNotExecutedBlock_writesDashAsTakenCount(cov):
+    lcov_file = StringIO.StringIO()
+    cov.write_lcov(lcov_file)
+    assert 'BRDA:2,0,0,-\nBRDA:2,0,1,-\nBRF:2\nBRH:0\n' \
+           in lcov_file.getvalue()
+
+def test_writeGcov(cov):
+    cov.counters[1] = 4
+    gcov_file = StringIO.StringIO()
+    cov.write_gcov(gcov_file, 'test.c', ['void func() {', '  a;', '  b;', '}'])
+    assert gcov_file.getvalue() == (
+        '        -:    0:Source:test.c\n'
+        '        -:    1:void func() {\n'
+        '        4:    2:  a;\n'
+        '    #####:    3:  b;\n'
+        '        -:    4:}\n')
@@ -1,7 +1,8 @@
 import pytest
 
 from cymu.datamodel import CProgram, BoundCType, AddressSpace, VarAccessError, \
-    CType, IntCObj, IntCType, StructCType, PtrCType, CObj, PtrCObj
+    CType, IntCObj, IntCType, StructCType, PtrCType, CObj, PtrCObj, c_div, \
+    c_mod, add_hook, remove_hook, LazyGlobal, make_readonly, ReadOnlyError
 
 
 class MyCType(CType):
@@ -121,6 +122,17 @@ class TestCType(object):
         assert my_ctype != OtherCType()
         assert not my_ctype == OtherCType()
 
+    def test_create_onSameParams_returnsSameInstance(self):
+        assert MyCType() is my_ctype
+
+    def test_bind_onSameAdrSpace_returnsSameBoundCType(self, adr_space):
+        assert my_ctype.bind(adr_space) is my_ctype.bind(adr_space)
+        assert my_ctype.bind(adr_space) is not my_ctype.bind(AddressSpace())
+
+    def test_hash_onBoundCType_equalsHashOfCType(self, adr_space):
+        assert hash(my_ctype.bind(adr_space)) == hash(my_ctype)
+        assert {my_ctype: 1}[my_ctype.bind(adr_space)] == 1
+
     def test_cast_onPyObj_createdCObjWithPyTypeCastedToInt(self, adr_space):
         casted_cobj = my_ctype.cast("123", adr_space)
         assert isinstance(casted_cobj, MyCType.COBJ_TYPE)
@@ -361,6 +373,61 @@ class TestIntCObj(object):
         cobj -= (max + 1) * 4
         assert int(cobj) == 0
 
+    @pytest.mark.parametrize(('ctype', 'init_val', 'op', 'operand', 'result'), [
+        (CProgram.int, 5, '+=', 3, 8),
+        (CProgram.unsigned_char, 250, '+=', 10, 4),
+        (CProgram.int, 5, '*=', -3, -15),
+        (CProgram.short, 0x4000, '*=', 2, -0x8000),
+        (CProgram.int, -7, '/=', 2, -3),
+        (CProgram.int, -7, '%=', 2, -1),
+        (CProgram.int, 0x0F, '&=', 0x3C, 0x0C),
+        (CProgram.int, 0x0F, '|=', 0x30, 0x3F),
+        (CProgram.int, 0x0F, '^=', 0x3C, 0x33),
+        (CProgram.unsigned_char, 0x81, '<<=', 1, 0x02),
+        (CProgram.int, -8, '>>=', 1, -4),
+        (CProgram.unsigned_int, 0xFFFFFFF8, '>>=', 1, 0x7FFFFFFC)])
+    def test_inplaceOp_withPyObj_modifiesCObjWithWrapAround(self, adr_space, ctype, init_val, op, operand, result):
+        cobj = ctype(adr_space, init_val)
+        cobj_id = id(cobj)
+        exec 'cobj {} operand'.format(op)
+        assert cobj.val == result
+        assert id(cobj) == cobj_id
+
+    def test_inplaceOp_onSignedAndUnsignedCObj_doesUnsignedDivision(self, adr_space):
+        cobj = CProgram.int(adr_space, -2)
+        cobj /= CProgram.unsigned_int(adr_space, 2)
+        assert cobj.val == 0x7FFFFFFF
+
+    @pytest.mark.parametrize(('ctype', 'init_val', 'op', 'operand_ctype',
+                              'operand', 'result'), [
+        (CProgram.int, -8, '>>=', CProgram.unsigned_int, 1, -4),
+        (CProgram.unsigned_char, 200, '/=', CProgram.int, -2, 156),
+        (CProgram.unsigned_short, 100, '/=', CProgram.char, -2, 65486),
+        (CProgram.unsigned_short, 100, '%=', CProgram.char, -3, 1),
+        (CProgram.char, -100, '%=', CProgram.unsigned_int, 7, 2)])
+    def test_inplaceOp_onMixedTypes_convertsToPromotedCommonType(self, adr_space, ctype, init_val, op, operand_ctype, operand, result):
+        cobj = ctype(adr_space, init_val)
+        operand = operand_ctype(adr_space, operand)
+        exec 'cobj {} operand'.format(op)
+        assert cobj.val == result
+
+    def test_inplaceOp_onUninitializedCObj_raisesVarAccessError(self, bound_int):
+        cobj = bound_int()
+        with pytest.raises(VarAccessError):
+            cobj += 1
+
+    def test_inplaceOp_withUninitializedCObj_raisesVarAccessError(self, bound_int):
+        cobj = bound_int(1)
+        with pytest.raises(VarAccessError):
+            cobj += bound_int()
+
+
+@pytest.mark.parametrize(('dividend', 'divisor', 'quotient', 'remainder'), [
+    (7, 2, 3, 1), (-7, 2, -3, -1), (7, -2, -3, 1), (-7, -2, 3, -1)])
+def test_cDivCMod_roundTowardsZero(dividend, divisor, quotient, remainder):
+    assert c_div(dividend, divisor) == quotient
+    assert c_mod(dividend, divisor) == remainder
+
 
 class TestIntCType(object):
 
@@ -390,6 +457,17 @@ class TestIntCType(object):
     def test_str_returnsCName(self):
         assert str(CProgram.unsigned_int) == 'unsigned int'
 
+    @pytest.mark.parametrize(('ctype', 'value', 'result'), [
+        (CProgram.char, 0x7F, 0x7F),
+        (CProgram.char, 0x80, -0x80),
+        (CProgram.char, -0x81, 0x7F),
+        (CProgram.unsigned_char, -1, 0xFF),
+        (CProgram.unsigned_int, 1 << 40, 0)])
+    def test_wrap_convertsToValueRange(self, ctype, value, result):
+        wrapped = ctype.wrap(value)
+        assert wrapped == result
+        assert type(wrapped) is int
+
     def test_eqNe_onSameCObjTypeAndDifferentName_isFalse(self, adr_space):
         assert CProgram.int != CProgram.char
         assert not CProgram.int == CProgram.char
@@ -446,6 +524,17 @@ class TestCStruct(object):
         cobj = struct_simple(adr_space, 1)
         assert cobj.b == 0
 
+    def test_create_withStructOfSameType_copiesStruct(self, adr_space, struct_simple, simple_cobj):
+        cobj = struct_simple(adr_space, simple_cobj)
+        assert cobj.val == dict(a=1, b=2)
+        assert cobj.a is not simple_cobj.a
+
+    def test_create_withStructForFirstField_initializesFirstField(self, adr_space, struct_simple, simple_cobj):
+        struct_outer = StructCType('struct_outer', [('inner', struct_simple),
+                                                    ('c', CProgram.int)])
+        cobj = struct_outer(adr_space, simple_cobj)
+        assert cobj.val == dict(inner=dict(a=1, b=2), c=0)
+
     def test_initialized_onPartiallyInitializedMembers_returnsFalse(self, struct_simple):
         cobj = struct_simple(adr_space)
         cobj.a.val = 1
@@ -457,6 +546,25 @@ class TestCStruct(object):
         cobj.b.val = 1
         assert cobj.initialized
 
+    def test_initialized_onNestedStruct_checksOnlyFieldsOfSubstruct(self, adr_space, struct_nested):
+        cobj = struct_nested(adr_space)
+        cobj.inner_struct.a.val = 1
+        cobj.inner_struct.b.val = 2
+        assert cobj.inner_struct.initialized
+        assert not cobj.initialized
+        cobj.field.val = 3
+        assert cobj.initialized
+
+    def test_initialized_onPtrField_isSetBySetRef(self, adr_space, bound_int):
+        cobj = StructCType('s', [('p', CProgram.int.ptr)])(adr_space)
+        cobj.p.ref = bound_int()
+        assert cobj.initialized
+
+    def test_create_onUncheckedAdrSpace_isInitializedWith0(self, struct_nested):
+        cobj = struct_nested(AddressSpace(checked=False))
+        assert cobj.initialized
+        assert cobj.val == dict(field=0, inner_struct=dict(a=0, b=0))
+
     def test_getVal_onInitializedCObj_returnsDict(self, simple_cobj):
         assert simple_cobj.val == dict(a=1, b=2)
 
@@ -465,6 +573,24 @@ class TestCStruct(object):
         with pytest.raises(VarAccessError):
             _ = cobj.val
 
+    def test_getVal_onNestedStruct_returnsNestedDicts(self, adr_space, struct_nested):
+        cobj = struct_nested(adr_space, 1, (2, 3))
+        assert cobj.val == dict(field=1, inner_struct=dict(a=2, b=3))
+
+    def test_getVal_onUninitializedInnerStruct_raisesVarAccessError(self, adr_space, struct_nested):
+        cobj = struct_nested(adr_space)
+        cobj.field.val = 1
+        cobj.inner_struct.a.val = 2
+        with pytest.raises(VarAccessError):
+            _ = cobj.val
+
+    def test_getVal_onHookedField_returnsResultOfHook(self, adr_space, struct_nested):
+        cobj = struct_nested(adr_space, 1, (2, 3))
+        add_hook(cobj.inner_struct.b, on_read=lambda cobj, val: val + 1)
+        assert cobj.val['inner_struct']['b'] == 4
+        assert repr(cobj) == \
+               'struct_nested(field=1, inner_struct=struct_simple(a=2, b=4))'
+
     def test_setVal_onTuple_setsFields(self, simple_cobj):
         simple_cobj.val = [3, 4]
         assert simple_cobj.a == 3
@@ -512,6 +638,33 @@ class TestCStruct(object):
         with pytest.raises(VarAccessError):
             simple_cobj.val = struct_simple(adr_space)
 
+    def test_setVal_onNestedStructCObj_copiesAllScalarsAndInitState(self, adr_space, struct_nested):
+        src_cobj = struct_nested(adr_space, 1, (2, 3))
+        dest_cobj = struct_nested(adr_space)
+        dest_cobj.val = src_cobj
+        assert dest_cobj.val == dict(field=1, inner_struct=dict(a=2, b=3))
+        assert dest_cobj.initialized and dest_cobj.inner_struct.initialized
+        dest_cobj.inner_struct.a.val = 4
+        assert src_cobj.inner_struct.a == 2
+
+    def test_setVal_onSubstructCObj_copiesOnlySubstruct(self, adr_space, struct_simple, struct_nested):
+        cobj = struct_nested(adr_space)
+        cobj.inner_struct.val = struct_simple(adr_space, 5, 6)
+        assert cobj.inner_struct.initialized
+        assert not cobj.field.initialized and not cobj.initialized
+
+    def test_setVal_onStructCObjWithHookedField_callsHooks(self, adr_space, struct_simple):
+        writes = []
+        cobj = struct_simple(adr_space)
+        add_hook(cobj.b, on_write=lambda cobj, val: writes.append(val))
+        cobj.val = struct_simple(adr_space, 3, 4)
+        assert writes == [4]
+
+    def test_create_withStructCObj_createsCopy(self, adr_space, simple_cobj, struct_simple):
+        copied_cobj = struct_simple(adr_space, simple_cobj)
+        assert copied_cobj.val == dict(a=1, b=2)
+        assert copied_cobj.a is not simple_cobj.a
+
     def test_len_returnsNumberOfFields(self, simple_cobj):
         assert len(simple_cobj) == 2
 
@@ -572,9 +725,21 @@ class TestStructCType(object):
         assert struct_simple != \
                StructCType(struct_simple.struct_name, [('a', CProgram.int)])
 
+    def test_create_onSameNameAndFields_returnsSameInstance(self, struct_simple):
+        assert StructCType('struct_simple', [('a', CProgram.int),
+                                             ('b', CProgram.short)]) \
+               is struct_simple
+
     def test_str_returnsCName(self, struct_simple):
         assert str(struct_simple) == 'struct struct_simple'
 
+    def test_offsets_alignsFieldsNaturally(self):
+        struct_ctype = StructCType('s', [('a', CProgram.char),
+                                         ('b', CProgram.int),
+                                         ('c', CProgram.short)])
+        assert struct_ctype.offsets == [0, 4, 8]
+        assert struct_ctype.sizeof == 12
+
 
 class TestPtrCType(object):
 
@@ -603,12 +768,69 @@ class TestPtrCType(object):
     def test_ptr_onCType_returnsPtrCType(self):
         assert CProgram.int.ptr == PtrCType(CProgram.int)
 
+    def test_ptr_onMultipleCalls_returnsSameInstance(self):
+        assert CProgram.int.ptr is CProgram.int.ptr is PtrCType(CProgram.int)
+
     def test_ptr_onBoundCType_returnsBoundPtrCType(self, bound_int, adr_space):
         assert isinstance(bound_int.ptr, BoundCType)
         assert bound_int.ptr.ref == bound_int
         assert bound_int.ptr.adr_space == adr_space
 
 
+class TestAddressSpace(object):
+
+    def test_adr_onDifferentCObjs_returnsDifferentAdrs(self, bound_int):
+        assert bound_int().adr != bound_int().adr
+
+    def test_adr_onMultipleCalls_returnsSameAdr(self, bound_int):
+        cobj = bound_int()
+        assert cobj.adr == cobj.adr
+
+    def test_adr_returnsNonNullAdr(self, bound_int):
+        assert bound_int().adr != AddressSpace.NULL
+
+    def test_deref_returnsCObjAtAdr(self, adr_space, bound_int):
+        cobj = bound_int()
+        assert adr_space.deref(cobj.adr, CProgram.int) is cobj
+
+    def test_deref_onUnknownAdr_raisesVarAccessError(self, adr_space):
+        with pytest.raises(VarAccessError):
+            adr_space.deref(0x1234, CProgram.int)
+
+    def test_deref_onWrongCType_raisesVarAccessError(self, adr_space, bound_int):
+        cobj = bound_int()
+        with pytest.raises(VarAccessError):
+            adr_space.deref(cobj.adr, CProgram.short)
+
+    def test_deref_onReleasedCObj_raisesVarAccessError(self, adr_space, bound_int):
+        adr = bound_int().adr
+        with pytest.raises(VarAccessError):
+            adr_space.deref(adr, CProgram.int)
+
+    def test_deref_onStructAdr_returnsStruct(self, adr_space, struct_simple):
+        cobj = struct_simple(adr_space)
+        assert adr_space.deref(cobj.adr, struct_simple) is cobj
+
+    def test_deref_onStructAdrAndTypeOfFirstField_returnsFirstField(self, adr_space, struct_simple):
+        cobj = struct_simple(adr_space)
+        assert adr_space.deref(cobj.adr, CProgram.int) is cobj.a
+
+    def test_adr_onStructField_returnsStructAdrPlusOffset(self, adr_space, struct_simple):
+        cobj = struct_simple(adr_space)
+        assert cobj.b.adr == cobj.adr + 4
+        assert adr_space.deref(cobj.b.adr, CProgram.short) is cobj.b
+
+    def test_deref_onAdrOfSharedAdrSpace_returnsCObjOfSharedAdrSpace(self):
+        shared = AddressSpace(start_adr=AddressSpace.CONST_START_ADR)
+        adr_space = AddressSpace(shared=shared)
+        cobj = CProgram.int(shared, 3)
+        assert cobj.adr >= AddressSpace.CONST_START_ADR
+        assert adr_space.deref(cobj.adr, CProgram.int) is cobj
+        ptr = CProgram.int.ptr(adr_space)
+        ptr.ref = cobj
+        assert ptr.ref is cobj
+
+
 class TestPtrCObj(object):
 
     def test_initialized_onNoInitParam_returnsFalse(self, adr_space):
@@ -656,12 +878,219 @@ class TestPtrCObj(object):
         with pytest.raises(ValueError):
             cobj.ref = CProgram.char(AddressSpace(), 1)
 
+    def test_getVal_returnsAdrOfRef(self, adr_space, bound_int):
+        refCObj = bound_int(1)
+        cobj = PtrCType(CProgram.int)(adr_space, refCObj)
+        assert cobj.val == refCObj.adr
+
+    def test_setVal_withInt_setsAdr(self, adr_space, bound_int):
+        refCObj = bound_int(1)
+        cobj = PtrCType(CProgram.int)(adr_space)
+        cobj.val = refCObj.adr
+        assert cobj.ref is refCObj
+
+    def test_setVal_withPtrCObjOfDifferentType_raisesTypeError(self, adr_space):
+        cobj = PtrCType(CProgram.int)(adr_space)
+        with pytest.raises(TypeError):
+            cobj.val = PtrCType(CProgram.char)(adr_space, 0x1000)
+
+    def test_getRef_onNullPtr_raisesVarAccessError(self, adr_space):
+        cobj = PtrCType(CProgram.int)(adr_space, 0)
+        with pytest.raises(VarAccessError):
+            _ = cobj.ref
+
+    def test_add_withInt_advancesBySizeOfRef(self, adr_space):
+        cobj = PtrCType(CProgram.int)(adr_space, 0x1000)
+        assert (cobj + 2).val == 0x1008
+        assert (2 + cobj).val == 0x1008
+        assert (cobj + CProgram.int(adr_space, 2)).val == 0x1008
+
+    def test_sub_withInt_decrementsBySizeOfRef(self, adr_space):
+        cobj = PtrCType(CProgram.short)(adr_space, 0x1000)
+        assert (cobj - 2).val == 0x0FFC
+
+    def test_sub_withPtrCObj_returnsDifferenceInElements(self, adr_space):
+        cobj1 = PtrCType(CProgram.int)(adr_space, 0x1010)
+        cobj2 = PtrCType(CProgram.int)(adr_space, 0x1000)
+        diff = cobj1 - cobj2
+        assert diff.ctype == CProgram.int
+        assert diff == 4
+
+    def test_iadd_keepsCObj(self, adr_space):
+        cobj = PtrCType(CProgram.int)(adr_space, 0x1000)
+        cobj_id = id(cobj)
+        cobj += 1
+        assert cobj.val == 0x1004
+        assert id(cobj) == cobj_id
+
+    def test_cmp_comparesAdrs(self, adr_space):
+        ptr_ctype = PtrCType(CProgram.int)
+        assert ptr_ctype(adr_space, 0x1000) < ptr_ctype(adr_space, 0x1004)
+        assert ptr_ctype(adr_space, 0x1000) == ptr_ctype(adr_space, 0x1000)
+
+    def test_nonZero_onNullPtr_returnsFalse(self, adr_space):
+        assert not PtrCType(CProgram.int)(adr_space, 0)
+
+    def test_cast_fromIntCObj_interpretsIntAsAdr(self, adr_space):
+        cobj = PtrCType(CProgram.int).cast(CProgram.int(adr_space, 0x1000))
+        assert cobj.val == 0x1000
+
     def test_ptr_onCObj_returnsPtrCObj(self, adr_space, bound_int):
         assert isinstance(bound_int().ptr, PtrCObj)
         assert bound_int().ptr.ctype == PtrCType(CProgram.int)
         assert bound_int().ptr.adr_space is adr_space
 
 
+class TestUncheckedAddressSpace(object):
+
+    @pytest.fixture
+    def unchecked_int(self):
+        return BoundCType(CProgram.int, AddressSpace(checked=False))
+
+    def test_create_onNoInitVal_returnsZero(self, unchecked_int):
+        cobj = unchecked_int()
+        assert cobj.initialized
+        assert cobj.val == 0
+        assert int(cobj) == 0
+
+    def test_create_returnsIntCObj(self, unchecked_int):
+        cobj = unchecked_int(3)
+        assert isinstance(cobj, IntCObj)
+        assert cobj.val == 3
+
+    def test_setVal_wrapsValue(self, unchecked_int):
+        cobj = unchecked_int()
+        cobj.val = unchecked_int(0x1FFFFFFFF)
+        assert cobj.val == -1
+        cobj.val = CProgram.char(None, 3)
+        assert cobj.val == 3
+
+    def test_inplaceOp_onDefaultValue_works(self, unchecked_int):
+        cobj = unchecked_int()
+        cobj += 3
+        assert cobj.val == 3
+
+    @pytest.mark.parametrize(('op', 'operand', 'result'), [
+        ('+=', 3, 10), ('-=', 3, 4), ('*=', 3, 21), ('/=', -2, -3),
+        ('%=', -2, 1), ('&=', 5, 5), ('|=', 8, 15), ('^=', 5, 2),
+        ('<<=', 31, -0x80000000), ('>>=', 1, 3)])
+    def test_inplaceOp_doesNotCheckInitialization(self, unchecked_int, monkeypatch, op, operand, result):
+        monkeypatch.delattr(IntCObj, '_IntCObj__raw_val')
+        cobj = unchecked_int(7)
+        exec 'cobj {} operand'.format(op)
+        assert cobj.val == result
+
+    def test_inplaceOp_onUnsignedOperand_doesUnsignedDivision(self, unchecked_int):
+        cobj = unchecked_int(-2)
+        cobj /= CProgram.unsigned_int(AddressSpace(checked=False), 2)
+        assert cobj.val == 0x7FFFFFFF
+
+    def test_createPtr_onNoInitVal_returnsNullPtr(self):
+        adr_space = AddressSpace(checked=False)
+        cobj = CProgram.int.ptr(adr_space)
+        assert cobj.initialized
+        assert cobj.val == AddressSpace.NULL
+        cobj.val = 0x1000
+        assert cobj.val == 0x1000
+
+
+class TestHooks(object):
+
+    def test_addHook_onRead_returnsResultOfHook(self, bound_int):
+        cobj = bound_int(3)
+        add_hook(cobj, on_read=lambda cobj, val: val + 0x7FFFFFFF)
+        assert cobj.val == -0x7FFFFFFE
+        assert int(cobj) == -0x7FFFFFFE
+
+    def test_addHook_onReadReturningNone_returnsStoredValue(self, bound_int):
+        cobj = bound_int(3)
+        add_hook(cobj, on_read=lambda cobj, val: None)
+        assert cobj.val == 3
+
+    def test_addHook_onReadHook_isInitialized(self, bound_int):
+        cobj = bound_int()
+        add_hook(cobj, on_read=lambda cobj, val: 4)
+        assert cobj.initialized
+        assert cobj.val == 4
+
+    def test_addHook_onReadHook_callsHookOncePerRead(self, bound_int):
+        reads = []
+        cobj = bound_int(3)
+        add_hook(cobj, on_read=lambda cobj, val: reads.append(val))
+        _ = cobj.val
+        _ = int(cobj)
+        assert reads == [3, 3]
+
+    def test_addHook_onWrite_callsHookAndStoresResult(self, bound_int):
+        writes = []
+        def on_write(cobj, val):
+            writes.append(val)
+            return val & 0xF0
+        cobj = bound_int(0)
+        add_hook(cobj, on_write=on_write)
+        cobj.val = 0x123
+        cobj += 1
+        assert writes == [0x123, 0x21]
+        assert cobj.val == 0x20
+
+    def test_addHook_onPtr_hooksAddress(self, adr_space):
+        cobj = CProgram.int.ptr(adr_space, 0x1000)
+        add_hook(cobj, on_read=lambda cobj, val: val + 4)
+        assert cobj.val == 0x1004
+        assert isinstance(cobj, PtrCObj)
+
+    def test_addHook_onStruct_raisesTypeError(self, adr_space, struct_simple):
+        with pytest.raises(TypeError):
+            add_hook(struct_simple(adr_space), on_read=lambda cobj, val: 0)
+
+    def test_addHook_doesNotChangeClassOfOtherObjs(self, bound_int):
+        cobj = bound_int(3)
+        add_hook(cobj, on_read=lambda cobj, val: 0)
+        assert type(bound_int(3)) is IntCObj
+
+    def test_removeHook_restoresOriginalClass(self, bound_int):
+        cobj = bound_int(3)
+        add_hook(cobj, on_read=lambda cobj, val: 0)
+        remove_hook(cobj)
+        assert type(cobj) is IntCObj
+        assert cobj.val == 3
+
+
+class TestReadOnly(object):
+
+    def test_makeReadonly_onInt_raisesReadOnlyErrorOnWrite(self, bound_int):
+        cobj = make_readonly(bound_int(3))
+        with pytest.raises(ReadOnlyError):
+            cobj.val = 4
+        with pytest.raises(ReadOnlyError):
+            cobj += 1
+        assert cobj.val == 3 and int(cobj) == 3
+        assert isinstance(cobj, IntCObj)
+
+    def test_makeReadonly_onPtr_raisesReadOnlyErrorOnWrite(self, adr_space):
+        target = CProgram.int(adr_space, 1)
+        cobj = make_readonly(CProgram.int.ptr(adr_space, target))
+        with pytest.raises(ReadOnlyError):
+            cobj.ref = CProgram.int(adr_space, 2)
+        with pytest.raises(ReadOnlyError):
+            cobj -= 1
+        assert cobj.ref is target
+
+    def test_makeReadonly_onStruct_makesFieldsReadonly(self, adr_space, struct_simple):
+        cobj = make_readonly(struct_simple(adr_space, 1, 2))
+        with pytest.raises(ReadOnlyError):
+            cobj.val = (3, 4)
+        with pytest.raises(ReadOnlyError):
+            cobj.b.val = 3
+        assert cobj.val == dict(a=1, b=2)
+
+    def test_makeReadonly_onUncheckedInt_raisesReadOnlyErrorOnWrite(self):
+        cobj = make_readonly(CProgram.int(AddressSpace(checked=False), 5))
+        with pytest.raises(ReadOnlyError):
+            cobj.val = 4
+        assert cobj.val == 5
+
+
 class TestCProgram(object):
 
     def test_create_onTypedefMemeber_createsBoundCTypes(self):
@@ -671,6 +1100,48 @@ class TestCProgram(object):
         assert isinstance(prog.typedef, BoundCType)
         assert prog.typedef.base_ctype is CProgram.int
 
+    def test_getCType_onMultipleAccesses_returnsSameBoundCType(self):
+        prog = CProgram()
+        assert prog.int is prog.int
+        assert prog.int.ptr is prog.int.ptr
+
+    def test_initGlobalTable_createsVarsOfTableRange(self):
+        class ProgramWithTable(CProgram):
+            __global_table__ = (('a', CProgram.int, (3,)),
+                                ('b', CProgram.short, ()),
+                                ('c', CProgram.int, ()))
+            def global_vars(self):
+                self.init_global_table(0, 2)
+        prog = ProgramWithTable()
+        assert prog.a == 3 and prog.a.adr_space is prog.__adr_space__
+        assert prog.b.ctype is CProgram.short
+        assert not hasattr(prog, 'c')
+
+    def test_create_onConstTable_createsSharedReadonlyVarsOnce(self):
+        class ProgramWithConsts(CProgram):
+            __const_table__ = (('a', CProgram.int, (3,)),)
+        prog1, prog2 = ProgramWithConsts(), ProgramWithConsts()
+        assert prog1.a is prog2.a
+        assert 'a' not in vars(prog1)
+        assert prog1.__adr_space__.shared is ProgramWithConsts.__const_segment__
+        with pytest.raises(ReadOnlyError):
+            prog1.a.val = 4
+
+    def test_lazyGlobal_onFirstAccess_createsVarOnce(self):
+        init_calls = []
+        def init_b(prog):
+            init_calls.append(prog)
+            return prog.int(4)
+        class ProgramWithLazyVars(CProgram):
+            a = LazyGlobal('a', CProgram.short, (3,))
+            b = LazyGlobal('b', init_func=init_b)
+        prog = ProgramWithLazyVars()
+        assert prog.a == 3 and prog.a.ctype is CProgram.short
+        assert prog.a.adr_space is prog.__adr_space__
+        assert prog.b is prog.b
+        assert init_calls == [prog]
+        assert isinstance(ProgramWithLazyVars.a, LazyGlobal)
+
     def test_create_onVarMember_createsInstanceVars(self):
         class ProgramWithVar(CProgram):
             def global_vars(self):
@@ -679,6 +1150,12 @@ class TestCProgram(object):
         prog = ProgramWithVar()
         assert isinstance(prog.var, IntCObj)
 
+    def test_create_onUncheckedProgram_usesUncheckedAdrSpace(self):
+        class UncheckedProgram(CProgram):
+            __checked__ = False
+        assert not UncheckedProgram().__adr_space__.checked
+        assert CProgram().__adr_space__.checked
+
     def test_create_onVarMemberOfCustomTypeDef_createsInstanceVars(self):
         class ProgramWithVar(CProgram):
             typedef = CProgram.int
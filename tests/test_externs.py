@@ -0,0 +1,149 @@
+from cymu import compiler
+from cymu.datamodel import CProgram, IntCObj, PtrCObj
+from cymu.externs import ExternRegistry, bind_externs, make_thunk
+from cymu.scheduler import Event, Scheduler, Return
+
+
+def compile_ccode(c_src, **options):
+    return compiler.compile_str(c_src, 'test.c', **options)
+
+
+def test_register_addsFunc():
+    registry = ExternRegistry()
+    func = lambda: 0
+    assert registry.register('f', func) is func
+    assert 'f' in registry and registry['f'] is func
+    assert registry.names() == ['f']
+
+def test_register_withoutFunc_returnsDecorator():
+    registry = ExternRegistry()
+    @registry.register('g')
+    def func():
+        pass
+    assert registry['g'] is func
+
+
+def test_compile_onExternDecl_storesPrototype():
+    cmodule = compile_ccode('struct s { int a; };\n'
+                            'short f(int a, struct s * b);\n'
+                            'void g(void);\n'
+                            'int h(int a, ...);\n')
+    assert cmodule.__extern_protos__ == {
+        'f': (CProgram.short, [CProgram.int, cmodule.struct_s.ptr], False),
+        'g': (None, [], False),
+        'h': (CProgram.int, [CProgram.int], True)}
+
+def test_compile_onDefinedFunc_storesNoPrototype():
+    cmodule = compile_ccode('int f(int a);\n'
+                            'int f(int a) { return a; }\n')
+    assert cmodule.__extern_protos__ == {}
+
+def test_compile_onUnsupportedTypes_storesNone():
+    cmodule = compile_ccode('double f(void * p, double d);')
+    assert cmodule.__extern_protos__ == {'f': (None, [None, None], False)}
+
+def test_compile_withExterns_bindsMarshallingThunks():
+    calls = []
+    def add(a, b):
+        calls.append((a, b))
+        return a + b
+    cmodule = compile_ccode('short add(int a, short b);\n'
+                            'int f(void) { return add(0x10001, 2); }',
+                            externs=ExternRegistry({'add': add}))
+    prog = cmodule()
+    result = prog.f()
+    assert calls == [(0x10001, 2)]
+    assert type(calls[0][0]) is int
+    assert result == 3
+
+def test_thunk_onPythonCall_convertsResultToResultType():
+    cmodule = compile_ccode('short add(int a, short b);',
+                            externs=ExternRegistry({'add': lambda a, b: a+b}))
+    result = cmodule().add(0x7FFF, 1)
+    assert isinstance(result, IntCObj)
+    assert result.ctype == CProgram.short
+    assert result == -0x8000
+
+def test_thunk_onNarrowingIntParam_convertsToParamType():
+    args = []
+    cmodule = compile_ccode('void hw(unsigned char v, short s);\n'
+                            'int x = 300, y = 0x18000;\n'
+                            'void f(void) { hw(x, y); }',
+                            externs=ExternRegistry(
+                                {'hw': lambda v, s: args.extend([v, s])}))
+    cmodule().f()
+    assert args == [44, -0x8000]
+
+def test_thunk_onSignedArgForUnsignedParam_passesUnsignedValue():
+    args = []
+    cmodule = compile_ccode('void hw(unsigned int v);\n'
+                            'int x = 0;\n'
+                            'void f(void) { x -= 1; hw(x); }',
+                            externs=ExternRegistry(
+                                {'hw': lambda v: args.append(v)}))
+    cmodule().f()
+    assert args == [0xFFFFFFFF]
+
+def test_thunk_onPtrParam_passesCObj():
+    args = []
+    cmodule = compile_ccode('int a;\n'
+                            'void set(int * p);\n'
+                            'void f(void) { set(&a); }',
+                            externs=ExternRegistry(
+                                {'set': lambda p: args.append(p)}))
+    prog = cmodule()
+    prog.f()
+    [arg] = args
+    assert isinstance(arg, PtrCObj)
+    assert arg.ref is prog.a
+
+def test_thunk_onVariadicFunc_passesVarargs():
+    args = []
+    cmodule = compile_ccode('void trace(int a, ...);\n'
+                            'void f(void) { trace(1, 2, 3); }',
+                            externs=ExternRegistry(
+                                {'trace': lambda *a: args.extend(a)}))
+    cmodule().f()
+    assert args[0] == 1 and type(args[0]) is int
+    assert args[1:] == [2, 3]
+
+def test_compile_withExterns_doesNotBindUnregisteredFuncs():
+    cmodule = compile_ccode('int f(void);', externs=ExternRegistry())
+    assert not hasattr(cmodule, 'f')
+
+def test_bindExterns_returnsBoundNames():
+    cmodule = compile_ccode('int f(void);\nint g(void);')
+    assert bind_externs(cmodule, ExternRegistry({'g': lambda: 1,
+                                                 'x': lambda: 2})) == ['g']
+    assert cmodule().g() == 1
+
+def test_makeThunk_onSameSignature_reusesGeneratedCode():
+    proto = (CProgram.int, [CProgram.int, CProgram.short], False)
+    thunk1 = make_thunk('f1', lambda a, b: 0, proto)
+    thunk2 = make_thunk('f2', lambda a, b: 1, proto)
+    assert thunk1.__code__ is thunk2.__code__
+    assert thunk1.__name__ == 'f1'
+
+def test_instanceOverride_overridesBoundFunc():
+    cmodule = compile_ccode('int g(void);\n'
+                            'int f(void) { return g(); }',
+                            externs=ExternRegistry({'g': lambda: 1}))
+    prog = cmodule()
+    prog.g = lambda: prog.int(2)
+    assert prog.f() == 2
+
+def test_thunk_inCooperativeMode_supportsCoroutines():
+    event = Event()
+    def read():
+        value = yield event
+        raise Return(value * 2)
+    cmodule = compile_ccode('short read(void);\n'
+                            'int f(void) { return read(); }',
+                            cooperative=True,
+                            externs=ExternRegistry({'read': read}))
+    scheduler = Scheduler()
+    task = scheduler.spawn(cmodule().f())
+    scheduler.run()
+    event.set(0x8000)
+    scheduler.run()
+    assert task.result() == 0
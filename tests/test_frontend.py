@@ -0,0 +1,186 @@
+import clang.cindex
+import pytest
+
+from cymu import compiler    # configures libclang
+from cymu.frontend import extract, parse_int_literal, dumps, loads, \
+    IRFormatError, ExtractError, MAGIC
+
+
+def extract_ccode(c_src):
+    index = clang.cindex.Index.create()
+    transunit = index.parse('test.c', unsaved_files=[('test.c', c_src)])
+    return extract(transunit)
+
+def test_extract_returnsTransUnitNode():
+    transunit_ir = extract_ccode('')
+    assert transunit_ir.kind == 'TRANSLATION_UNIT'
+    assert transunit_ir.spelling == 'test.c'
+
+def test_extract_onVarDecl_createsNodeWithNameTypeAndLocation():
+    [var_decl_ir] = extract_ccode('\n  int a;').children
+    assert var_decl_ir.kind == 'VAR_DECL'
+    assert var_decl_ir.spelling == 'a'
+    assert var_decl_ir.type.kind == 'INT'
+    assert var_decl_ir.type.spelling == 'int'
+    assert var_decl_ir.location.filename == 'test.c'
+    assert (var_decl_ir.location.line, var_decl_ir.location.column) == (2, 7)
+
+def test_extract_onSameTypes_sharesTypeObj():
+    var_decl1_ir, var_decl2_ir = extract_ccode('int a; int b;').children
+    assert var_decl1_ir.type is var_decl2_ir.type
+
+def test_extract_onPtrType_setsPointee():
+    [var_decl_ir] = extract_ccode('int * p;').children
+    assert var_decl_ir.type.kind == 'POINTER'
+    assert var_decl_ir.type.pointee.kind == 'INT'
+
+def test_extract_onStructType_setsDeclSpelling():
+    struct_decl_ir, var_decl_ir = extract_ccode('struct s { int a; } ;'
+                                                'struct s x;').children
+    assert var_decl_ir.type.kind == 'RECORD'
+    assert var_decl_ir.type.decl_spelling == 's'
+
+def test_extract_onTypedef_resolvesCanonicalType():
+    _, var_decl_ir = extract_ccode('typedef unsigned char u8; u8 x;').children
+    assert var_decl_ir.type.kind == 'UCHAR'
+
+def test_extract_onConstQualifiedType_setsIsConst():
+    var_decl1_ir, var_decl2_ir, var_decl3_ir = extract_ccode(
+        'const int a = 1; int b; const int * p;').children
+    assert var_decl1_ir.type.is_const
+    assert not var_decl2_ir.type.is_const
+    assert not var_decl3_ir.type.is_const
+    assert var_decl3_ir.type.pointee.is_const
+
+def test_extract_onFuncDecl_setsResultTypeAndEndLocation():
+    [func_decl_ir] = extract_ccode('char f(int p) {\n'
+                                   '}').children
+    assert func_decl_ir.type.result.kind == 'CHAR_S'
+    assert func_decl_ir.end_location.line == 2
+    assert [c.kind for c in func_decl_ir.children] == \
+           ['PARM_DECL', 'COMPOUND_STMT']
+
+def test_extract_onOperator_setsOperator():
+    [var_decl_ir] = extract_ccode('int a = 1 - 2;').children
+    [bin_op_ir] = var_decl_ir.children
+    assert bin_op_ir.operator == 'SUB'
+    assert bin_op_ir.is_expr
+    assert not var_decl_ir.is_expr
+
+def test_extract_onIntegerLiteral_setsValue():
+    [var_decl_ir] = extract_ccode('int a = 0x10;').children
+    [int_literal_ir] = var_decl_ir.children
+    assert int_literal_ir.value == 16
+
+@pytest.mark.parametrize(('header', 'part_kinds'), [
+    ('i = 0; i; i -= 1', ['BINARY_OPERATOR', 'UNEXPOSED_EXPR',
+                          'COMPOUND_ASSIGNMENT_OPERATOR']),
+    (';;', ['NULL_STMT', 'NULL_STMT', 'NULL_STMT']),
+    ('; (i);', ['NULL_STMT', 'UNEXPOSED_EXPR', 'NULL_STMT']),
+    ('int j = 0;; i++', ['DECL_STMT', 'NULL_STMT', 'UNARY_OPERATOR'])])
+def test_extract_onForStmt_setsNullStmtForMissingParts(header, part_kinds):
+    [func_decl_ir] = extract_ccode('void f(int i) {\n'
+                                   '    for (' + header + ') {}\n'
+                                   '}').children
+    [for_stmt_ir] = func_decl_ir.children[-1].children
+    assert [c.kind for c in for_stmt_ir.children] == \
+           part_kinds + ['COMPOUND_STMT']
+    assert for_stmt_ir.end_location.line == 2
+
+@pytest.mark.parametrize('loop', ['LOOP(i, n) {}', 'for HEADER {}'])
+def test_extract_onForStmtHeaderFromMacro_keepsAllParts(loop):
+    [func_decl_ir] = extract_ccode(
+        '#define LOOP(v, n) for (v = 0; v < n; v += 1)\n'
+        '#define HEADER (i = 0; i < n; i += 1)\n'
+        'void f(int i, int n) {\n'
+        '    ' + loop + '\n'
+        '}').children
+    [for_stmt_ir] = func_decl_ir.children[-1].children
+    assert [c.kind for c in for_stmt_ir.children] == \
+           ['BINARY_OPERATOR', 'BINARY_OPERATOR',
+            'COMPOUND_ASSIGNMENT_OPERATOR', 'COMPOUND_STMT']
+
+def test_extract_onForStmtFromMacroWithMissingParts_raisesExtractError():
+    with pytest.raises(ExtractError):
+        extract_ccode('#define LOOP(v) for (v = 0;; v += 1)\n'
+                      'void f(int i) { LOOP(i) {} }')
+
+def test_extract_onForeverLoopFromMacro_ok():
+    [func_decl_ir] = extract_ccode('#define FOREVER for (;;)\n'
+                                   'void f(void) { FOREVER {} }').children
+    [for_stmt_ir] = func_decl_ir.children[-1].children
+    assert [c.kind for c in for_stmt_ir.children] == \
+           ['NULL_STMT', 'NULL_STMT', 'NULL_STMT', 'COMPOUND_STMT']
+
+def test_iterNodes_returnsAllNodesInPreorder():
+    transunit_ir = extract_ccode('int a = 1; int b;')
+    assert [n.kind for n in transunit_ir.iter_nodes()] == \
+           ['TRANSLATION_UNIT', 'VAR_DECL', 'INTEGER_LITERAL', 'VAR_DECL']
+
+@pytest.mark.parametrize(('spelling', 'value'), [
+    ('10', 10), ('0x1F', 31), ('010', 8), ('10u', 10), ('10UL', 10)])
+def test_parseIntLiteral(spelling, value):
+    assert parse_int_literal(spelling) == value
+
+
+def assert_equal_ir(node1, node2):
+    for attrname in ('kind', 'spelling', 'is_expr', 'operator', 'value'):
+        assert getattr(node1, attrname) == getattr(node2, attrname)
+    for loc_attrname in ('location', 'end_location'):
+        loc1 = getattr(node1, loc_attrname)
+        loc2 = getattr(node2, loc_attrname)
+        assert repr(loc1) == repr(loc2)
+    type1, type2 = node1.type, node2.type
+    while type1 is not None:
+        assert (type1.kind, type1.spelling, type1.decl_spelling,
+                type1.is_const) == \
+               (type2.kind, type2.spelling, type2.decl_spelling,
+                type2.is_const)
+        assert (type1.result is None) == (type2.result is None)
+        type1, type2 = type1.pointee, type2.pointee
+    assert type2 is None
+    assert len(node1.children) == len(node2.children)
+    for child1, child2 in zip(node1.children, node2.children):
+        assert_equal_ir(child1, child2)
+
+C_SRC = """
+    struct s { int a; unsigned char b; } s = { 1, 2 };
+    struct s *p = &s;
+    unsigned long big = 4294967295UL;
+    const short tbl = 7;
+    int f(int x) {
+        while (x -= 1)
+            p->a = x - 1;
+        return x;
+    }"""
+
+def test_dumpsLoads_returnsEqualIR():
+    transunit_ir = extract_ccode(C_SRC)
+    assert_equal_ir(loads(dumps(transunit_ir)), transunit_ir)
+
+def test_loads_sharesTypeObjs():
+    transunit_ir = loads(dumps(extract_ccode('int a; int b;')))
+    var_decl1_ir, var_decl2_ir = transunit_ir.children
+    assert var_decl1_ir.type is var_decl2_ir.type
+
+def test_loads_onWrongMagic_raisesIRFormatError():
+    with pytest.raises(IRFormatError):
+        loads(b'NOTCYMU\x01\x00')
+
+def test_loads_onWrongVersion_raisesIRFormatError():
+    data = dumps(extract_ccode(''))
+    with pytest.raises(IRFormatError):
+        loads(MAGIC + b'\xFF\xFF' + data[len(MAGIC) + 2:])
+
+def test_loads_onCorruptedData_raisesIRFormatError():
+    data = dumps(extract_ccode(''))
+    with pytest.raises(IRFormatError):
+        loads(data[:-3])
+
+def test_compileIr_onLoadedIR_createsWorkingCModule():
+    transunit_ir = loads(dumps(compiler.parse_str(C_SRC, 'test.c')))
+    prog = compiler.compile_ir(transunit_ir)()
+    assert prog.f(3) == 0
+    assert prog.s.a == 0
+    assert prog.big == 0xFFFFFFFF
+    assert prog.tbl == 7
@@ -0,0 +1,61 @@
+from cymu import compiler
+from cymu.datamodel import IntCObj
+from cymu.memo import LRUCache
+
+
+PURE_SRC = ('int g;\n'
+            'int scale(int a, short b) { return a + b + b; }\n'
+            'int rd(int a) { return a + g; }\n'
+            'int * ptr(int * p) { return p; }\n')
+
+
+def test_lookup_onStoredKey_returnsEntryAndCountsHit():
+    cache = LRUCache()
+    cache.store((1,), 'x')
+    assert cache.lookup((1,)) == 'x'
+    assert cache.lookup((2,)) is None
+    assert (cache.hits, cache.misses) == (1, 1)
+
+def test_store_onFullCache_dropsLeastRecentlyUsedEntry():
+    cache = LRUCache(maxsize=2)
+    cache.store((1,), 'a')
+    cache.store((2,), 'b')
+    cache.lookup((1,))
+    cache.store((3,), 'c')
+    assert (1,) in cache and (3,) in cache and (2,) not in cache
+    assert len(cache) == 2
+
+
+def test_compile_setsPurityOfFuncs():
+    cmodule = compiler.compile_str(PURE_SRC)
+    assert cmodule.__purity__ == {'scale': 'pure', 'rd': 'reads_globals',
+                                  'ptr': 'pure'}
+    assert cmodule.__memo_caches__ == {}
+
+def test_compile_withMemoize_memoizesPureIntFuncs():
+    cmodule = compiler.compile_str(PURE_SRC, memoize=True)
+    assert sorted(cmodule.__memo_caches__) == ['scale']
+    prog1, prog2 = cmodule(), cmodule()
+    assert prog1.scale(1, 2) == 5
+    result = prog2.scale(1, 2)
+    assert result == 5
+    assert isinstance(result, IntCObj)
+    assert result.adr_space is prog2.__adr_space__
+    cache = cmodule.__memo_caches__['scale']
+    assert (cache.hits, cache.misses) == (1, 1)
+
+def test_compile_withMemoize_returnsNewCObjPerCall():
+    prog = compiler.compile_str('int inc(int a) { a += 1; return a; }\n'
+                                'int twice(int a) { return inc(inc(a)); }',
+                                memoize=True)()
+    assert prog.twice(1) == 3
+    assert prog.twice(1) == 3
+    assert prog.inc(2) == 3
+
+def test_compile_withMemoizeSize_limitsCacheSize():
+    cmodule = compiler.compile_str(PURE_SRC, memoize=2)
+    prog = cmodule()
+    for a in range(3):
+        prog.scale(a, 0)
+    assert cmodule.__memo_caches__['scale'].maxsize == 2
+    assert len(cmodule.__memo_caches__['scale']) == 2
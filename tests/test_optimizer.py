@@ -0,0 +1,174 @@
+import ast
+
+import pytest
+
+from cymu import optimizer
+from cymu.compiler import compile_str
+
+
+def run_pass(pass_func, src):
+    return ast.dump(pass_func(ast.parse(src)))
+
+def parsed(src):
+    return ast.dump(ast.parse(src))
+
+
+def test_removeDeadPass_removesPassIfNotLastStmt():
+    assert run_pass(optimizer.remove_dead_pass,
+                    'pass\nx = 1\npass\ny = 2\npass') \
+           == parsed('x = 1\ny = 2\npass')
+
+def test_removeDeadPass_onNestedBlocks_removesPass():
+    assert run_pass(optimizer.remove_dead_pass,
+                    'def f():\n'
+                    '    pass\n'
+                    '    if x:\n'
+                    '        pass\n'
+                    '        return 1\n'
+                    '    else:\n'
+                    '        pass') \
+           == parsed('def f():\n'
+                     '    if x:\n'
+                     '        return 1\n'
+                     '    else:\n'
+                     '        pass')
+
+def test_eliminateRedundantCasts_onCastOfSameType_removesOuterCast():
+    assert run_pass(optimizer.eliminate_redundant_casts,
+                    '__globals__.int(__globals__.int(3))') \
+           == parsed('__globals__.int(3)')
+
+@pytest.mark.parametrize('src', [
+    '__globals__.short(__globals__.int(3))',
+    '__globals__.int(__globals__.int(3), 4)',
+    '__globals__.func(__globals__.func(3))'])
+def test_eliminateRedundantCasts_onNoRedundantCast_doesNotModify(src):
+    assert run_pass(optimizer.eliminate_redundant_casts, src) == parsed(src)
+
+def test_foldConstants_onAdditionOfIntConstants_returnsIntConstant():
+    assert run_pass(optimizer.fold_constants,
+                    '__globals__.int(3) + __globals__.int(4) - '
+                    '__globals__.int(2)') \
+           == parsed('__globals__.int(5)')
+
+def test_foldConstants_onOverflow_wrapsResult():
+    assert run_pass(optimizer.fold_constants,
+                    '__globals__.int(0x7FFFFFFF) + __globals__.int(1)') \
+           == parsed('__globals__.int(-0x80000000)')
+
+@pytest.mark.parametrize(('src', 'result'), [
+    ('(3 + 4) * 2', '14'), ('(1 << 4) | 1', '17'), ('7 >> 1', '3')])
+def test_foldConstants_onRawIntConstants_returnsIntConstant(src, result):
+    assert run_pass(optimizer.fold_constants, src) == parsed(result)
+
+def test_foldConstants_onHugeShiftCount_doesNotModify():
+    src = '1 << 100000'
+    assert run_pass(optimizer.fold_constants, src) == parsed(src)
+
+def test_foldConstants_onNonConstants_doesNotModify():
+    src = '__globals__.int(3) + __globals__.a'
+    assert run_pass(optimizer.fold_constants, src) == parsed(src)
+
+@pytest.mark.parametrize(('src', 'result'), [
+    ('if __globals__.int(1):\n x = 1\nelse:\n y = 1', 'x = 1'),
+    ('if __globals__.int(0):\n x = 1\nelse:\n y = 1', 'y = 1'),
+    ('if __globals__.int(0):\n x = 1', 'pass'),
+    ('if not __globals__.int(1):\n break', 'pass'),
+    ('if 0:\n x = 1\nelse:\n y = 1', 'y = 1')])
+def test_foldConstants_onConstantIfCondition_removesIf(src, result):
+    assert run_pass(optimizer.fold_constants, src) == parsed(result)
+
+def test_hoistGlobalAttrs_onMultipleReads_readsOnce():
+    assert run_pass(optimizer.hoist_global_attrs,
+                    '__global_names__ = ("a",)\n'
+                    'def f(__globals__):\n'
+                    '    __globals__.a.val = __globals__.int(1)\n'
+                    '    return __globals__.int(__globals__.a)') \
+           == parsed('__global_names__ = ("a",)\n'
+                     'def f(__globals__):\n'
+                     '    __g_a__ = __globals__.a\n'
+                     '    __g_int__ = __globals__.int\n'
+                     '    __g_a__.val = __g_int__(1)\n'
+                     '    return __g_int__(__g_a__)')
+
+def test_hoistGlobalAttrs_onUndefinedAttr_doesNotHoist():
+    src = ('def f(__globals__):\n'
+           '    __globals__.hw(1)\n'
+           '    __globals__.hw(2)')
+    assert run_pass(optimizer.hoist_global_attrs, src) == parsed(src)
+
+def test_hoistGlobalAttrs_onUnboundExternFunc_doesNotRaise():
+    prog = compile_str('int hw(int);\n'
+                       'int f(int x) { if (x) { hw(1); hw(2); } return 5; }'
+                       )()
+    assert prog.f(0) == 5
+
+def test_hoistGlobalAttrs_onAssignedAttr_doesNotHoist():
+    src = ('def f(__globals__):\n'
+           '    __globals__.a = 3\n'
+           '    return __globals__.a + __globals__.a')
+    assert run_pass(optimizer.hoist_global_attrs, src) == parsed(src)
+
+def test_hoistGlobalAttrs_onCreatingGlobals_hoistsOnlyTypes():
+    assert run_pass(optimizer.hoist_global_attrs,
+                    'def f(__globals__):\n'
+                    '    __globals__.init_global_table(0, 1)\n'
+                    '    __globals__.p = __globals__.int.ptr(__globals__.a)\n'
+                    '    __globals__.q = __globals__.int.ptr(__globals__.a)') \
+           == parsed('def f(__globals__):\n'
+                     '    __g_int__ = __globals__.int\n'
+                     '    __globals__.init_global_table(0, 1)\n'
+                     '    __globals__.p = __g_int__.ptr(__globals__.a)\n'
+                     '    __globals__.q = __g_int__.ptr(__globals__.a)')
+
+
+def test_passManager_run_returnsStatsPerPass():
+    pass_mgr = optimizer.PassManager()
+    pass_mgr.run(ast.parse('pass\n__globals__.int(__globals__.int(3))'))
+    assert [stats.name for stats in pass_mgr.stats] \
+           == [name for name, _ in optimizer.DEFAULT_PASSES]
+    cast_stats = pass_mgr.stats[0]
+    assert cast_stats.nodes_before == cast_stats.nodes_after + 5
+    assert cast_stats.duration >= 0.0
+    pass_stats = pass_mgr.stats[2]
+    assert pass_stats.nodes_before == pass_stats.nodes_after + 1
+
+def test_passManager_register_runsCustomPass():
+    modules_astpy = []
+    def custom_pass(module_astpy):
+        modules_astpy.append(module_astpy)
+        return module_astpy
+    pass_mgr = optimizer.PassManager([])
+    pass_mgr.register('custom', custom_pass)
+    module_astpy = ast.parse('pass')
+    assert pass_mgr.run(module_astpy) is module_astpy
+    assert modules_astpy == [module_astpy]
+    assert [stats.name for stats in pass_mgr.stats] == ['custom']
+
+def test_passManager_registerWithBefore_insertsPass():
+    pass_mgr = optimizer.PassManager()
+    pass_mgr.register('custom', lambda m: m, before='remove_dead_pass')
+    assert [name for name, _ in pass_mgr.passes] \
+           == ['eliminate_redundant_casts', 'fold_constants', 'custom',
+               'remove_dead_pass', 'hoist_global_attrs']
+
+
+def test_compileStr_onPassManager_setsPassStats():
+    pass_mgr = optimizer.PassManager()
+    cmodule = compile_str('int a;', pass_manager=pass_mgr)
+    assert cmodule.__pass_stats__ is pass_mgr.stats
+    assert len(cmodule.__pass_stats__) == len(optimizer.DEFAULT_PASSES)
+
+@pytest.mark.parametrize('passes', [[], None])
+def test_compileStr_withAndWithoutPasses_returnsSameResult(passes):
+    cmodule = compile_str('''
+        int a = 3 + 4;
+        int f(int p) {
+            int r = 0;
+            if (0) r += 100;
+            while (1) {
+                r += a + p;
+                return r; }
+        }
+        ''', pass_manager=optimizer.PassManager(passes))
+    assert cmodule().f(2) == 9
@@ -0,0 +1,108 @@
+import ast
+import StringIO
+
+import pytest
+
+from cymu import pyast_printer
+
+
+def dump(node, *args, **argv):
+    fileobj = StringIO.StringIO()
+    pyast_printer.print_ast(node, *args, fileobj=fileobj, **argv)
+    return fileobj.getvalue()
+
+def source(src, line_comments=False):
+    fileobj = StringIO.StringIO()
+    line_map = pyast_printer.write_source(ast.parse(src), fileobj,
+                                          line_comments)
+    return fileobj.getvalue(), line_map
+
+
+def test_printAst_onNestedNodes_writesIndentedDump():
+    assert dump(ast.parse('x = f(1)')) \
+           == ("Module(\n"
+               "    body=[\n"
+               "        Assign(\n"
+               "            targets=[\n"
+               "                Name(id='x', ctx=Store())], \n"
+               "            value=Call(\n"
+               "                func=Name(id='f', ctx=Load()), \n"
+               "                args=[\n"
+               "                    Num(n=1)], \n"
+               "                keywords=[], \n"
+               "                starargs=None, \n"
+               "                kwargs=None))])\n")
+
+def test_printAst_withIncludeAttributes_writesLineNos():
+    assert dump(ast.parse('pass'), True) \
+           == ("Module(\n"
+               "    body=[\n"
+               "        Pass( lineno=1, col_offset=0)])\n")
+
+def test_printAst_withMaxDepth_omitsDeeperNodes():
+    assert dump(ast.parse('x = f(1)'), max_depth=1) \
+           == ("Module(\n"
+               "    body=[\n"
+               "        Assign(\n"
+               "            targets=[\n"
+               "                Name(...)], \n"
+               "            value=Call(...))])\n")
+
+def test_printAst_withNodeFilter_omitsFilteredNodes():
+    assert dump(ast.parse('x = f(1)'),
+                node_filter=lambda node: not isinstance(node, ast.Call)) \
+           == ("Module(\n"
+               "    body=[\n"
+               "        Assign(\n"
+               "            targets=[\n"
+               "                Name(id='x', ctx=Store())], \n"
+               "            value=Call(...))])\n")
+
+def test_printAst_onDeeplyNestedTree_doesNotExceedRecursionLimit():
+    expr_astpy = ast.Name(id='x', ctx=ast.Load())
+    for _ in range(5000):
+        expr_astpy = ast.UnaryOp(op=ast.Not(), operand=expr_astpy)
+    assert dump(expr_astpy).count('UnaryOp(') == 5000
+
+def test_printAst_onNoAst_raisesTypeError():
+    with pytest.raises(TypeError):
+        pyast_printer.print_ast(3)
+
+
+@pytest.mark.parametrize('src', [
+    'from cymu import datamodel\n',
+    'class C(datamodel.CProgram):\n'
+    '    x = 3\n'
+    '    def f(self, a, b=3, *_):\n'
+    '        return\n',
+    'a.b.val = c.d(1, x=-2)\n',
+    'x.__iadd__(y)\n',
+    '__cov__[3] += 1\n',
+    'if not a:\n'
+    '    break\n'
+    'elif b:\n'
+    '    pass\n'
+    'else:\n'
+    '    x = (1, 2)\n',
+    'while True:\n'
+    '    x = a - (b + c) * -d\n',
+    'for i in range(3):\n'
+    '    continue\n'])
+def test_writeSource_returnsEquivalentSource(src):
+    assert ast.dump(ast.parse(source(src)[0])) == ast.dump(ast.parse(src))
+
+def test_writeSource_returnsLineMap():
+    tree = ast.parse('x = 1\nif x:\n    y = 2')
+    tree.body[0].lineno = 10
+    tree.body[1].lineno = 20
+    tree.body[1].body[0].lineno = 21
+    fileobj = StringIO.StringIO()
+    assert pyast_printer.write_source(tree, fileobj) == [10, 20, 21]
+
+def test_writeSource_withLineComments_addsLineNoComment():
+    src, line_map = source('x = 1', line_comments=True)
+    assert src == 'x = 1'.ljust(60) + ' # line 1\n'
+
+def test_writeSource_onUnsupportedNode_raisesTypeError():
+    with pytest.raises(TypeError):
+        source('x = [y for y in z]')
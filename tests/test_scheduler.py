@@ -0,0 +1,163 @@
+import pytest
+
+from cymu import compiler
+from cymu.scheduler import Scheduler, Event, Return, DeadlockError, run
+
+
+def compile_coop(c_src):
+    return compiler.compile_str(c_src, 'test.c', cooperative=True)
+
+
+def counter(log, name, cnt):
+    for ndx in range(cnt):
+        log.append((name, ndx))
+        yield
+    raise Return(name)
+
+
+def test_run_returnsResultOfCoroutine():
+    assert run(counter([], 'a', 3)) == 'a'
+
+def test_run_onSubCoroutine_returnsResultToCaller():
+    def caller():
+        result = yield counter([], 'sub', 2)
+        raise Return(result + '!')
+    assert run(caller()) == 'sub!'
+
+def test_run_onExceptionInSubCoroutine_raisesInCaller():
+    def failing():
+        yield
+        raise ValueError()
+    def caller():
+        try:
+            yield failing()
+        except ValueError:
+            raise Return('caught')
+    assert run(caller()) == 'caught'
+
+def test_run_onUnhandledException_reraisesException():
+    def failing():
+        raise ValueError()
+        yield
+    with pytest.raises(ValueError):
+        run(failing())
+
+def test_schedulerRun_withQuota_interleavesTasks():
+    log = []
+    scheduler = Scheduler(quota=2)
+    task_a = scheduler.spawn(counter(log, 'a', 3))
+    task_b = scheduler.spawn(counter(log, 'b', 3), quota=1)
+    scheduler.run()
+    assert log == [('a', 0), ('a', 1), ('b', 0),
+                   ('a', 2), ('b', 1),
+                   ('b', 2)]
+    assert task_a.result() == 'a' and task_b.result() == 'b'
+    assert task_a.steps == 3
+
+def test_schedulerRun_onWaitingForEvent_suspendsTaskUntilSet():
+    event = Event()
+    def waiting():
+        value = yield event
+        raise Return(value)
+    scheduler = Scheduler()
+    task = scheduler.spawn(waiting())
+    scheduler.run()
+    assert task.state == task.WAITING
+    event.set(123)
+    scheduler.run()
+    assert task.result() == 123
+
+def test_schedulerRun_onAlreadySetEvent_doesNotSuspend():
+    event = Event()
+    event.set('x')
+    def waiting():
+        raise Return((yield event))
+    assert run(waiting()) == 'x'
+
+def test_runUntilComplete_onUnsetEvent_raisesDeadlockError():
+    def waiting():
+        yield Event()
+    with pytest.raises(DeadlockError):
+        run(waiting())
+
+def test_taskResult_onUnfinishedTask_raisesValueError():
+    scheduler = Scheduler()
+    task = scheduler.spawn(counter([], 'a', 1))
+    with pytest.raises(ValueError):
+        task.result()
+
+
+def test_compileCooperative_setsCooperativeFlag():
+    assert compile_coop('int a;').__cooperative__
+    assert not compiler.compile_str('int a;').__cooperative__
+
+def test_compileCooperative_returnsCoroutine():
+    prog = compile_coop('int f(int a, int b) { return a + b; }')()
+    assert run(prog.f(3, 4)) == 7
+
+def test_compileCooperative_onVoidFunc_returnsNone():
+    prog = compile_coop('int a; void f(void) { a = 3; }')()
+    assert run(prog.f()) is None
+    assert prog.a == 3
+
+def test_compileCooperative_onCallOfCFunc_runsCallee():
+    prog = compile_coop('int g(int a) { return a + 1; }\n'
+                        'int f(void) { return g(2) + g(3); }')()
+    assert run(prog.f()) == 7
+
+def test_compileCooperative_onLoop_yieldsPerIteration():
+    prog = compile_coop('int i;\n'
+                        'void f(void) { i = 3; while (i) i -= 1; }')()
+    scheduler = Scheduler(quota=1)
+    task = scheduler.spawn(prog.f())
+    for remaining_cnt in [3, 2, 1, 0]:
+        scheduler.run_once()
+        assert prog.i == remaining_cnt
+    scheduler.run_once()
+    assert task.done
+
+def test_compileCooperative_onCountedLoop_yieldsPerIteration():
+    prog = compile_coop('int n;\n'
+                        'void f(void) {\n'
+                        '    for (int i = 0; i < 3; i++) n = i;\n'
+                        '}')()
+    scheduler = Scheduler(quota=1)
+    task = scheduler.spawn(prog.f())
+    scheduler.run_once()
+    assert not prog.n.initialized
+    for cnt in [0, 1, 2]:
+        scheduler.run_once()
+        assert prog.n == cnt
+    assert task.done
+
+def test_compileCooperative_onExternFunc_passesResultAndAwaitsEvent():
+    event = Event()
+    prog = compile_coop('int read_reg(void);\n'
+                        'int f(void) { return read_reg() + read_reg(); }')()
+    def wait_for_event():
+        value = yield event
+        raise Return(value)
+    results = iter([lambda: 10, wait_for_event])
+    def read_reg():
+        return next(results)()
+    prog.read_reg = read_reg
+    scheduler = Scheduler()
+    task = scheduler.spawn(prog.f())
+    scheduler.run()
+    assert task.state == task.WAITING
+    event.set(prog.int(5))
+    scheduler.run()
+    assert task.result() == 15
+
+def test_compileCooperative_onManyPrograms_interleavesPrograms():
+    cmodule = compile_coop('int cnt;\n'
+                           'void f(void) { cnt = 0; do { cnt += 1; } '
+                           'while (1); }')
+    progs = [cmodule() for _ in range(3)]
+    scheduler = Scheduler(quota=5)
+    for prog in progs:
+        scheduler.spawn(prog.f())
+    for _ in range(4):
+        scheduler.run_once()
+    # the first time slice ends at the beginning of the 5th iteration
+    assert [prog.cnt for prog in progs] == [19, 19, 19]
@@ -0,0 +1,122 @@
+import StringIO
+
+import pytest
+
+from cymu import compiler
+from cymu.datamodel import VarAccessError
+from cymu.trace import Trace, WriteSite, FuncSite, TraceEvent, replay
+
+
+TRACED_SRC = ('struct inner { int x; };\n'
+              'struct s { int a; struct inner in_struct; };\n'
+              'struct s glob;\n'
+              'int cnt;\n'
+              'void set(struct s * ps) { ps->a = 1; }\n'
+              'void f(int n) {\n'
+              '    int loc;\n'
+              '    loc = n;\n'
+              '    cnt = loc;\n'
+              '    glob.in_struct.x = 2;\n'
+              '    set(&glob);\n'
+              '}\n')
+
+
+def compile_traced(c_src, trace=True):
+    return compiler.compile_str(c_src, 'test.c', trace=trace)
+
+
+def test_addSites_returnsIndexOfSite():
+    trace = Trace()
+    assert trace.add_write_site('test.c', 3, ['a', 'b']) == 0
+    assert trace.add_func_sites('test.c', 4, 6, 'f') == (1, 2)
+    assert trace.sites == [WriteSite('test.c', 3, ('a', 'b'), False),
+                           FuncSite('test.c', 4, 'f', False),
+                           FuncSite('test.c', 6, 'f', True)]
+
+def test_record_storesEventsInBuffer():
+    trace = Trace()
+    trace.add_write_site('test.c', 3, ['a'])
+    trace.record(0, 5)
+    assert trace.count == 1
+    assert list(trace.events()) == [TraceEvent(trace.sites[0], 5)]
+
+def test_record_onFullBuffer_overwritesOldestEvents():
+    trace = Trace(capacity=2)
+    trace.add_write_site('test.c', 3, ['a'])
+    for value in range(5):
+        trace.record(0, value)
+    assert [value for site, value in trace.events()] == [3, 4]
+    assert trace.dropped_count == 3
+
+def test_reset_dropsEvents():
+    trace = Trace()
+    trace.add_write_site('test.c', 3, ['a'])
+    trace.record(0, 1)
+    trace.reset()
+    assert list(trace.events()) == []
+
+
+def test_compile_withoutTrace_setsTraceToNone():
+    assert compiler.compile_str('int a;').__trace__ is None
+
+def test_compile_withTrace_recordsWritesToGlobalsAndFields():
+    cmodule = compile_traced(TRACED_SRC)
+    cmodule().f(3)
+    log = StringIO.StringIO()
+    cmodule.__trace__.write_log(log)
+    assert log.getvalue() == ('test.c:6: enter f\n'
+                              'test.c:9: cnt = 3\n'
+                              'test.c:10: glob.in_struct.x = 2\n'
+                              'test.c:5: enter set\n'
+                              'test.c:5: <indirect> = 1\n'
+                              'test.c:5: leave set\n'
+                              'test.c:12: leave f\n')
+
+def test_compile_withTraceCapacity_createsBufferOfCapacity():
+    cmodule = compile_traced(TRACED_SRC, trace=3)
+    cmodule().f(3)
+    assert cmodule.__trace__.capacity == 3
+    assert [site.line for site, value in cmodule.__trace__.events()] \
+           == [5, 5, 12]
+
+def test_compile_withTrace_onException_recordsLeave():
+    cmodule = compile_traced('int a;\n'
+                             'int f(void) { return a; }')
+    prog = cmodule()
+    with pytest.raises(VarAccessError):
+        prog.f()
+    assert [site.exit for site, value in cmodule.__trace__.events()] \
+           == [False, True]
+
+def test_compile_withTrace_onStructAssignment_doesNotRecordStruct():
+    cmodule = compile_traced('struct s { int a, b; };\n'
+                             'struct s g, h = {1, 2};\n'
+                             'void f(void) { g = h; g.b = 3; }')
+    prog = cmodule()
+    prog.f()
+    assert prog.g.a == 1
+    assert [(site.path, value) for site, value in cmodule.__trace__.events()
+            if isinstance(site, WriteSite)] == [(('g', 'b'), 3)]
+
+def test_compile_withTrace_storesEventsWithoutCallingRecord():
+    cmodule = compile_traced(TRACED_SRC)
+    def record(site_ndx, value):
+        raise AssertionError('record() was called')
+    cmodule.__trace__.record = record
+    cmodule().f(3)
+    assert cmodule.__trace__.count == 7
+
+def test_replay_appliesWritesToGlobalsAndFields():
+    cmodule = compile_traced(TRACED_SRC)
+    cmodule().f(3)
+    new_prog = cmodule()
+    assert replay(cmodule.__trace__, new_prog) == 2
+    assert new_prog.cnt == 3
+    assert new_prog.glob.in_struct.x == 2
+
+def test_replay_withUntil_stopsAfterEvent():
+    cmodule = compile_traced(TRACED_SRC)
+    cmodule().f(3)
+    new_prog = cmodule()
+    assert replay(cmodule.__trace__, new_prog, until=2) == 1
+    assert not new_prog.glob.in_struct.x.initialized